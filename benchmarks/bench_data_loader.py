@@ -0,0 +1,294 @@
+"""
+Benchmark etapów potoku data_loader na syntetycznych danych IMU.
+
+usage:
+```
+    python -m benchmarks.bench_data_loader --rates 20 25 50 --subjects 4 --duration 120 --output bench.json
+    python -m benchmarks.bench_data_loader --output new.json --compare bench.json
+    python -m benchmarks.bench_data_loader --rates 20 --trace trace.json  # + podział na cechy i etapy
+```
+"""
+import argparse
+import importlib.util
+import json
+import platform
+import resource
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from data_loader import (
+    binned_distr,
+    dev_mad_var,
+    features_accelerometer,
+    features_cosine,
+    features_freq,
+    features_temporal,
+    peak_features,
+    profiling,
+    vector_magnitude,
+)
+from data_loader.data_loader import TimeWindowSegmenter, sliding_windows
+from data_loader.feature_store import group_peaks
+
+from .synthetic import generate_imu_data, to_raw_export
+
+AXES = ['ac_x', 'ac_y', 'ac_z', 'g_x', 'g_y', 'g_z']
+
+
+def process_peak_rss_mb():
+    # ru_maxrss na Linuksie jest w kilobajtach; maksimum od startu procesu, nie z jednego etapu
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def rss_mb():
+    """Bieżące RSS procesu (Linux, /proc/self/statm); None na innych systemach."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2 ** 20
+    except OSError:
+        return None
+
+
+class StagePeakMemory:
+    """
+    Szczyt RSS w czasie etapu ponad RSS z jego początku, próbkowany co `interval_s` w wątku w tle.
+    Duże tablice numpy są mapowane i zwalniane do systemu osobno, więc wynik odpowiada pamięci samego etapu,
+    w przeciwieństwie do `ru_maxrss`, który jest maksimum całego procesu.
+    """
+
+    def __init__(self, interval_s=0.001):
+        self.interval_s = interval_s
+        self.peak_mb = None
+
+    def __enter__(self):
+        self.start_mb = rss_mb()
+        if self.start_mb is None:
+            return self
+        self._peak = self.start_mb
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(self.interval_s):
+            self._peak = max(self._peak, rss_mb())
+
+    def __exit__(self, *exc):
+        if self.start_mb is not None:
+            self._stop.set()
+            self._thread.join()
+            self.peak_mb = max(self._peak, rss_mb()) - self.start_mb
+        return False
+
+
+def scalar_extractors(fs):
+    extractors = {
+        'features_accelerometer.extract_acc_features': lambda w: features_accelerometer.extract_acc_features(w, AXES),
+        'features_temporal.extract_temporal_features': lambda w: features_temporal.extract_temporal_features(w, AXES),
+        'dev_mad_var.calculate_statistics_multi_axis': lambda w: dev_mad_var.calculate_statistics_multi_axis(w, AXES),
+        'vector_magnitude.calculate_accelerometer_magnitude': lambda w: vector_magnitude.calculate_accelerometer_magnitude(w, AXES[:3]),
+        'vector_magnitude.calculate_gyroscope_magnitude': lambda w: vector_magnitude.calculate_gyroscope_magnitude(w, AXES[3:]),
+        'features_cosine.extract_cosine_distances': lambda w: features_cosine.extract_cosine_distances(w, AXES),
+        'binned_distr.calculate_binned_distribution_multi_axis': lambda w: binned_distr.calculate_binned_distribution_multi_axis(w, AXES, bins=10),
+        'peak_features.extract_peak_features': lambda w: peak_features.extract_peak_features(w, fs, AXES),
+    }
+    for name in ['dominant_frequency', 'spectral_entropy', 'spectral_centroid', 'spectral_bandwidth',
+                 'spectral_flatness', 'spectral_slope', 'spectral_rolloff', 'band_energy_ratio']:
+        func = getattr(features_freq, name)
+        extractors[f'features_freq.{name}'] = lambda w, func=func: [func(w[axis].values, fs) for axis in AXES]
+    extractors['features_freq.spectral_energy'] = lambda w: [features_freq.spectral_energy(w[axis].values) for axis in AXES]
+    extractors['features_freq.mfcc_features'] = lambda w: [features_freq.mfcc_features(w[axis].values, fs) for axis in AXES]
+    if importlib.util.find_spec('librosa') is not None:
+        extractors['features_freq.mfcc_features[librosa]'] = lambda w: [
+            features_freq.mfcc_features(w[axis].values, fs, backend='librosa') for axis in AXES
+        ]
+    return extractors
+
+
+def batch_extractors(fs):
+    return {
+        'features_accelerometer.extract_acc_features_batch': partial(features_accelerometer.extract_acc_features_batch, axes=AXES),
+        'features_temporal.extract_temporal_features_batch': partial(features_temporal.extract_temporal_features_batch, axes=AXES),
+        'dev_mad_var.calculate_statistics_batch': partial(dev_mad_var.calculate_statistics_batch, axes=AXES),
+        'vector_magnitude.calculate_accelerometer_magnitude_batch': lambda w: vector_magnitude.calculate_accelerometer_magnitude_batch(w[:, :, :3], AXES[:3]),
+        'vector_magnitude.calculate_gyroscope_magnitude_batch': lambda w: vector_magnitude.calculate_gyroscope_magnitude_batch(w[:, :, 3:], AXES[3:]),
+        'features_cosine.extract_cosine_distances_batch': partial(features_cosine.extract_cosine_distances_batch, axes=AXES),
+        'binned_distr.calculate_binned_distribution_batch': partial(binned_distr.calculate_binned_distribution_batch, axes=AXES),
+        'features_freq.spectral_features': lambda w: features_freq.spectral_features(np.moveaxis(w, 1, 2), fs),
+        'features_freq.mfcc_batch': lambda w: features_freq.mfcc_batch(np.moveaxis(w, 1, 2), fs),
+        'peak_features.extract_peak_features_batch': partial(peak_features.extract_peak_features_batch, sampling_rate=fs, axes=AXES),
+    }
+
+
+def peak_index_features(segmenter, fs):
+    # piki z indeksu ciągłego sygnału każdej grupy (jak w FeatureStore i extract_features_parallel)
+    window_params = segmenter._window_params()
+    _, blocks, offsets = segmenter.group_blocks()
+    matrices = []
+    for start, end in zip(offsets[:-1], offsets[1:]):
+        block = blocks[start:end]
+        windows = sliding_windows(block, *window_params)
+        matrix, _ = peak_features.extract_peak_features_batch(
+            windows, fs, AXES, peaks=group_peaks(block, window_params)
+        )
+        matrices.append(matrix)
+    return np.concatenate(matrices)
+
+
+class StageTimer:
+    def __init__(self, rate):
+        self.rate = rate
+        self.results = []
+
+    def run(self, stage, func, rows=None, windows=None, repeat=1):
+        best = float('inf')
+        with StagePeakMemory() as memory:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                out = func()
+                best = min(best, time.perf_counter() - start)
+        if callable(windows):
+            windows = windows(out)
+        self.results.append({
+            'stage': stage,
+            'rate_hz': self.rate,
+            'seconds': best,
+            'rows': rows,
+            'windows': windows,
+            'rows_per_s': rows / best if rows else None,
+            'windows_per_s': windows / best if windows else None,
+            'stage_peak_mb': memory.peak_mb,
+            'process_peak_rss_mb': process_peak_rss_mb(),
+        })
+        memory_text = f"{memory.peak_mb:10.1f} MB" if memory.peak_mb is not None else ''
+        print(f"  {stage:<60} {best * 1000:10.1f} ms {memory_text}", file=sys.stderr)
+        return out
+
+
+def bench_rate(rate, args):
+    timer = StageTimer(rate)
+    print(f"{rate} Hz:", file=sys.stderr)
+    data = generate_imu_data(n_subjects=args.subjects, duration_s=args.duration, sampling_rate=rate, seed=args.seed)
+    raw = to_raw_export(data, seed=args.seed)
+    n_rows = len(raw)
+
+    segmenter = TimeWindowSegmenter(source_sampling_rate=rate, clean_columns=False, fix_timestamps=False)
+    segmenter.df = raw.copy()
+    timer.run('_clean_columns', segmenter._clean_columns, rows=n_rows)
+    timer.run('_fix_timestamps', segmenter._fix_timestamps, rows=n_rows)
+    timer.run('resample_to', lambda: segmenter.resample_to(args.target_rate), rows=n_rows)
+
+    # segmentacja na danych po resample_to, z oknami liczonymi w docelowej częstotliwości
+    windowed = TimeWindowSegmenter(
+        window_size=args.window_size, step_size=args.step_size, source_sampling_rate=args.target_rate,
+        clean_columns=False, fix_timestamps=False,
+    )
+    windowed.df = segmenter.df
+    n_resampled = len(windowed.df)
+    windows = timer.run('segment', lambda: list(windowed.segment()), rows=n_resampled, windows=len)
+    timer.run('segment_arrays', lambda: sum(len(w) for _, _, _, w in windowed.segment_arrays()),
+              rows=n_resampled, windows=lambda n: n)
+    tensor, _, _ = timer.run('as_tensor', windowed.as_tensor, rows=n_resampled, windows=lambda out: len(out[0]))
+
+    sample = windows[:args.max_scalar_windows]
+    for name, func in scalar_extractors(args.target_rate).items():
+        if sample:
+            func(sample[0])  # rozgrzewka (np. kompilacja numba w librosa przy pierwszym wywołaniu)
+        timer.run(name, lambda: [func(window) for window in sample], windows=len(sample))
+    for name, func in batch_extractors(args.target_rate).items():
+        timer.run(name, lambda: func(tensor), windows=len(tensor), repeat=args.repeat)
+    timer.run('peak_features.extract_peak_features_batch[peak_index]',
+              lambda: peak_index_features(windowed, args.target_rate), windows=len, repeat=args.repeat)
+
+    return timer.results
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = {(r['stage'], r['rate_hz']): r for r in json.load(f)['results']}
+
+    regressions = 0
+    print(f"\n{'stage':<60} {'rate':>5} {'base ms':>10} {'new ms':>10} {'ratio':>7} {'base MB':>9} {'new MB':>9}")
+    for result in results:
+        base = baseline.get((result['stage'], result['rate_hz']))
+        if base is None:
+            continue
+        ratio = result['seconds'] / base['seconds'] if base['seconds'] else float('inf')
+        flags = []
+        if ratio > 1 + threshold:
+            flags.append('REGRESSION')
+        # pamięć etapu (starsze wyniki mają tylko ru_maxrss całego procesu, więc nie są porównywane)
+        base_mb, new_mb = base.get('stage_peak_mb'), result.get('stage_peak_mb')
+        if base_mb is not None and new_mb is not None:
+            # próg 1 MB pomija szum próbkowania RSS przy małych etapach
+            if new_mb > base_mb * (1 + threshold) and new_mb - base_mb > 1.0:
+                flags.append('MEMORY REGRESSION')
+        regressions += bool(flags)
+        memory = f" {base_mb:>9.1f} {new_mb:>9.1f}" if base_mb is not None and new_mb is not None else ''
+        flag = ''.join(f'  {name}' for name in flags)
+        print(f"{result['stage']:<60} {result['rate_hz']:>5} {base['seconds'] * 1000:>10.1f} "
+              f"{result['seconds'] * 1000:>10.1f} {ratio:>7.2f}{memory}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rates', type=int, nargs='+', default=[20, 25, 50], help="częstotliwości danych źródłowych (Hz)")
+    parser.add_argument('--subjects', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=120, help="czas nagrania na osobę i aktywność (s)")
+    # resample_to uśrednia próbki w przedziałach, więc przy nadpróbkowaniu część przedziałów zostaje pusta (NaN)
+    parser.add_argument('--target-rate', type=int, default=20, help="częstotliwość po resample_to (Hz)")
+    parser.add_argument('--window-size', type=int, default=10)
+    parser.add_argument('--step-size', type=int, default=2)
+    parser.add_argument('--max-scalar-windows', type=int, default=200, help="limit okien dla ekstraktorów skalarnych")
+    parser.add_argument('--repeat', type=int, default=3, help="powtórzenia ekstraktorów wsadowych (liczy się najlepszy czas)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help="plik JSON z poprzedniego uruchomienia")
+    parser.add_argument('--threshold', type=float, default=0.2, help="dopuszczalny względny wzrost czasu i pamięci etapu przy --compare")
+    parser.add_argument('--trace', help="plik Chrome trace z profilowania etapów (profiling.Profiler)")
+    parser.add_argument('--trace-memory', action='store_true', help="przy --trace mierzy też alokacje (wolniej)")
+    args = parser.parse_args(argv)
+
+    results = []
+    feature_modules = [binned_distr, dev_mad_var, features_accelerometer, features_cosine, features_freq,
+                       features_temporal, peak_features, vector_magnitude]
+    profiler = profiling.Profiler(trace_memory=args.trace_memory, modules=feature_modules) if args.trace else None
+    with profiler or nullcontext():
+        for rate in args.rates:
+            results += bench_rate(rate, args)
+    if args.trace:
+        profiler.save_chrome_trace(args.trace)
+        print(profiler.summary().head(30).to_string(), file=sys.stderr)
+        print(f"Saved trace to {args.trace}", file=sys.stderr)
+
+    report = {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'config': vars(args),
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {len(results)} results to {args.output}", file=sys.stderr)
+
+    if args.compare:
+        return 1 if compare(results, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+Benchmark klasyfikatora KNN: ścieżka z notebooków (`StandardScaler` + `KNeighborsClassifier(metric='euclidean')`)
+w porównaniu z `BlockedKNN` (flat, wątki, PCA, PQ) na cechach `FeaturePlan` z syntetycznych danych IMU.
+
+Osoby są dzielone na zbiór uczący i testowy (ostatnie `--test-subjects` osób), a `--scale` powiela okna uczące
+z małym szumem, żeby zmierzyć zapytania na sekundę przy większym indeksie.
+
+usage:
+```
+    python -m benchmarks.bench_knn --subjects 6 --duration 300 --scale 10 --output knn.json
+    python -m benchmarks.bench_knn --neighbors 11 --n-jobs 4 --pca 30 --pq 16
+```
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import sklearn
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from data_loader.data_loader import TimeWindowSegmenter
+from data_loader.feature_registry import FeaturePlan
+from data_loader.knn import BlockedKNN
+
+from .synthetic import generate_imu_data, to_raw_export
+
+
+def feature_matrix(args):
+    data = generate_imu_data(n_subjects=args.subjects, duration_s=args.duration, sampling_rate=args.rate,
+                             seed=args.seed)
+    segmenter = TimeWindowSegmenter(
+        window_size=args.window_size, step_size=args.step_size, source_sampling_rate=args.rate,
+        clean_columns=False, fix_timestamps=False,
+    )
+    segmenter.df = to_raw_export(data, seed=args.seed)
+    segmenter._clean_columns()
+    segmenter._fix_timestamps()
+    tensor, labels, subjects = segmenter.as_tensor()
+    X, names = FeaturePlan(fs=args.rate).compute(tensor)
+    # jak w notebookach: brakujące wartości cech zastępowane zerami
+    return np.nan_to_num(X, nan=0.0, posinf=0.0, neginf=0.0), labels, subjects, names
+
+
+def scale_reference(X, y, scale, seed):
+    if scale <= 1:
+        return X, y
+    rng = np.random.default_rng(seed)
+    std = X.std(axis=0)
+    copies = [X] + [X + rng.normal(0.0, 0.05, X.shape) * std for _ in range(scale - 1)]
+    return np.concatenate(copies), np.tile(y, scale)
+
+
+def variants(args):
+    common = dict(n_neighbors=args.neighbors)
+    models = {
+        'notebook[StandardScaler+KNeighborsClassifier]': make_pipeline(
+            StandardScaler(), KNeighborsClassifier(n_neighbors=args.neighbors, metric='euclidean')
+        ),
+        'BlockedKNN[flat]': BlockedKNN(**common),
+    }
+    if args.n_jobs != 1:
+        models[f'BlockedKNN[flat, n_jobs={args.n_jobs}]'] = BlockedKNN(**common, n_jobs=args.n_jobs, query_block=256)
+    if args.pca:
+        models[f'BlockedKNN[pca={args.pca}]'] = BlockedKNN(**common, pca_components=args.pca)
+    if args.pq:
+        models[f'BlockedKNN[pq={args.pq}]'] = BlockedKNN(**common, index='pq', pq_subspaces=args.pq)
+        if args.pca:
+            models[f'BlockedKNN[pca={args.pca}, pq={args.pq}]'] = BlockedKNN(
+                **common, index='pq', pca_components=args.pca, pq_subspaces=min(args.pq, args.pca)
+            )
+    return models
+
+
+def index_nbytes(model):
+    if isinstance(model, BlockedKNN):
+        return model.index_nbytes
+    # KNeighborsClassifier trzyma kopię zbioru uczącego (float64) w `_fit_X`
+    return model[-1]._fit_X.nbytes
+
+
+def bench_model(name, model, X_train, y_train, X_test, y_test, reference, repeat):
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_s = time.perf_counter() - start
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        y_pred = model.predict(X_test)
+        best = min(best, time.perf_counter() - start)
+    result = {
+        'model': name,
+        'fit_s': fit_s,
+        'predict_s': best,
+        'queries_per_s': len(X_test) / best if best else None,
+        'accuracy': float(np.mean(y_pred == y_test)),
+        'agreement': float(np.mean(y_pred == reference)) if reference is not None else 1.0,
+        'index_bytes': int(index_nbytes(model)),
+    }
+    print(f"  {name:<50} acc {result['accuracy']:.4f}  agree {result['agreement']:.4f}  "
+          f"{result['queries_per_s']:10.0f} q/s  {result['index_bytes'] / 2**20:8.2f} MB", file=sys.stderr)
+    return result, y_pred
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--subjects', type=int, default=6)
+    parser.add_argument('--test-subjects', type=int, default=2, help="liczba osób w zbiorze testowym")
+    parser.add_argument('--duration', type=float, default=300, help="czas nagrania na osobę i aktywność (s)")
+    parser.add_argument('--rate', type=int, default=20, help="częstotliwość danych (Hz)")
+    parser.add_argument('--window-size', type=int, default=10)
+    parser.add_argument('--step-size', type=int, default=1)
+    parser.add_argument('--scale', type=int, default=10, help="krotność powielenia okien uczących (z szumem)")
+    parser.add_argument('--neighbors', type=int, default=5)
+    parser.add_argument('--n-jobs', type=int, default=-1, help="wątki dla wariantu BlockedKNN z n_jobs")
+    parser.add_argument('--pca', type=int, default=30, help="składowe PCA (0 wyłącza wariant)")
+    parser.add_argument('--pq', type=int, default=16, help="podprzestrzenie PQ (0 wyłącza wariant)")
+    parser.add_argument('--repeat', type=int, default=3, help="powtórzenia predict (liczy się najlepszy czas)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bench_knn.json')
+    args = parser.parse_args(argv)
+
+    X, y, subjects, names = feature_matrix(args)
+    test_ids = sorted(set(subjects))[-args.test_subjects:]
+    test = np.isin(subjects, test_ids)
+    X_train, y_train = scale_reference(X[~test], y[~test], args.scale, args.seed)
+    X_test, y_test = X[test], y[test]
+    print(f"{len(X_train)} reference windows, {len(X_test)} queries, {len(names)} features", file=sys.stderr)
+
+    results, reference = [], None
+    for name, model in variants(args).items():
+        result, y_pred = bench_model(name, model, X_train, y_train, X_test, y_test, reference, args.repeat)
+        if reference is None:
+            # pierwszy wariant (ścieżka z notebooków) jest punktem odniesienia dla zgodności predykcji
+            reference = y_pred
+        results.append(result)
+
+    report = {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'sklearn': sklearn.__version__,
+            'n_reference': len(X_train),
+            'n_queries': len(X_test),
+            'n_features': len(names),
+            'config': vars(args),
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {len(results)} results to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+ACTIVITIES = {
+    # aktywność: (częstotliwość ruchu w Hz, amplituda akcelerometru w g, amplituda żyroskopu w deg/s)
+    'sitting': (0.2, 0.02, 2.0),
+    'walking': (1.8, 0.35, 60.0),
+    'running': (2.8, 0.9, 180.0),
+}
+
+
+def generate_imu_data(
+    n_subjects=4,
+    duration_s=120,
+    sampling_rate=25,
+    activities=tuple(ACTIVITIES),
+    jitter_ms=2.0,
+    drop_rate=0.01,
+    duplicate_rate=0.002,
+    start_ms=1_700_000_000_000,
+    seed=0,
+):
+    """
+    Generuje syntetyczne dane akcelerometru i żyroskopu dla wielu osób i aktywności.
+
+    Sygnał to grawitacja + sinusoidy o częstotliwości zależnej od aktywności + szum. Znaczniki czasu mają
+    losowe odchylenia (`jitter_ms`), część próbek jest usuwana (luki) lub duplikowana.
+
+    Zwraca:
+        pd.DataFrame: kolumny 'Timestamp' (int64 ms), 'Subject-id', 'Activity Label', ac_x..ac_z, g_x..g_z
+    """
+    rng = np.random.default_rng(seed)
+    n = int(duration_s * sampling_rate)
+    frames = []
+
+    for subject in range(n_subjects):
+        for activity in activities:
+            freq, acc_amp, gyr_amp = ACTIVITIES[activity]
+            t = np.arange(n) / sampling_rate
+            phase = rng.uniform(0, 2 * np.pi, size=6)
+            acc = acc_amp * np.sin(2 * np.pi * freq * t[:, None] + phase[:3]) + rng.normal(0, 0.02, (n, 3))
+            acc[:, 2] += 1.0
+            gyr = gyr_amp * np.sin(2 * np.pi * freq * t[:, None] + phase[3:]) + rng.normal(0, 1.0, (n, 3))
+            timestamps = start_ms + t * 1000 + rng.normal(0, jitter_ms, n)
+
+            keep = rng.random(n) >= drop_rate
+            rows = np.flatnonzero(keep)
+            rows = np.sort(np.concatenate([rows, rows[rng.random(len(rows)) < duplicate_rate]]))
+
+            frames.append(pd.DataFrame({
+                'Timestamp': timestamps[rows].astype(np.int64),
+                'Subject-id': f'subject_{subject}',
+                'Activity Label': activity,
+                'ac_x': acc[rows, 0], 'ac_y': acc[rows, 1], 'ac_z': acc[rows, 2],
+                'g_x': gyr[rows, 0], 'g_y': gyr[rows, 1], 'g_z': gyr[rows, 2],
+            }))
+            start_ms += int(duration_s * 1000) + 60_000
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def to_raw_export(df, seed=0):
+    """
+    Zamienia dane na postać surowego eksportu: liczby jako tekst zakończony ';', a znaczniki czasu jako tekst
+    z dodatkowymi cyframi (mikrosekundy), tak jak w plikach czyszczonych przez `TimeWindowSegmenter`.
+    """
+    rng = np.random.default_rng(seed)
+    raw = df.copy()
+    for col in ['ac_x', 'ac_y', 'ac_z', 'g_x', 'g_y', 'g_z']:
+        raw[col] = raw[col].map('{:.6f};'.format)
+    micros = rng.integers(0, 1000, len(raw))
+    raw['Timestamp'] = raw['Timestamp'].astype(str) + pd.Series(micros, index=raw.index).map('{:03d}'.format)
+    return raw
+
+
+def to_sensor_dump(df):
+    """
+    Zapisuje dane jako tekst w kształcie zrzutu `wynik.json` (jedna sesja na osobę, próbki w kolejności wierszy,
+    bez znaczników czasu). `sensor_dump` nadaje sesjom identyfikatory `person_<nr>` w kolejności osób.
+    """
+    sensors = []
+    for i, (_, group) in enumerate(df.groupby('Subject-id', sort=False)):
+        acc = group[['ac_x', 'ac_y', 'ac_z']].to_numpy().tolist()
+        gyr = group[['g_x', 'g_y', 'g_z']].to_numpy().tolist()
+        sensors.append({'id': i, 'samples': [
+            {'label': label, 'acceleration': a, 'gyroscope': g}
+            for label, a, g in zip(group['Activity Label'], acc, gyr)
+        ]})
+    return json.dumps({'total': len(df), 'sensors': sensors})
@@ -40,4 +40,48 @@ def calculate_binned_distribution_multi_axis(window, axes, bins=10, range_min=No
     distributions = {}
     for axis in axes:
         distributions[f"binned_{axis}"] = calculate_binned_distribution(window, column=axis, bins=bins, range_min=range_min, range_max=range_max)
-    return distributions
\ No newline at end of file
+    return distributions
+
+def calculate_binned_distribution_batch(windows, axes, bins=10, range_min=None, range_max=None):
+    """
+    Wsadowa wersja `calculate_binned_distribution_multi_axis`: histogramy wszystkich okien i osi
+    liczone jednym wywołaniem, z tymi samymi krawędziami przedziałów co `np.histogram`
+
+    Argumenty:
+        windows: Tensor okien (n_windows, n_samples, n_channels), gdzie kanał `i` odpowiada `axes[i]`
+        axes: Lista nazw osi kolejnych kanałów
+        bins: Liczba przedziałów
+        range_min: Minimalna wartość zakresu (domyślnie minimum w oknie)
+        range_max: Maksymalna wartość zakresu (domyślnie maksimum w oknie)
+
+    Zwraca:
+        (np.ndarray, list): macierz cech (n_windows, n_axes * bins) i nazwy kolumn `binned_{axis}_bin{i}`
+    """
+    if np.shape(windows)[2] != len(axes):
+        raise ValueError(f"Oczekiwano {len(axes)} kanałów ({axes}), otrzymano {np.shape(windows)[2]}.")
+
+    data = np.moveaxis(np.asarray(windows, dtype=np.float64), 1, 2)  # (n_windows, n_axes, n_samples)
+    n_windows, n_axes, _ = data.shape
+
+    first_edge = np.broadcast_to(np.nanmin(data, axis=2) if range_min is None else np.float64(range_min), (n_windows, n_axes))
+    last_edge = np.broadcast_to(np.nanmax(data, axis=2) if range_max is None else np.float64(range_max), (n_windows, n_axes))
+    # jak w np.histogram: pusty zakres rozszerzany o 0.5 w obie strony
+    empty_range = first_edge == last_edge
+    first_edge = np.where(empty_range, first_edge - 0.5, first_edge)[:, :, None]
+    last_edge = np.where(empty_range, last_edge + 0.5, last_edge)[:, :, None]
+    bin_edges = np.linspace(first_edge[..., 0], last_edge[..., 0], bins + 1, axis=2)
+
+    keep = (data >= first_edge) & (data <= last_edge)
+    indices = ((data - first_edge) / (last_edge - first_edge) * bins)
+    indices = np.where(keep, indices, 0).astype(np.intp)
+    indices[indices == bins] -= 1
+    # korekta indeksów w granicach ~1 ULP od krawędzi, tak jak w np.histogram
+    indices[data < np.take_along_axis(bin_edges, indices, axis=2)] -= 1
+    increment = (data >= np.take_along_axis(bin_edges, indices + 1, axis=2)) & (indices != bins - 1)
+    indices[increment] += 1
+
+    flat = (np.arange(n_windows * n_axes).reshape(n_windows, n_axes, 1) * bins + indices)[keep]
+    histograms = np.bincount(flat, minlength=n_windows * n_axes * bins).reshape(n_windows, n_axes * bins)
+
+    names = [f"binned_{axis}_bin{bin_id}" for axis in axes for bin_id in range(bins)]
+    return histograms, names
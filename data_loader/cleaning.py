@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+NUMBER_PATTERN = r'(?P<number>[-+]?\d*\.\d+|\d+)'
+TIMESTAMP_DIGITS = 13
+
+
+def _string_array(series):
+    return pa.array(series.astype(str), type=pa.large_string(), from_pandas=True)
+
+
+def _extract_numbers(series):
+    """Ścieżka tekstowa: usuwa ';' i wyciąga pierwszą liczbę z każdego napisu (jak `str.extract`)."""
+    text = pc.replace_substring(_string_array(series), ';', '')
+    numbers = pc.struct_field(pc.extract_regex(text, NUMBER_PATTERN), [0])
+    return pc.cast(numbers, pa.float64()).to_numpy(zero_copy_only=False)
+
+
+def clean_numeric_column(series):
+    """
+    Wektorowy odpowiednik `astype(str).str.replace(';').str.extract(...).astype(float)`.
+
+    Kolumny float64 i całkowite są obsługiwane bez konwersji na tekst (z zachowaniem tych samych
+    wyników, np. utraty znaku dla liczb całkowitych); wartości, których zapis tekstowy jest
+    w notacji naukowej, oraz kolumny tekstowe przechodzą przez jądra Arrow (RE2).
+
+    Zwraca:
+        (pd.Series, int): oczyszczona kolumna float64 i liczba odrzuconych (niepustych) wartości
+    """
+    if pd.api.types.is_integer_dtype(series.dtype):
+        values = np.abs(series.to_numpy(dtype=np.float64, na_value=np.nan))
+    elif series.dtype == np.float64:
+        values = series.to_numpy(dtype=np.float64, copy=True)
+        values[~np.isfinite(values)] = np.nan
+        magnitude = np.abs(values)
+        # repr() przechodzi na notację naukową poza [1e-4, 1e16)
+        scientific = ((magnitude < 1e-4) & (magnitude > 0)) | (magnitude >= 1e16)
+        if scientific.any():
+            values[scientific] = _extract_numbers(series[scientific])
+    else:
+        values = _extract_numbers(series)
+
+    rejected = int((series.notna().to_numpy() & np.isnan(values)).sum())
+    return pd.Series(values, index=series.index, name=series.name), rejected
+
+
+def parse_unix_timestamps(series):
+    """
+    Wektorowy odpowiednik parsowania znaczników czasu w `TimeWindowSegmenter._fix_unix_timestamp`:
+    z zapisu tekstowego zostają same cyfry, obcinane do 13 (milisekundy), a nieudane konwersje dają NaT.
+    Kolumny już typu datetime (np. zrzuty `wynik.json` z `sensor_dump`) są zwracane bez zmian – ich zapis
+    tekstowy ('1970-01-01 00:00:00.040') nie jest liczbą milisekund.
+
+    Zwraca:
+        (pd.Series, int): kolumna datetime i liczba odrzuconych (niepustych) wartości
+    """
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return series, 0
+    if pd.api.types.is_integer_dtype(series.dtype):
+        valid = series.notna().to_numpy()
+        millis = np.abs(series.to_numpy(dtype=np.int64, na_value=0))
+        # obcięcie do pierwszych 13 cyfr
+        limit = 10 ** TIMESTAMP_DIGITS
+        while (millis >= limit).any():
+            millis = np.where(millis >= limit, millis // 10, millis)
+    else:
+        digits = pc.replace_substring_regex(_string_array(series), r'\D', '')
+        digits = pc.utf8_slice_codeunits(digits, 0, TIMESTAMP_DIGITS)
+        digits = pc.cast(pc.if_else(pc.equal(pc.utf8_length(digits), 0), None, digits), pa.int64())
+        valid = pc.is_valid(digits).to_numpy(zero_copy_only=False)
+        millis = pc.fill_null(digits, 0).to_numpy()
+
+    timestamps = pd.to_datetime(pd.Series(millis, index=series.index, name=series.name), unit='ms', errors='coerce')
+    timestamps = timestamps.where(valid)
+    rejected = int((series.notna().to_numpy() & timestamps.isna().to_numpy()).sum())
+    return timestamps, rejected
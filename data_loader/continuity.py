@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+GAP_MODES = ('skip', 'split')
+
+
+def _timestamp_ticks(timestamps):
+    # czas jako int64 (ms dla SensorDataset.timestamps_ms, ns dla datetime), maska brakujących i liczba jednostek w 1 ms
+    if isinstance(timestamps, np.ndarray) and timestamps.dtype == np.int64:
+        # SensorDataset.timestamps_ms: NaT zapisany jako najmniejszy int64
+        return timestamps, timestamps == np.iinfo(np.int64).min, 1
+    ts = pd.Series(timestamps)
+    if not pd.api.types.is_datetime64_any_dtype(ts):
+        ts = pd.to_datetime(ts, unit='ms')
+    ns = ts.to_numpy(dtype='datetime64[ns]')
+    return ns.view(np.int64), np.isnat(ns), 1_000_000
+
+
+def timestamps_to_ms(timestamps):
+    """
+    Czas jako float64 milisekundy od epoki (NaN dla brakujących), z datetime albo liczb w ms.
+    """
+    ticks, missing, per_ms = _timestamp_ticks(timestamps)
+    # całe milisekundy dzielone na int64 (ns od epoki nie mieszczą się dokładnie we float64), reszta jako ułamek
+    millis = (ticks // per_ms).astype(np.float64) + (ticks % per_ms) / per_ms
+    return np.where(missing, np.nan, millis)
+
+
+def timestamp_deltas_ms(timestamps):
+    """
+    Odstępy między kolejnymi znacznikami czasu w ms (n_rows - 1,), NaN gdy brakuje któregoś z czasów.
+
+    Różnice liczone są na int64 (ns albo ms), a do float64 zamieniane są dopiero same odstępy: float64 ms od epoki
+    (~1.7e12) ma rozdzielczość ~0.2 µs, więc różnica `timestamps_to_ms` nie jest dokładna przy czasach z częścią
+    poniżej milisekundy.
+    """
+    ticks, missing, per_ms = _timestamp_ticks(timestamps)
+    deltas = np.diff(ticks).astype(np.float64) / per_ms
+    deltas[missing[1:] | missing[:-1]] = np.nan
+    return deltas
+
+
+def find_breaks(times_ms, offsets, sampling_rate_hz, allowed_deviation_ms=5, deltas_ms=None):
+    """
+    Indeks nieciągłości liczony raz dla wszystkich grup: `breaks[i]` jest True, gdy odstęp między wierszem
+    `i - 1` a `i` tej samej grupy różni się od `1000 / sampling_rate_hz` o więcej niż `allowed_deviation_ms`
+    (lub któryś z czasów jest pusty). Pierwszy wiersz grupy nigdy nie jest nieciągłością.
+
+    Argumenty:
+        times_ms: np.ndarray float (n_rows,) – czasy w ms, ułożone grupami
+        offsets: granice grup (n_groups + 1)
+        deltas_ms: opcjonalnie dokładne odstępy z `timestamp_deltas_ms` (domyślnie `np.diff(times_ms)`)
+    """
+    expected = 1000 / sampling_rate_hz
+    breaks = np.zeros(len(times_ms), dtype=bool)
+    deltas = np.diff(times_ms) if deltas_ms is None else deltas_ms
+    # NaN (brak czasu) też jest nieciągłością
+    breaks[1:] = ~(np.abs(deltas - expected) <= allowed_deviation_ms)
+    breaks[offsets[:-1][offsets[:-1] < len(breaks)]] = False
+    return breaks
+
+
+def window_starts(n_rows, window_len, step, first_start=0, breaks=None, mode='skip'):
+    """
+    Indeksy początków okien jednej grupy o `n_rows` wierszach.
+
+    Bez `breaks` to siatka `first_start, first_start + step, ...` (jak w `segment()`). Z `breaks` (maska
+    nieciągłości grupy z `find_breaks`):
+        'skip' – z tej samej siatki usuwane są okna, w których środku jest nieciągłość
+        'split' – grupa dzielona jest na ciągłe fragmenty, a każdy fragment ma własną siatkę okien
+
+    Każde okno sprawdzane jest w O(1) na podstawie sumy skumulowanej `breaks`.
+    """
+    if mode not in GAP_MODES:
+        raise ValueError(f"Unknown gap mode '{mode}'. Available: {GAP_MODES}")
+    if breaks is None or not breaks.any():
+        return np.arange(first_start, n_rows - window_len + 1, step, dtype=np.int64)
+
+    if mode == 'skip':
+        starts = np.arange(first_start, n_rows - window_len + 1, step, dtype=np.int64)
+        cumulative = np.cumsum(breaks)
+        # nieciągłości między wierszami start..start+window_len-1
+        crossing = cumulative[starts + window_len - 1] - cumulative[starts] > 0
+        return starts[~crossing]
+
+    segment_starts = np.concatenate(([0], np.flatnonzero(breaks)))
+    segment_ends = np.concatenate((segment_starts[1:], [n_rows]))
+    starts = [
+        begin + np.arange(first_start, end - begin - window_len + 1, step, dtype=np.int64)
+        for begin, end in zip(segment_starts, segment_ends)
+    ]
+    return np.concatenate(starts)
+
+
+def gap_summary(keys, times_ms, breaks, offsets, window_len, step, first_start, sampling_rate_hz, mode='skip',
+                deltas_ms=None):
+    """
+    Raport nieciągłości dla każdej grupy (osoba, aktywność); `deltas_ms` jak w `find_breaks`.
+
+    Zwraca:
+        pd.DataFrame: kolumny subject, activity, rows, gaps, max_gap_ms, lost_ms (czas ponad oczekiwany odstęp
+        w nieciągłościach), windows (okna bez filtrowania) i windows_kept (okna po filtrowaniu w trybie `mode`)
+    """
+    n_groups = len(keys)
+    lengths = np.diff(offsets)
+    group = np.repeat(np.arange(n_groups), lengths)
+    deltas = np.zeros(len(times_ms))
+    deltas[1:] = np.diff(times_ms) if deltas_ms is None else deltas_ms
+    gap_deltas = np.where(breaks, np.nan_to_num(deltas, nan=0.0), 0.0)
+    expected = 1000 / sampling_rate_hz
+
+    max_gap = np.zeros(n_groups)
+    np.maximum.at(max_gap, group[breaks], gap_deltas[breaks])
+    windows = [len(window_starts(n, window_len, step, first_start)) for n in lengths]
+    kept = [
+        len(window_starts(end - start, window_len, step, first_start, breaks[start:end], mode))
+        for start, end in zip(offsets[:-1], offsets[1:])
+    ]
+    return pd.DataFrame({
+        'subject': [pid for pid, _ in keys],
+        'activity': [act for _, act in keys],
+        'rows': lengths,
+        'gaps': np.bincount(group[breaks], minlength=n_groups),
+        'max_gap_ms': max_gap,
+        'lost_ms': np.bincount(group, np.maximum(gap_deltas - expected, 0) * breaks, minlength=n_groups),
+        'windows': windows,
+        'windows_kept': kept,
+    })
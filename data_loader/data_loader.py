@@ -1,6 +1,29 @@
+import os
+
+import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 from tqdm import tqdm
 
+try:
+    from . import cleaning, continuity, profiling, resampling
+    from .dataset import SensorDataset
+    from .resample_cache import ResampleCache
+except ImportError:  # uruchamiane bezpośrednio z katalogu data_loader (np. freq_params.ipynb)
+    import cleaning
+    import continuity
+    import profiling
+    import resampling
+    from dataset import SensorDataset
+    from resample_cache import ResampleCache
+
+
+def _n_rows(segmenter, *args, **kwargs):
+    # liczba wierszy wejścia etapu dla profiling.instrumented
+    if segmenter.dataset is not None:
+        return len(segmenter.dataset)
+    return len(segmenter._df) if segmenter._df is not None else 0
+
 
 class TimeWindowSegmenter:
     def __init__(
@@ -15,7 +38,10 @@ class TimeWindowSegmenter:
         clean_columns=True,
         fix_timestamps=True,
         acc_columns=('ac_x', 'ac_y', 'ac_z'),
-        gyr_columns=('g_x', 'g_y', 'g_z')
+        gyr_columns=('g_x', 'g_y', 'g_z'),
+        allowed_deviation_ms=None,
+        gap_mode='skip',
+        resample_cache=None
     ):
         self.window_size = window_size  # in seconds
         self.step_size = step_size      # in seconds
@@ -25,7 +51,26 @@ class TimeWindowSegmenter:
         self.acc_columns = acc_columns
         self.gyr_columns = gyr_columns
         self.sampling_rate = source_sampling_rate
-        if df_path:
+        # okna przechodzące przez nieciągłości czasu większe niż allowed_deviation_ms są pomijane ('skip')
+        # albo grupa jest dzielona na ciągłe fragmenty ('split'); None wyłącza sprawdzanie
+        if gap_mode not in continuity.GAP_MODES:
+            raise ValueError(f"Unknown gap mode '{gap_mode}'. Available: {continuity.GAP_MODES}")
+        self.allowed_deviation_ms = allowed_deviation_ms
+        self.gap_mode = gap_mode
+        self.resampled_rate = None  # docelowa częstotliwość ostatniego resample_to
+        # katalog albo ResampleCache: wyniki resample_to zapisywane na dysku i używane ponownie między sesjami
+        if isinstance(resample_cache, (str, os.PathLike)):
+            resample_cache = ResampleCache(resample_cache)
+        self.resample_cache = resample_cache
+        self.df_path = df_path
+        self.rejected_values = {}  # kolumna -> liczba wartości odrzuconych przy czyszczeniu
+        self.dataset = None
+        self._df = None
+        if df_path and SensorDataset.is_dataset(df_path):
+            # katalog z SensorDataset.save: dane są już oczyszczone, tablice mapowane z dysku
+            self.dataset = SensorDataset.load(df_path)
+            clean_columns = fix_timestamps = False
+        elif df_path:
             self.df = pd.read_parquet(df_path, engine="pyarrow")
 
         if clean_columns:
@@ -34,72 +79,143 @@ class TimeWindowSegmenter:
         if fix_timestamps:
             self._fix_timestamps()
 
+    @property
+    def df(self):
+        # dane trzymane jako SensorDataset są zamieniane na DataFrame dopiero przy pierwszym odwołaniu
+        if self._df is None and self.dataset is not None:
+            self._df = self.dataset.to_dataframe()
+            self.dataset = None
+        return self._df
+
+    @df.setter
+    def df(self, value):
+        self._df = value
+        self.dataset = None
+
+    def channel_columns(self):
+        """Sensor columns (acc + gyr) present in the data."""
+        available = self.dataset.channel_names if self.dataset is not None else self._df.columns
+        return [col for col in list(self.acc_columns) + list(self.gyr_columns) if col in available]
+
+    @profiling.instrumented(rows=_n_rows)
+    def to_dataset(self):
+        """
+        Columnar copy of the data (see `SensorDataset`): float32 channels, int32 subject/activity codes,
+        int64 ms timestamps and group offsets.
+
+        usage:
+        ```python
+            segmenter.to_dataset().save('processed/wsidm')
+        ```
+        """
+        if self.dataset is not None:
+            return self.dataset
+        return SensorDataset.from_dataframe(
+            self._df,
+            channel_names=self.channel_columns(),
+            time_column=self.time_column,
+            id_column=self.id_column,
+            activity_column=self.activity_column,
+            sampling_rate=self.resampled_rate or self.sampling_rate,
+        )
+
+    @profiling.instrumented(rows=_n_rows)
     def _clean_columns(self):
         for col in list(self.acc_columns) + list(self.gyr_columns):
             if col in self.df.columns:
-                self.df[col] = (
-                    self.df[col]
-                    .astype(str)
-                    .str.replace(';', '', regex=False)
-                    .str.extract(r'([-+]?\d*\.\d+|\d+)')[0]  # tylko liczba
-                    .astype(float)
-                )
+                self.df[col], self.rejected_values[col] = cleaning.clean_numeric_column(self.df[col])
 
     def _fix_unix_timestamp(self, timestamp_series):
-        ts_str = timestamp_series.astype(str).str.replace(r'\D', '', regex=True)
-
-        def safe_convert(ts):
-            try:
-                ts_int = int(str(ts)[:13])
-                return pd.to_datetime(ts_int, unit='ms')
-            except Exception:
-                return pd.NaT
-
-        return ts_str.apply(safe_convert)
+        timestamps, self.rejected_values[timestamp_series.name] = cleaning.parse_unix_timestamps(timestamp_series)
+        return timestamps
 
+    @profiling.instrumented(rows=_n_rows)
     def _fix_timestamps(self):
         print("Fixing timestamps...")
         self.df[self.time_column] = self._fix_unix_timestamp(self.df[self.time_column])
+        if self.rejected_values.get(self.time_column):
+            print(f"Rejected {self.rejected_values[self.time_column]} timestamps.")
         self.df.sort_values(by=[self.id_column, self.activity_column, self.time_column], inplace=True)
         print("Done fixing timestamps.")
 
 
-    def resample_to(self, target_rate_hz):
+    @profiling.instrumented(rows=_n_rows)
+    def resample_to(self, target_rate_hz, method='mean'):
         """
         Resamples the data to a new frequency (Hz) using time-based resampling.
         Handles missing time intervals by filling gaps before resampling.
+
+        All (subject, activity) groups are processed at once on integer-ms timestamps
+        (see `resampling.resample_groups`), so the cost is linear in the number of rows.
+        Data held as a `SensorDataset` is resampled without building a DataFrame.
+
+        With `resample_cache` set, or with `method='polyphase'` (anti-aliased `scipy.signal.resample_poly`
+        instead of bin means), the data is converted to a `SensorDataset` first, so only the sensor
+        channels are kept. The cache stores the gap-filled source grid once and derives every target
+        rate from it; results are reused across sessions for the same data (see `ResampleCache`).
+
+        usage:
+        ```python
+            segmenter = TimeWindowSegmenter(df_path=path, source_sampling_rate=50, resample_cache='resample_cache')
+            segmenter.resample_to(25)
+        ```
         """
-        grouped = self.df.groupby([self.id_column, self.activity_column])
+        if method not in resampling.RESAMPLE_METHODS:
+            raise ValueError(f"Unknown resampling method '{method}'. Available: {resampling.RESAMPLE_METHODS}")
+        if self.resample_cache is not None or method != 'mean':
+            dataset = self.to_dataset()
+            if self.resample_cache is not None:
+                resampled = self.resample_cache.resample(dataset, target_rate_hz, self.sampling_rate, method=method)
+            else:
+                resampled = dataset.resample(target_rate_hz, source_rate_hz=self.sampling_rate, method=method)
+            self._df = None
+            self.dataset = resampled
+            self.resampled_rate = target_rate_hz
+            return
+
+        if self.dataset is not None:
+            self.dataset = self.dataset.resample(target_rate_hz, source_rate_hz=self.sampling_rate)
+            self.resampled_rate = target_rate_hz
+            return
+
         period_ms = int(1000 / self.sampling_rate)
         target_period_ms = int(1000 / target_rate_hz)
-        resampled_df = pd.DataFrame()
-
-        for (pid, act), group in tqdm(grouped, desc="Resampling"):
-            group[self.id_column] = pid
-            group[self.activity_column] = act
-            group[self.time_column] = pd.to_datetime(group[self.time_column], unit='ms')
-            group[self.time_column] = group[self.time_column].dt.round(f'{period_ms}ms')
-            group = group.set_index(self.time_column).sort_index()
-            group = group[~group.index.duplicated(keep='first')]
-            ideal_index = pd.date_range(start=group.index.min(), end=group.index.max(), freq=f"{period_ms}ms")
-            group = group.reindex(ideal_index)
-            numeric_cols = group.select_dtypes(include='number').columns
-            const_cols = [self.id_column, self.activity_column]
-            group[numeric_cols] = group[numeric_cols].interpolate(method='linear')
-            group[const_cols] = group[const_cols].ffill().bfill()
-            group = group.reset_index().rename(columns={'index': self.time_column})
-            group[self.time_column] = pd.to_datetime(group[self.time_column], unit='ms')
-            group = group.set_index(self.time_column)
-            numeric_cols = group.select_dtypes(include='number').columns
-            group_resampled = group[numeric_cols].resample(f"{target_period_ms}ms").mean()
-            for col in const_cols:
-                group_resampled[col] = group[col].resample(f"{target_period_ms}ms").ffill()
-            group_resampled = group_resampled.reset_index()
-            resampled_df = pd.concat([resampled_df, group_resampled])
+        const_cols = [self.id_column, self.activity_column]
+        numeric_cols = [
+            col for col in self.df.select_dtypes(include='number').columns
+            if col != self.time_column
+        ]
+
+        # kody grup w kolejności groupby (wiersze z brakującą osobą/aktywnością dostają -1)
+        codes = self.df.groupby(const_cols, sort=True).ngroup().fillna(-1).to_numpy(dtype=np.int64)
+        times_ms, valid = resampling.to_epoch_ms(self.df[self.time_column], period_ms)
+        rows = np.flatnonzero(valid & (codes >= 0))
+        order = rows[resampling.sort_and_deduplicate(codes[rows], times_ms[rows])]
+        sorted_codes = codes[order]
+
+        out_codes, out_times, out_values, before_start = resampling.resample_groups(
+            group_codes=sorted_codes,
+            times_ms=times_ms[order],
+            values=self.df[numeric_cols].to_numpy(dtype=np.float64)[order],
+            source_period_ms=period_ms,
+            target_period_ms=target_period_ms,
+        )
+
+        # wartości stałe (osoba, aktywność) z pierwszego wiersza każdej grupy; jak przy
+        # resample(...).ffill() przedział zaczynający się przed pierwszą próbką zostaje pusty
+        group_starts = resampling.group_offsets(sorted_codes)[:-1]
+        group_pos = np.searchsorted(sorted_codes[group_starts], out_codes)
+        resampled_df = pd.DataFrame(out_values, columns=numeric_cols)
+        resampled_df.insert(0, self.time_column, pd.to_datetime(out_times, unit='ms'))
+        for col in const_cols:
+            const_values = pd.Series(self.df[col].to_numpy()[order[group_starts]][group_pos])
+            resampled_df[col] = const_values.mask(before_start)
 
         self.df = resampled_df
         self.df = self.df.reset_index(drop=True)
+        self.resampled_rate = target_rate_hz
 
+    @profiling.instrumented(rows=_n_rows, windows=lambda window: 1)
     def segment(self):
         """
         usage: 
@@ -113,6 +229,16 @@ class TimeWindowSegmenter:
         """
         grouped = self.df.groupby([self.id_column, self.activity_column])
 
+        if self.allowed_deviation_ms is not None:
+            window_len = self.window_size * self.sampling_rate
+            starts = self.group_window_starts()
+            for (_, group), group_starts in tqdm(zip(grouped, starts), total=len(grouped), desc="Segmenting"):
+                # jak okna z rolling(on=...): kolumna czasu jako indeks
+                group = group.set_index(self.time_column)
+                for start in group_starts:
+                    yield group.iloc[start:start + window_len]
+            return
+
         for (_, _), group in tqdm(grouped, total=len(grouped), desc="Segmenting"):
             for window in group.rolling(window=self.window_size*self.sampling_rate, step=self.step_size*self.sampling_rate, on=self.time_column):
                 if window.shape[0] != self.window_size * self.sampling_rate:
@@ -120,6 +246,179 @@ class TimeWindowSegmenter:
                 yield window
 
 
+    def _window_params(self):
+        """Window length, step and offset of the first full window (in samples), as in `segment()`."""
+        window_len = self.window_size * self.sampling_rate
+        step = self.step_size * self.sampling_rate
+        # rolling(step=...) kończy okna na indeksach 0, step, 2*step, ...; pełne są te, które
+        # kończą się najwcześniej na indeksie window_len - 1
+        first_start = -(-(window_len - 1) // step) * step - (window_len - 1)
+        return window_len, step, first_start
+
+    @profiling.instrumented(rows=_n_rows, windows=lambda item: len(item[3]))
+    def segment_arrays(self, columns=None, dtype=np.float32):
+        """
+        Array counterpart of `segment()` that never builds per-window DataFrames.
+
+        usage:
+        ```python
+            for pid, act, block, windows in TimeWindowSegmenter.segment_arrays():
+                print(pid, act, windows.shape)
+        ```
+
+        Args:
+            columns: sensor columns to stack as channels (default: acc_columns + gyr_columns)
+            dtype: dtype of the channel block
+
+        Yields:
+            tuple: (subject, activity, block, windows) where `block` is the contiguous
+            (n_samples, n_channels) array of the group and `windows` is a read-only
+            (n_windows, window_len, n_channels) view on it, with the same windows as `segment()`
+            (a copy when windows crossing time gaps are filtered out)
+        """
+        window_len, step, first_start = self._window_params()
+        keys, blocks, offsets = self.group_blocks(columns=columns, dtype=dtype)
+        starts = self.group_window_starts()
+
+        for i, ((pid, act), start, end) in enumerate(
+            tqdm(zip(keys, offsets[:-1], offsets[1:]), total=len(keys), desc="Segmenting")
+        ):
+            block = blocks[start:end]
+            group_starts = starts[i] if starts is not None else None
+            yield pid, act, block, sliding_windows(block, window_len, step, first_start, starts=group_starts)
+
+    @profiling.instrumented(rows=_n_rows)
+    def gap_index(self):
+        """
+        Time-gap index of all groups, computed once from timestamp deltas (see `continuity.find_breaks`).
+
+        Returns:
+            tuple: (keys, times_ms, breaks, offsets) in `group_blocks` order, where `breaks[i]` marks
+            a gap between rows `i - 1` and `i` larger than `allowed_deviation_ms` (default 5 ms)
+        """
+        keys, times_ms, _, breaks, offsets = self._gap_arrays()
+        return keys, times_ms, breaks, offsets
+
+    def _gap_arrays(self):
+        if self.dataset is not None:
+            keys, offsets = self.dataset.group_keys, self.dataset.offsets
+            timestamps = np.asarray(self.dataset.timestamps_ms)
+        else:
+            keys, order, offsets = self._group_order()
+            timestamps = self.df[self.time_column].to_numpy()[order]
+        times_ms = continuity.timestamps_to_ms(timestamps)
+        # odstępy liczone na int64, bez błędu zaokrągleń float64 ms od epoki
+        deltas_ms = continuity.timestamp_deltas_ms(timestamps)
+        # po resample_to znaczniki czasu są w docelowej częstotliwości
+        rate = self.resampled_rate or self.sampling_rate
+        allowed = self.allowed_deviation_ms if self.allowed_deviation_ms is not None else 5
+        breaks = continuity.find_breaks(times_ms, offsets, rate, allowed, deltas_ms=deltas_ms)
+        return keys, times_ms, deltas_ms, breaks, offsets
+
+    def group_window_starts(self):
+        """
+        Window start rows of every group (in `group_blocks` order) after filtering windows that cross
+        time gaps according to `gap_mode`, or None when `allowed_deviation_ms` is None.
+        """
+        if self.allowed_deviation_ms is None:
+            return None
+        window_len, step, first_start = self._window_params()
+        _, _, breaks, offsets = self.gap_index()
+        return [
+            continuity.window_starts(end - start, window_len, step, first_start, breaks[start:end], self.gap_mode)
+            for start, end in zip(offsets[:-1], offsets[1:])
+        ]
+
+    def gap_report(self):
+        """
+        Summary of time gaps per (subject, activity): number of gaps, largest gap, time lost in gaps
+        and how many windows `gap_mode` keeps.
+
+        usage:
+        ```python
+            report = TimeWindowSegmenter.gap_report()
+            print(report.sort_values('gaps', ascending=False).head())
+        ```
+        """
+        window_len, step, first_start = self._window_params()
+        keys, times_ms, deltas_ms, breaks, offsets = self._gap_arrays()
+        return continuity.gap_summary(
+            keys, times_ms, breaks, offsets, window_len, step, first_start,
+            self.resampled_rate or self.sampling_rate, mode=self.gap_mode, deltas_ms=deltas_ms,
+        )
+
+    @profiling.instrumented(rows=_n_rows)
+    def group_blocks(self, columns=None, dtype=np.float32):
+        """
+        Stacks the sensor channels of all (subject, activity) groups into one contiguous array.
+
+        Returns:
+            tuple: (keys, blocks, offsets) - (subject, activity) pairs in groupby order, the
+            (n_rows, n_channels) array and row offsets such that group `i` is `blocks[offsets[i]:offsets[i + 1]]`
+        """
+        if columns is None:
+            columns = self.channel_columns()
+        if self.dataset is not None:
+            return self._dataset_blocks(columns, dtype)
+        keys, order, offsets = self._group_order()
+        blocks = self.df[list(columns)].to_numpy(dtype=dtype)[order]
+        return keys, blocks, offsets
+
+    def _group_order(self):
+        # wiersze ułożone grupami w kolejności groupby (stabilnie w obrębie grupy), bez wierszy z brakami klucza
+        group_cols = [self.id_column, self.activity_column]
+        codes = self.df.groupby(group_cols, sort=True).ngroup().fillna(-1).to_numpy(dtype=np.int64)
+        order = np.argsort(codes, kind='stable')
+        order = order[codes[order] >= 0]
+        offsets = resampling.group_offsets(codes[order])
+        keys = [tuple(key) for key in self.df[group_cols].to_numpy()[order[offsets[:-1]]]]
+        return keys, order, offsets
+
+    def _dataset_blocks(self, columns, dtype):
+        dataset = self.dataset
+        indices = [dataset.channel_names.index(col) for col in columns]
+        blocks = dataset.channels
+        if indices != list(range(len(dataset.channel_names))):
+            blocks = blocks[:, indices]
+        # bez kopii, gdy kanały i typ się zgadzają (np. memmap z SensorDataset.load)
+        blocks = blocks.astype(dtype, copy=False)
+        return dataset.group_keys, blocks, dataset.offsets
+
+    @profiling.instrumented(rows=_n_rows, windows=lambda out: len(out[0]))
+    def as_tensor(self, columns=None, dtype=np.float32):
+        """
+        Stacks all windows from `segment_arrays()` into one tensor, e.g. as LSTM input.
+
+        Returns:
+            tuple: (X, labels, subjects) - X of shape (n_windows, window_len, n_channels)
+            and per-window activity labels and subject ids
+        """
+        tensors, labels, subjects = [], [], []
+        for pid, act, _, windows in self.segment_arrays(columns=columns, dtype=dtype):
+            tensors.append(windows)
+            labels.append(np.full(len(windows), act, dtype=object))
+            subjects.append(np.full(len(windows), pid, dtype=object))
+
+        if not tensors:
+            n_channels = len(columns) if columns is not None else len(self.acc_columns) + len(self.gyr_columns)
+            window_len, _, _ = self._window_params()
+            return np.empty((0, window_len, n_channels), dtype=dtype), np.empty(0, dtype=object), np.empty(0, dtype=object)
+        return np.concatenate(tensors), np.concatenate(labels), np.concatenate(subjects)
+
+
+def sliding_windows(block, window_len, step, first_start=0, starts=None):
+    """
+    Read-only (n_windows, window_len, n_channels) view of `block` (n_samples, n_channels)
+    with windows starting at `first_start`, `first_start + step`, ... or, if given, at rows `starts`
+    (then the result is a copy).
+    """
+    if len(block) < window_len or (starts is not None and len(starts) == 0):
+        return np.empty((0, window_len) + block.shape[1:], dtype=block.dtype)
+    view = sliding_window_view(block, window_len, axis=0)
+    windows = view[first_start::step] if starts is None else view[starts]
+    return windows.transpose(0, 2, 1)
+
+
 def check_time_continuity(df, sampling_rate_hz, allowed_deviation_ms=5, timestamp_col='timestamp', silent=False):
     """
     Sprawdza czy próbki są równomiernie rozstawione zgodnie z oczekiwanym sampling rate.
@@ -0,0 +1,282 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    from . import profiling, resampling
+except ImportError:  # uruchamiane bezpośrednio z katalogu data_loader (np. freq_params.ipynb)
+    import profiling
+    import resampling
+
+DATASET_VERSION = 1
+
+# int64 odpowiadający NaT w tablicach datetime64
+NAT_MS = np.iinfo(np.int64).min
+
+_ARRAYS = ['channels', 'timestamps_ms', 'subject_codes', 'activity_codes']
+
+
+def _encode(values):
+    """Kody int32 i posortowana tabela wartości (jak w groupby(sort=True)); brakom odpowiada kod -1."""
+    values = pd.Series(values)
+    codes, uniques = pd.factorize(values, sort=True, use_na_sentinel=True)
+    return codes.astype(np.int32), np.asarray(uniques, dtype=object)
+
+
+def _json_list(values):
+    return [value.item() if isinstance(value, np.generic) else value for value in values]
+
+
+class SensorDataset:
+    """
+    Kolumnowa reprezentacja danych czujników bez DataFrame.
+
+    - `channels`: float32 (n_rows, n_channels), kanały w kolejności `channel_names`
+    - `timestamps_ms`: int64 ms od epoki (`NAT_MS` dla brakujących)
+    - `subject_codes`, `activity_codes`: int32 indeksy w tablicach `subjects` i `activities`
+    - `offsets`: granice grup (osoba, aktywność) – grupa `i` to wiersze `offsets[i]:offsets[i + 1]`
+
+    Wiersze są ułożone grupami w kolejności `groupby([osoba, aktywność], sort=True)`, a w obrębie grupy zachowują
+    kolejność z DataFrame, więc bloki grup są takie same jak w `TimeWindowSegmenter.group_blocks`.
+    `save` zapisuje katalog z plikami `.npy`, które `load` otwiera jako memmapy (bez kopiowania do pamięci).
+
+    usage:
+    ```python
+        dataset = segmenter.to_dataset()
+        dataset.save('processed/wsidm_25hz')
+        segmenter = TimeWindowSegmenter(df_path='processed/wsidm_25hz', source_sampling_rate=25)
+    ```
+    """
+
+    def __init__(
+        self,
+        channels,
+        timestamps_ms,
+        subject_codes,
+        activity_codes,
+        subjects,
+        activities,
+        channel_names,
+        sampling_rate=None,
+        time_column='Timestamp',
+        id_column='Subject-id',
+        activity_column='Activity Label',
+        source_fingerprint=None,
+    ):
+        self.channels = channels
+        self.timestamps_ms = timestamps_ms
+        self.subject_codes = subject_codes
+        self.activity_codes = activity_codes
+        self.subjects = np.asarray(subjects, dtype=object)
+        self.activities = np.asarray(activities, dtype=object)
+        self.channel_names = list(channel_names)
+        self.sampling_rate = sampling_rate
+        self.time_column = time_column
+        self.id_column = id_column
+        self.activity_column = activity_column
+        self.source_fingerprint = source_fingerprint  # skrót danych, z których powstał zbiór (np. z `save`)
+
+        group_codes = subject_codes.astype(np.int64) * max(len(self.activities), 1) + activity_codes
+        if len(group_codes) and np.any(np.diff(group_codes) < 0):
+            raise ValueError("Rows must be ordered by (subject, activity) groups.")
+        self.offsets = resampling.group_offsets(group_codes)
+
+    def __len__(self):
+        return len(self.channels)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in _ARRAYS) + self.offsets.nbytes
+
+    @property
+    def group_keys(self):
+        """Pary (osoba, aktywność) kolejnych grup."""
+        starts = self.offsets[:-1]
+        return list(zip(self.subjects[self.subject_codes[starts]], self.activities[self.activity_codes[starts]]))
+
+    @classmethod
+    @profiling.instrumented(rows=lambda cls, df, *args, **kwargs: len(df))
+    def from_dataframe(
+        cls,
+        df,
+        channel_names,
+        time_column='Timestamp',
+        id_column='Subject-id',
+        activity_column='Activity Label',
+        sampling_rate=None,
+    ):
+        """
+        Buduje zbiór z DataFrame segmentera. Wiersze bez osoby lub aktywności są pomijane
+        (jak w `groupby`), a inne kolumny niż czas, osoba, aktywność i `channel_names` nie są przenoszone.
+        """
+        subject_codes, subjects = _encode(df[id_column].to_numpy())
+        activity_codes, activities = _encode(df[activity_column].to_numpy())
+        group_codes = subject_codes.astype(np.int64) * max(len(activities), 1) + activity_codes
+        order = np.argsort(group_codes, kind='stable')
+        order = order[(subject_codes[order] >= 0) & (activity_codes[order] >= 0)]
+
+        timestamps = df[time_column]
+        if not pd.api.types.is_datetime64_any_dtype(timestamps):
+            timestamps = pd.to_datetime(timestamps, unit='ms')
+        timestamps_ms = timestamps.to_numpy(dtype='datetime64[ms]').view(np.int64)
+
+        return cls(
+            channels=np.ascontiguousarray(df[list(channel_names)].to_numpy(dtype=np.float32)[order]),
+            timestamps_ms=timestamps_ms[order],
+            subject_codes=subject_codes[order],
+            activity_codes=activity_codes[order],
+            subjects=subjects,
+            activities=activities,
+            channel_names=channel_names,
+            sampling_rate=sampling_rate,
+            time_column=time_column,
+            id_column=id_column,
+            activity_column=activity_column,
+        )
+
+    def to_dataframe(self):
+        """DataFrame w układzie `TimeWindowSegmenter.df` (czas, kanały, osoba, aktywność)."""
+        df = pd.DataFrame(np.asarray(self.channels), columns=self.channel_names)
+        df.insert(0, self.time_column, pd.to_datetime(np.asarray(self.timestamps_ms).view('datetime64[ms]')))
+        df[self.id_column] = self.subjects[self.subject_codes]
+        df[self.activity_column] = self.activities[self.activity_codes]
+        return df
+
+    def groups(self):
+        """Iteruje po grupach: (osoba, aktywność, blok kanałów (n_samples, n_channels))."""
+        for (pid, act), start, end in zip(self.group_keys, self.offsets[:-1], self.offsets[1:]):
+            yield pid, act, self.channels[start:end]
+
+    def _grid(self, source_rate_hz):
+        # wiersze posortowane po (grupa, czas) bez duplikatów, rozłożone na pełną siatkę z uzupełnionymi lukami
+        source_rate_hz = source_rate_hz or self.sampling_rate
+        if source_rate_hz is None:
+            raise ValueError("Unknown source sampling rate; pass source_rate_hz.")
+        period_ms = int(1000 / source_rate_hz)
+
+        codes = np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets))
+        timestamps = np.asarray(self.timestamps_ms)
+        rows = np.flatnonzero(timestamps != NAT_MS)
+        times_ms = np.zeros(len(timestamps), dtype=np.int64)
+        times_ms[rows], _ = resampling.to_epoch_ms(timestamps[rows], period_ms)
+        order = rows[resampling.sort_and_deduplicate(codes[rows], times_ms[rows])]
+        grid = resampling.fill_grid(codes[order], times_ms[order], self.channels[order], period_ms)
+        return grid, period_ms
+
+    def _from_groups(self, group_index, times_ms, values, sampling_rate):
+        # group_index: indeks grupy (offsets) każdego wiersza wyniku
+        starts = self.offsets[:-1]
+        return SensorDataset(
+            channels=values.astype(np.float32),
+            timestamps_ms=times_ms,
+            subject_codes=self.subject_codes[starts][group_index],
+            activity_codes=self.activity_codes[starts][group_index],
+            subjects=self.subjects,
+            activities=self.activities,
+            channel_names=self.channel_names,
+            sampling_rate=sampling_rate,
+            time_column=self.time_column,
+            id_column=self.id_column,
+            activity_column=self.activity_column,
+            source_fingerprint=self.source_fingerprint,
+        )
+
+    @profiling.instrumented(rows=lambda self, *args, **kwargs: len(self))
+    def fill_grid(self, source_rate_hz=None):
+        """
+        Zbiór na pełnej siatce częstotliwości źródłowej: zduplikowane znaczniki czasu są usuwane, a luki
+        interpolowane liniowo jak w `resample_to`. Przepróbkowanie takiego zbioru daje ten sam wynik co
+        przepróbkowanie danych surowych, więc `ResampleCache` trzyma go jako bazę dla wszystkich częstotliwości.
+        """
+        (codes, times_ms, values, _), _ = self._grid(source_rate_hz)
+        return self._from_groups(codes, times_ms, values, source_rate_hz or self.sampling_rate)
+
+    @profiling.instrumented(rows=lambda self, *args, **kwargs: len(self))
+    def resample(self, target_rate_hz, source_rate_hz=None, method='mean'):
+        """
+        Przepróbkowuje wszystkie grupy jak `TimeWindowSegmenter.resample_to`, ale bez DataFrame.
+
+        Metody:
+            'mean' – średnie w przedziałach docelowych, jak `resample_to`; przedziały zaczynające się przed
+                pierwszą próbką grupy (tam `resample_to` zostawia pustą osobę i aktywność, więc nie należą
+                do żadnej grupy) są pomijane
+            'polyphase' – filtr polifazowy z antyaliasingiem (`resampling.polyphase_groups`)
+        """
+        if method not in resampling.RESAMPLE_METHODS:
+            raise ValueError(f"Unknown resampling method '{method}'. Available: {resampling.RESAMPLE_METHODS}")
+        grid, period_ms = self._grid(source_rate_hz)
+        target_period_ms = int(1000 / target_rate_hz)
+        if method == 'mean':
+            codes, times_ms, values, before_start = resampling.bin_means(*grid, target_period_ms)
+        else:
+            codes, times_ms, values, before_start = resampling.polyphase_groups(*grid, period_ms, target_period_ms)
+        keep = ~before_start
+        return self._from_groups(codes[keep], times_ms[keep], values[keep], target_rate_hz)
+
+    def content_fingerprint(self):
+        h = hashlib.blake2b(digest_size=16)
+        for name in _ARRAYS:
+            array = np.ascontiguousarray(getattr(self, name))
+            h.update(f'{name}:{array.dtype.str}:{array.shape}'.encode())
+            h.update(array.tobytes())
+        h.update(json.dumps([_json_list(self.subjects), _json_list(self.activities), self.channel_names]).encode())
+        return h.hexdigest()
+
+    @profiling.instrumented(rows=lambda self, *args, **kwargs: len(self))
+    def save(self, path):
+        """
+        Zapisuje zbiór do katalogu `path` (pliki `.npy` + `meta.json`). `meta.json` jest zapisywany na końcu,
+        więc przerwany zapis nie zostawia katalogu, który dałoby się wczytać.
+        """
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, 'meta.json')
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        for name in _ARRAYS:
+            np.save(os.path.join(path, f'{name}.npy'), np.ascontiguousarray(getattr(self, name)))
+
+        fingerprint = self.content_fingerprint()
+        meta = {
+            'version': DATASET_VERSION,
+            'rows': len(self),
+            'channel_names': self.channel_names,
+            'subjects': _json_list(self.subjects),
+            'activities': _json_list(self.activities),
+            'sampling_rate': self.sampling_rate,
+            'time_column': self.time_column,
+            'id_column': self.id_column,
+            'activity_column': self.activity_column,
+            'fingerprint': fingerprint,
+        }
+        with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(meta_path + '.tmp', meta_path)
+        self.source_fingerprint = fingerprint
+
+    @classmethod
+    @profiling.instrumented()
+    def load(cls, path, mmap_mode='r'):
+        """Otwiera zbiór zapisany przez `save`; przy `mmap_mode='r'` tablice są mapowane z dysku tylko do odczytu."""
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != DATASET_VERSION:
+            raise ValueError(f"Unsupported dataset version {meta.get('version')} in '{path}'.")
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode) for name in _ARRAYS}
+        return cls(
+            **arrays,
+            subjects=np.array(meta['subjects'], dtype=object),
+            activities=np.array(meta['activities'], dtype=object),
+            channel_names=meta['channel_names'],
+            sampling_rate=meta['sampling_rate'],
+            time_column=meta['time_column'],
+            id_column=meta['id_column'],
+            activity_column=meta['activity_column'],
+            source_fingerprint=meta['fingerprint'],
+        )
+
+    @staticmethod
+    def is_dataset(path):
+        return os.path.isdir(path) and os.path.exists(os.path.join(path, 'meta.json'))
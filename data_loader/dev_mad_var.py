@@ -38,4 +38,31 @@ def calculate_statistics_multi_axis(window, axes):
             continue
 
         stats[f"std_{axis}"], stats[f"abs_{axis}"], stats[f"var_{axis}"] = calculate_statistics(window, axis)
-    return stats
\ No newline at end of file
+    return stats
+
+def calculate_statistics_batch(windows, axes):
+    """
+    Wsadowa wersja `calculate_statistics_multi_axis` dla wielu okien naraz
+
+    Argumenty:
+        windows: Tensor okien (n_windows, n_samples, n_channels), gdzie kanał `i` odpowiada `axes[i]`
+        axes: Lista nazw osi kolejnych kanałów
+
+    Zwraca:
+        (np.ndarray, list): macierz cech (n_windows, 3 * n_axes) i nazwy kolumn
+    """
+    if not axes:
+        raise ValueError("The 'axes' parameter must be a non-empty list of column names.")
+    if np.shape(windows)[2] != len(axes):
+        raise ValueError(f"Expected {len(axes)} channels ({axes}), got {np.shape(windows)[2]}.")
+
+    data = np.asarray(windows, dtype=np.float64)
+    mean = np.mean(data, axis=1, keepdims=True)
+    # jak w pandas: std i var z ddof=1
+    variance = np.var(data, axis=1, ddof=1)
+    std_dev = np.sqrt(variance)
+    abs_dev = np.mean(np.abs(data - mean), axis=1)
+
+    features = np.stack([std_dev, abs_dev, variance], axis=2).reshape(len(data), -1)
+    names = [f"{stat}_{axis}" for axis in axes for stat in ('std', 'abs', 'var')]
+    return features, names
@@ -0,0 +1,260 @@
+"""
+Równoległa ocena modeli na jednej macierzy cech z podziałem na foldy według osób (zamiast ręcznych
+`train_test_split` w notebookach SVM / RandomForest / KNN, w których okna tej samej osoby, nakładające się
+przy `step_size < window_size`, trafiają jednocześnie do zbioru uczącego i walidacyjnego).
+
+usage:
+```python
+    X, y, subjects = store.features(segmenter, [plan])
+    results = evaluate_models(X, y, subjects, {
+        'svm': (SVC(), {'C': [0.1, 1, 10], 'gamma': ['scale', 0.01]}),
+        'rf': (RandomForestClassifier(random_state=42), {'n_estimators': [100, 300], 'max_depth': [None, 20]}),
+        'knn': (BlockedKNN(), {'n_neighbors': [3, 5, 11]}),
+    }, n_splits=5, n_jobs=8, output='results.csv')
+    print(summarize(results).head(10))
+```
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score, balanced_accuracy_score, f1_score
+from sklearn.model_selection import GroupKFold, ParameterGrid
+from threadpoolctl import threadpool_limits
+from tqdm import tqdm
+
+from . import profiling
+
+# stan procesu roboczego: memmapy macierzy cech, etykiet, foldów i statystyk standaryzacji
+_shared = {}
+_fold_cache = {}
+
+
+def subject_folds(subjects, n_splits=5):
+    """
+    Numer foldu testowego każdego okna; wszystkie okna jednej osoby są w tym samym foldzie, a foldy mają
+    zbliżoną liczbę okien (`GroupKFold`). `n_splits=None` (albo więcej foldów niż osób) to leave-one-subject-out.
+
+    Zwraca:
+        np.ndarray: numer foldu (0..n_splits-1) int32 dla każdego okna
+    """
+    subjects = np.asarray(subjects)
+    n_subjects = len(np.unique(subjects))
+    if n_subjects < 2:
+        raise ValueError(f"Subject-grouped folds need at least 2 subjects, got {n_subjects}")
+    n_splits = n_subjects if n_splits is None else min(n_splits, n_subjects)
+    folds = np.empty(len(subjects), dtype=np.int32)
+    for fold, (_, test) in enumerate(GroupKFold(n_splits=n_splits).split(subjects, groups=subjects)):
+        folds[test] = fold
+    return folds
+
+
+def _fold_scalers(X, folds, n_folds, chunk_size=1 << 16):
+    """
+    Średnia i odchylenie standardowe (jak `StandardScaler`) zbioru uczącego każdego foldu, liczone raz
+    z sum cech w każdym foldzie: statystyki foldu k to sumy wszystkich foldów poza k.
+    """
+    n_features = X.shape[1]
+    sums = np.zeros((n_folds, n_features))
+    squares = np.zeros((n_folds, n_features))
+    for start in range(0, len(X), chunk_size):
+        chunk = np.asarray(X[start:start + chunk_size], dtype=np.float64)
+        chunk_folds = folds[start:start + chunk_size]
+        for fold in np.unique(chunk_folds):
+            rows = chunk[chunk_folds == fold]
+            sums[fold] += rows.sum(axis=0)
+            squares[fold] += (rows * rows).sum(axis=0)
+    counts = np.bincount(folds, minlength=n_folds)
+    train_counts = (len(X) - counts)[:, None]
+    mean = (sums.sum(axis=0) - sums) / train_counts
+    var = np.maximum((squares.sum(axis=0) - squares) / train_counts - mean * mean, 0.0)
+    scale = np.sqrt(var)
+    return mean, np.where(scale > 0, scale, 1.0)
+
+
+def _init_worker(path, blas_threads):
+    # każdy proces liczy jeden model naraz; BLAS / OpenMP bez limitu dzieliłby te same rdzenie między procesy
+    if blas_threads is not None:
+        threadpool_limits(blas_threads)
+    _fold_cache.clear()
+    _shared.clear()
+    _shared.update(
+        X=np.load(os.path.join(path, 'X.npy'), mmap_mode='r'),
+        y=np.load(os.path.join(path, 'y.npy'), mmap_mode='r'),
+        folds=np.load(os.path.join(path, 'folds.npy')),
+        mean=np.load(os.path.join(path, 'mean.npy')),
+        scale=np.load(os.path.join(path, 'scale.npy')),
+    )
+
+
+def _fold_data(fold, standardize):
+    """Zbiory uczący i testowy foldu; ostatni fold jest trzymany w pamięci procesu (zadania są ułożone foldami)."""
+    key = (fold, standardize)
+    if key not in _fold_cache:
+        X, y, folds = _shared['X'], _shared['y'], _shared['folds']
+        test = folds == fold
+        X_train, X_test = X[~test], X[test]
+        if standardize:
+            mean = _shared['mean'][fold].astype(X.dtype)
+            scale = _shared['scale'][fold].astype(X.dtype)
+            X_train = (X_train - mean) / scale
+            X_test = (X_test - mean) / scale
+        _fold_cache.clear()
+        _fold_cache[key] = (X_train, np.asarray(y[~test]), X_test, np.asarray(y[test]))
+    return _fold_cache[key]
+
+
+def _run_job(name, estimator, params, fold, standardize, error_score):
+    """Zadanie procesu roboczego: uczy `estimator` z parametrami `params` na foldzie `fold` i mierzy czasy."""
+    X_train, y_train, X_test, y_test = _fold_data(fold, standardize)
+    result = {
+        'model': name,
+        'params': json.dumps(params, sort_keys=True, default=repr),
+        'fold': fold,
+        'n_train': len(X_train),
+        'n_test': len(X_test),
+        'fit_s': np.nan,
+        'predict_s': np.nan,
+        'accuracy': np.nan,
+        'balanced_accuracy': np.nan,
+        'f1_macro': np.nan,
+        'error': None,
+    }
+    try:
+        model = clone(estimator).set_params(**params)
+        start = time.perf_counter()
+        model.fit(X_train, y_train)
+        result['fit_s'] = time.perf_counter() - start
+        start = time.perf_counter()
+        y_pred = model.predict(X_test)
+        result['predict_s'] = time.perf_counter() - start
+    except Exception as exc:
+        if error_score == 'raise':
+            raise
+        # jak `error_score` w sklearn: wynik nieudanego zadania to podana wartość metryk
+        result['error'] = f"{type(exc).__name__}: {exc}"
+        result['accuracy'] = result['balanced_accuracy'] = result['f1_macro'] = error_score
+        return result
+    result['accuracy'] = accuracy_score(y_test, y_pred)
+    result['balanced_accuracy'] = balanced_accuracy_score(y_test, y_pred)
+    result['f1_macro'] = f1_score(y_test, y_pred, average='macro')
+    return result
+
+
+def _model_specs(models):
+    for name, spec in models.items():
+        estimator, grid = spec if isinstance(spec, tuple) else (spec, {})
+        for params in ParameterGrid(grid):
+            yield name, estimator, params
+
+
+@profiling.instrumented(windows=lambda out: int(out['n_test'].sum()))
+def evaluate_models(X, y, subjects, models, n_splits=5, standardize=True, n_jobs=None, blas_threads=1,
+                    error_score=np.nan, path=None, output=None, dtype=np.float32):
+    """
+    Ocena modeli × siatek hiperparametrów × foldów według osób na puli procesów.
+
+    Macierz cech jest zapisywana raz jako memmap (`.npy`), a procesy robocze otwierają ją tylko do odczytu,
+    więc dane nie są kopiowane do każdego zadania. Statystyki standaryzacji (jak `StandardScaler` dopasowany
+    do zbioru uczącego) są liczone raz dla każdego foldu, a zadania tego samego foldu trafiają do puli kolejno,
+    więc proces zwykle używa ponownie już przygotowanego foldu.
+
+    Argumenty:
+        X: macierz cech (np.ndarray lub pd.DataFrame, np. z `FeatureStore.features`); jeśli DataFrame zawiera
+            kolumny z etykietami lub osobami, `y` i `subjects` mogą być ich nazwami (np. `id_column` segmentera)
+        y: etykiety aktywności dla każdego okna albo nazwa kolumny `X`
+        subjects: identyfikatory osób dla każdego okna albo nazwa kolumny `X`
+        models: słownik nazwa -> estymator sklearn albo (estymator, siatka parametrów jak w `GridSearchCV`)
+        n_splits: liczba foldów (None – leave-one-subject-out)
+        standardize: standaryzacja cech na zbiorze uczącym każdego foldu
+        n_jobs: liczba procesów (domyślnie liczba rdzeni; 1 – bez puli, w bieżącym procesie)
+        blas_threads: limit wątków BLAS / OpenMP w każdym procesie (None – bez limitu); parametry modeli
+            takie jak `n_jobs` lasu losowego nie są zmieniane
+        error_score: 'raise' przerywa ocenę przy błędzie modelu; liczba (domyślnie NaN) jest wpisywana jako
+            accuracy, balanced_accuracy i f1_macro nieudanego zadania, a błąd trafia do kolumny 'error'
+        path: katalog na memmap (domyślnie katalog tymczasowy usuwany po ocenie)
+        output: opcjonalnie plik wyników (.csv albo .parquet)
+        dtype: typ macierzy cech w memmapie
+
+    Zwraca:
+        pd.DataFrame: jeden wiersz na (model, parametry, fold) z czasami uczenia i predykcji oraz metrykami
+    """
+    if isinstance(X, pd.DataFrame):
+        label_columns = [col for col in (y, subjects) if isinstance(col, str)]
+        y = X[y].to_numpy() if isinstance(y, str) else y
+        subjects = X[subjects].to_numpy() if isinstance(subjects, str) else subjects
+        X = X.drop(columns=label_columns)
+    X = np.ascontiguousarray(X, dtype=dtype)
+    y, subjects = np.asarray(y), np.asarray(subjects)
+    if not len(X) == len(y) == len(subjects):
+        raise ValueError(f"X, y and subjects must have the same length, got {len(X)}, {len(y)} and {len(subjects)}")
+    if isinstance(error_score, str) and error_score != 'raise':
+        raise ValueError(f"error_score must be 'raise' or a number, got '{error_score}'")
+
+    folds = subject_folds(subjects, n_splits)
+    n_folds = int(folds.max()) + 1
+    # zadania ułożone foldami, żeby kolejne zadania procesu korzystały z tego samego przygotowanego foldu
+    jobs = [(name, estimator, params, fold) for fold in range(n_folds) for name, estimator, params in _model_specs(models)]
+    n_jobs = min(n_jobs or os.cpu_count(), len(jobs))
+
+    owned = path is None
+    path = tempfile.mkdtemp(prefix='evaluation_') if owned else path
+    try:
+        with profiling.stage('evaluate_models.memmap', rows=len(X)):
+            os.makedirs(path, exist_ok=True)
+            mean, scale = _fold_scalers(X, folds, n_folds)
+            np.save(os.path.join(path, 'X.npy'), X)
+            # etykiety jako kody int (memmap nie obsługuje tablic object); metryki nie zależą od kodowania
+            np.save(os.path.join(path, 'y.npy'), np.unique(y, return_inverse=True)[1].astype(np.int32))
+            np.save(os.path.join(path, 'folds.npy'), folds)
+            np.save(os.path.join(path, 'mean.npy'), mean)
+            np.save(os.path.join(path, 'scale.npy'), scale)
+            del X
+
+        if n_jobs <= 1:
+            _init_worker(path, None)
+            try:
+                results = [_run_job(*job, standardize, error_score) for job in tqdm(jobs, desc="Evaluating")]
+            finally:
+                _shared.clear()
+                _fold_cache.clear()
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                     initargs=(path, blas_threads)) as executor:
+                futures = [executor.submit(_run_job, *job, standardize, error_score) for job in jobs]
+                results = [future.result() for future in tqdm(futures, desc="Evaluating")]
+    finally:
+        if owned:
+            shutil.rmtree(path, ignore_errors=True)
+
+    results = pd.DataFrame(results)
+    if output is not None:
+        if str(output).endswith('.parquet'):
+            results.to_parquet(output, index=False)
+        else:
+            results.to_csv(output, index=False)
+    return results
+
+
+def summarize(results):
+    """
+    Wyniki `evaluate_models` uśrednione po foldach dla każdego modelu i zestawu parametrów,
+    posortowane malejąco według średniej dokładności.
+    """
+    summary = results.groupby(['model', 'params'], sort=False).agg(
+        accuracy=('accuracy', 'mean'),
+        accuracy_std=('accuracy', 'std'),
+        balanced_accuracy=('balanced_accuracy', 'mean'),
+        f1_macro=('f1_macro', 'mean'),
+        fit_s=('fit_s', 'mean'),
+        predict_s=('predict_s', 'mean'),
+        folds=('fold', 'count'),
+        errors=('error', 'count'),
+    )
+    return summary.sort_values('accuracy', ascending=False).reset_index()
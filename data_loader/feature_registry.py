@@ -0,0 +1,488 @@
+import hashlib
+import inspect
+from functools import partial
+
+import numpy as np
+
+from . import binned_distr, features_freq, features_temporal, profiling
+from .features_cosine import COSINE_PAIRS
+
+AXES = ['ac_x', 'ac_y', 'ac_z', 'g_x', 'g_y', 'g_z']
+
+# kolejność grup wyznacza kolejność kolumn (jak w extract_features_from_window z notebooków)
+GROUPS = ['freq', 'binned', 'dispersion', 'stats', 'cosine', 'temporal', 'magnitude', 'peaks']
+
+INTERMEDIATES = {}
+FEATURES = {}
+
+
+class Intermediate:
+    """Wielkość pośrednia liczona raz na paczkę okien i współdzielona przez cechy."""
+
+    def __init__(self, name, func, needs=()):
+        self.name = name
+        self.func = func
+        self.needs = tuple(needs)
+
+
+class Feature:
+    """
+    Deklaracja cechy: nazwa, grupy (pierwsza decyduje o pozycji kolumn), wielkości pośrednie, z których korzysta,
+    i funkcja `func(batch)`.
+
+    Cecha liczona dla każdej osi (`per_axis=True`) zwraca tablicę (n_windows, n_channels) lub
+    (n_windows, n_channels, n_outputs), a cecha wielokanałowa (n_windows,) lub (n_windows, n_outputs).
+    Nazwy kolumn powstają z szablonu `column` z polami {axis} i {output}.
+    """
+
+    def __init__(self, name, func, groups, needs=(), column=None, per_axis=True, outputs=None, min_channels=1):
+        self.name = name
+        self.func = func
+        self.groups = tuple(groups)
+        self.needs = tuple(needs)
+        self.column = column or '{axis}_' + name
+        self.per_axis = per_axis
+        self.outputs = outputs
+        self.min_channels = min_channels
+
+    def __reduce__(self):
+        # cechy są przekazywane (np. do procesów roboczych) po nazwie i odtwarzane z rejestru
+        return _registered_feature, (self.name,)
+
+    def columns(self, axis, params):
+        outputs = self.outputs(params) if callable(self.outputs) else self.outputs
+        if outputs is None:
+            return [self.column.format(axis=axis)]
+        return [self.column.format(axis=axis, output=output) for output in outputs]
+
+
+def _registered_feature(name):
+    return FEATURES[name]
+
+
+def register_intermediate(name, func, needs=()):
+    INTERMEDIATES[name] = Intermediate(name, func, needs)
+    return func
+
+
+def register_feature(name, func, groups, needs=(), **kwargs):
+    unknown = [group for group in groups if group not in GROUPS]
+    if unknown:
+        raise ValueError(f"Unknown feature group(s) {unknown}. Available: {GROUPS}")
+    FEATURES[name] = Feature(name, func, groups, needs, **kwargs)
+    return func
+
+
+def intermediate(name, needs=()):
+    return lambda func: register_intermediate(name, func, needs)
+
+
+def feature(name, groups, needs=(), **kwargs):
+    return lambda func: register_feature(name, func, groups, needs, **kwargs)
+
+
+class WindowBatch:
+    """
+    Tensor okien (n_windows, n_samples, n_channels) z pamięcią podręczną wielkości pośrednich:
+    `batch['mean']` liczy średnią przy pierwszym odwołaniu, a kolejne cechy dostają gotowy wynik.
+    """
+
+    def __init__(self, windows, axes, params):
+        self.windows = windows
+        self.axes = axes
+        self.params = params
+        self.cache = {}
+
+    def __getitem__(self, name):
+        if name not in self.cache:
+            with profiling.stage(f'intermediate.{name}', windows=len(self.windows)):
+                self.cache[name] = INTERMEDIATES[name].func(self)
+        return self.cache[name]
+
+    def release(self, name):
+        self.cache.pop(name, None)
+
+
+# --- wielkości pośrednie ---
+
+@intermediate('data')
+def _data(batch):
+    return np.asarray(batch.windows, dtype=np.float64)
+
+@intermediate('signals', needs=['data'])
+def _signals(batch):
+    # (n_windows, n_channels, n_samples) – sygnał każdej osi jako wiersz
+    return np.ascontiguousarray(np.moveaxis(batch['data'], 1, 2))
+
+@intermediate('mean', needs=['data'])
+def _mean(batch):
+    return np.mean(batch['data'], axis=1)
+
+@intermediate('centered', needs=['data', 'mean'])
+def _centered(batch):
+    return batch['data'] - batch['mean'][:, None, :]
+
+@intermediate('var', needs=['centered'])
+def _var(batch):
+    return np.mean(batch['centered'] ** 2, axis=1)
+
+@intermediate('squared', needs=['data'])
+def _squared(batch):
+    return batch['data'] ** 2
+
+@intermediate('sum_sq', needs=['squared'])
+def _sum_sq(batch):
+    return np.sum(batch['squared'], axis=1)
+
+@intermediate('abs', needs=['data'])
+def _abs(batch):
+    return np.abs(batch['data'])
+
+@intermediate('min', needs=['data'])
+def _min(batch):
+    return np.min(batch['data'], axis=1)
+
+@intermediate('max', needs=['data'])
+def _max(batch):
+    return np.max(batch['data'], axis=1)
+
+@intermediate('diff', needs=['data'])
+def _diff(batch):
+    return np.diff(batch['data'], axis=1)
+
+@intermediate('abs_diff', needs=['diff'])
+def _abs_diff(batch):
+    return np.abs(batch['diff'])
+
+@intermediate('magnitude', needs=['squared'])
+def _magnitude(batch):
+    # długość wektora dla każdej trójki osi: (n_windows, n_samples, n_channels // 3)
+    squared = batch['squared']
+    n_triples = squared.shape[2] // 3
+    return np.stack([np.sqrt(squared[:, :, 3 * i:3 * i + 3].sum(axis=2)) for i in range(n_triples)], axis=2)
+
+@intermediate('peaks', needs=['signals'])
+def _peaks(batch):
+    signals = batch['signals']
+    return features_temporal.peak_mask(signals.reshape(-1, signals.shape[2])).reshape(signals.shape)
+
+@intermediate('peak_counts', needs=['peaks'])
+def _peak_counts(batch):
+    return batch['peaks'].sum(axis=2)
+
+@intermediate('peak_intervals', needs=['peaks'])
+def _peak_intervals(batch):
+    # średnia i odchylenie odstępów między kolejnymi pikami (w sekundach); 0, gdy pików jest mniej niż dwa
+    peaks = batch['peaks']
+    mean, std = features_temporal.peak_intervals(peaks.reshape(-1, peaks.shape[2]), batch.params['fs'])
+    return mean.reshape(peaks.shape[:2]), std.reshape(peaks.shape[:2])
+
+@intermediate('psd', needs=['signals'])
+def _psd(batch):
+    return features_freq.welch_psd(batch['signals'], batch.params['fs'])
+
+@intermediate('psd_norm', needs=['psd'])
+def _psd_norm(batch):
+    return features_freq.normalized_psd(batch['psd'][1])
+
+
+# --- cechy ---
+
+def _spectral(batch, name):
+    freqs, psd = batch['psd']
+    psd_norm = batch['psd_norm'] if 'psd_norm' in FEATURES[name].needs else None
+    params = batch.params
+    return features_freq.spectral_features_from_psd(
+        freqs, psd, names=[name], psd_norm=psd_norm, roll_percent=params['roll_percent'],
+        low_band=params['low_band'], high_band=params['high_band'],
+    )[..., 0]
+
+def _energy(batch):
+    # z twierdzenia Parsevala – ta sama wartość co energia w features_accelerometer
+    return batch['sum_sq']
+
+for _name in features_freq.SPECTRAL_FEATURE_NAMES:
+    if _name == 'energy':
+        register_feature('energy', _energy, groups=['freq', 'stats'], needs=['sum_sq'])
+    else:
+        _needs = ['psd', 'psd_norm'] if _name in ('entropy', 'centroid', 'bandwidth') else ['psd']
+        register_feature(_name, partial(_spectral, name=_name), groups=['freq'], needs=_needs)
+del _name, _needs
+
+
+@feature('binned', groups=['binned'], needs=['data', 'min', 'max'], column='binned_{axis}_bin{output}',
+         outputs=lambda params: range(params['bins']))
+def _binned(batch):
+    data = batch['data']
+    histograms, _ = binned_distr.calculate_binned_distribution_batch(
+        data, batch.axes, bins=batch.params['bins'], range_min=batch['min'], range_max=batch['max']
+    )
+    return histograms.reshape(len(data), data.shape[2], -1)
+
+# dev_mad_var: std i var z ddof=1 (jak w pandas)
+@feature('sample_std', groups=['dispersion'], needs=['var'], column='std_{axis}')
+def _sample_std(batch):
+    return np.sqrt(_sample_var(batch))
+
+@feature('mad', groups=['dispersion'], needs=['centered'], column='abs_{axis}')
+def _mad(batch):
+    return np.mean(np.abs(batch['centered']), axis=1)
+
+@feature('sample_var', groups=['dispersion'], needs=['var'], column='var_{axis}')
+def _sample_var(batch):
+    n_samples = batch['data'].shape[1]
+    return batch['var'] * n_samples / (n_samples - 1)
+
+@feature('mean', groups=['stats'], needs=['mean'])
+def _mean_feature(batch):
+    return batch['mean']
+
+@feature('std', groups=['stats'], needs=['var'])
+def _std(batch):
+    return np.sqrt(batch['var'])
+
+@feature('min', groups=['stats'], needs=['min'])
+def _min_feature(batch):
+    return batch['min']
+
+@feature('max', groups=['stats'], needs=['max'])
+def _max_feature(batch):
+    return batch['max']
+
+@feature('rms', groups=['stats'], needs=['sum_sq'])
+def _rms(batch):
+    return np.sqrt(batch['sum_sq'] / batch['data'].shape[1])
+
+@feature('abs_sum', groups=['stats'], needs=['abs'])
+def _abs_sum(batch):
+    return np.sum(batch['abs'], axis=1)
+
+@feature('jerk_mean', groups=['stats'], needs=['abs_diff'])
+def _jerk_mean(batch):
+    return np.mean(batch['abs_diff'], axis=1)
+
+@feature('jerk_std', groups=['stats'], needs=['diff'])
+def _jerk_std(batch):
+    return np.std(batch['diff'], axis=1)
+
+@feature('jerk_max', groups=['stats'], needs=['abs_diff'])
+def _jerk_max(batch):
+    return np.max(batch['abs_diff'], axis=1)
+
+@feature('cosine', groups=['cosine'], needs=['data', 'sum_sq'], column='{output}', per_axis=False,
+         outputs=[name for name, _, _ in COSINE_PAIRS], min_channels=6)
+def _cosine(batch):
+    data, norms = batch['data'], batch['sum_sq']
+    features = np.empty((len(data), len(COSINE_PAIRS)))
+    for col, (_, i, j) in enumerate(COSINE_PAIRS):
+        dot = np.einsum('wn,wn->w', data[:, :, i], data[:, :, j])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            distance = np.abs(np.clip(1.0 - dot / np.sqrt(norms[:, i] * norms[:, j]), 0.0, 2.0))
+        features[:, col] = 1 - distance
+    return features
+
+@feature('zero_crossings', groups=['temporal'], needs=['data'])
+def _zero_crossings(batch):
+    data = batch['data']
+    return ((data[:, :-1] * data[:, 1:]) < 0).sum(axis=1)
+
+@feature('mean_crossings', groups=['temporal'], needs=['centered'])
+def _mean_crossings(batch):
+    centered = batch['centered']
+    return (centered[:, :-1] * centered[:, 1:] < 0).sum(axis=1)
+
+# ta sama liczba co peak_count_{axis} z peak_features
+@feature('num_peaks', groups=['temporal', 'peaks'], needs=['peak_counts'])
+def _num_peaks(batch):
+    return batch['peak_counts']
+
+@feature('range', groups=['temporal'], needs=['min', 'max'])
+def _range(batch):
+    return batch['max'] - batch['min']
+
+# features_temporal zapisuje tę wartość jako {axis}_energy (energia znormalizowana długością okna)
+@feature('power', groups=['temporal'], needs=['sum_sq'])
+def _power(batch):
+    return batch['sum_sq'] / batch['data'].shape[1]
+
+def _autocorr(batch, lag):
+    signals = batch['signals']
+    return features_temporal.autocorr_batch(signals.reshape(-1, signals.shape[2]), lag=lag).reshape(signals.shape[:2])
+
+register_feature('autocorr_lag1', partial(_autocorr, lag=1), groups=['temporal'], needs=['signals'])
+register_feature('autocorr_lag5', partial(_autocorr, lag=5), groups=['temporal'], needs=['signals'])
+
+@feature('sma', groups=['temporal'], needs=['abs'], column='sma', per_axis=False, min_channels=3)
+def _sma(batch):
+    data = batch['abs']
+    return np.sum(data[:, :, :3], axis=(1, 2)) / data.shape[1]
+
+@feature('vector_acc_mag', groups=['magnitude'], needs=['magnitude'], column='vector_acc_mag', per_axis=False,
+         min_channels=3)
+def _vector_acc_mag(batch):
+    return np.mean(batch['magnitude'][:, :, 0], axis=1)
+
+@feature('vector_gyr_mag', groups=['magnitude'], needs=['magnitude'], column='vector_gyr_mag', per_axis=False,
+         min_channels=6)
+def _vector_gyr_mag(batch):
+    return np.mean(batch['magnitude'][:, :, 1], axis=1)
+
+@feature('peak_avg_time_diff', groups=['peaks'], needs=['peak_intervals'], column='peak_avg_time_diff_{axis}')
+def _peak_avg_time_diff(batch):
+    return batch['peak_intervals'][0]
+
+@feature('peak_std_time_diff', groups=['peaks'], needs=['peak_intervals'], column='peak_std_time_diff_{axis}')
+def _peak_std_time_diff(batch):
+    return batch['peak_intervals'][1]
+
+
+def _intermediate_closure(names):
+    """Wielkości pośrednie potrzebne dla `names` (razem z zależnościami) w kolejności topologicznej."""
+    ordered, visiting = [], set()
+
+    def visit(name):
+        if name in ordered:
+            return
+        if name in visiting:
+            raise ValueError(f"Cyclic dependency on intermediate '{name}'.")
+        visiting.add(name)
+        for need in INTERMEDIATES[name].needs:
+            visit(need)
+        ordered.append(name)
+
+    for name in names:
+        visit(name)
+    return ordered
+
+
+class FeaturePlan:
+    """
+    Plan obliczeń dla wybranego zestawu cech z rejestru `FEATURES`.
+
+    Wybór (`select`) to nazwy cech lub grup z `GROUPS`; domyślnie wszystkie cechy. Kolejność kolumn nie zależy od
+    kolejności wyboru: grupy w kolejności `GROUPS`, w grupie kolejne osie (wszystkie cechy jednej osi obok siebie),
+    na końcu cechy wielokanałowe. Każda wielkość pośrednia (średnia, sygnał wycentrowany, różnice, piki, PSD,
+    długość wektora) liczona jest raz na paczkę okien i zwalniana po ostatniej cesze, która jej używa.
+
+    Cechy wielokanałowe zakładają układ osi jak w `AXES` (trzy osie akcelerometru, potem trzy żyroskopu);
+    wybrane przez grupę są pomijane, gdy osi jest za mało.
+
+    Plan jest ekstraktorem wsadowym `plan(windows) -> (macierz, nazwy)`, więc można go przekazać do
+    `FeatureStore.features` i `extract_features_parallel`.
+
+    usage:
+    ```python
+        plan = FeaturePlan(['stats', 'temporal', 'dom_freq'], axes=axes, fs=25)
+        X, names = plan(windows)  # windows: (n_windows, n_samples, len(axes))
+    ```
+    """
+
+    def __init__(self, select=None, axes=AXES, fs=20, bins=10, roll_percent=0.85, low_band=(0.0, 10.0),
+                 high_band=(10.0, 20.0)):
+        self.axes = list(axes)
+        self.params = {
+            'fs': fs, 'bins': bins, 'roll_percent': roll_percent,
+            'low_band': tuple(low_band), 'high_band': tuple(high_band),
+        }
+        self.select = None if select is None else list(select)
+
+        selected = set()
+        for item in self.select if self.select is not None else GROUPS:
+            if item in FEATURES:
+                if FEATURES[item].min_channels > len(self.axes):
+                    raise ValueError(
+                        f"Feature '{item}' needs at least {FEATURES[item].min_channels} axes, got {self.axes}."
+                    )
+                selected.add(item)
+            elif item in GROUPS:
+                selected.update(
+                    name for name, feature in FEATURES.items()
+                    if item in feature.groups and feature.min_channels <= len(self.axes)
+                )
+            else:
+                raise ValueError(f"Unknown feature or group '{item}'. Features: {list(FEATURES)}, groups: {GROUPS}")
+
+        # kolejność kanoniczna: grupa główna, potem cechy per oś (układ oś po osi), potem wielokanałowe
+        self.features = []
+        self.layout = []  # (cecha, indeks osi lub None)
+        for group in GROUPS:
+            members = [f for name, f in FEATURES.items() if name in selected and f.groups[0] == group]
+            per_axis = [f for f in members if f.per_axis]
+            cross = [f for f in members if not f.per_axis]
+            self.features += per_axis + cross
+            self.layout += [(f, i) for i in range(len(self.axes)) for f in per_axis] + [(f, None) for f in cross]
+
+        self.names = [
+            name
+            for f, i in self.layout
+            for name in f.columns(self.axes[i] if i is not None else None, self.params)
+        ]
+        self.intermediates = _intermediate_closure([need for f in self.features for need in f.needs])
+
+        # po którym kroku (indeks cechy) wielkość pośrednia nie jest już potrzebna
+        self._release_after = {}
+        for step, f in enumerate(self.features):
+            for name in _intermediate_closure(f.needs):
+                self._release_after[name] = step
+
+    @property
+    def version(self):
+        """Skrót kodu wybranych cech i wielkości pośrednich (np. dla `FeatureStore`)."""
+        h = hashlib.blake2b(digest_size=16)
+        funcs = [f.func for f in self.features] + [INTERMEDIATES[name].func for name in self.intermediates]
+        for func in funcs:
+            func = func.func if isinstance(func, partial) else func
+            try:
+                h.update(inspect.getsource(func).encode())
+            except (OSError, TypeError):
+                h.update(repr(func).encode())
+        return h.hexdigest()
+
+    def __repr__(self):
+        return f"FeaturePlan(select={self.select!r}, axes={self.axes!r}, params={sorted(self.params.items())!r})"
+
+    def to_dict(self):
+        """Wybór cech, osie i parametry w postaci do zapisu w JSON (np. manifest `inference.save_model_bundle`)."""
+        return {'select': self.select, 'axes': self.axes, **self.params}
+
+    @classmethod
+    def from_dict(cls, config):
+        config = dict(config)
+        return cls(config.pop('select'), axes=config.pop('axes'), **config)
+
+    def compute(self, windows, peaks=None):
+        """
+        Cechy dla tensora okien (n_windows, n_samples, n_channels), gdzie kanał `i` odpowiada `axes[i]`.
+
+        Z `peaks` (`features_temporal.WindowPeaks` grupy, z której pochodzą okna) liczby pików i odstępy między
+        nimi są odczytywane z indeksu pików całego sygnału, bez szukania pików w każdym oknie.
+
+        Zwraca:
+            (np.ndarray, list): macierz cech float64 (n_windows, n_features) i nazwy kolumn
+        """
+        if np.shape(windows)[2] != len(self.axes):
+            raise ValueError(f"Expected {len(self.axes)} channels ({self.axes}), got {np.shape(windows)[2]}.")
+
+        n_windows = len(windows)
+        batch = WindowBatch(windows, self.axes, self.params)
+        if peaks is not None:
+            if 'peak_counts' in self.intermediates:
+                batch.cache['peak_counts'] = peaks.counts()
+            if 'peak_intervals' in self.intermediates:
+                batch.cache['peak_intervals'] = peaks.intervals(self.params['fs'])
+        values = {}
+        for step, f in enumerate(self.features):
+            with profiling.stage(f'feature.{f.name}', windows=n_windows):
+                values[f.name] = np.asarray(f.func(batch), dtype=np.float64)
+            for name, last_step in self._release_after.items():
+                if last_step == step:
+                    batch.release(name)
+
+        blocks = [
+            (values[f.name][:, i] if i is not None else values[f.name]).reshape(n_windows, -1)
+            for f, i in self.layout
+        ]
+        matrix = np.concatenate(blocks, axis=1) if blocks else np.empty((n_windows, 0))
+        return matrix, list(self.names)
+
+    __call__ = compute
@@ -0,0 +1,229 @@
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from .feature_registry import AXES, FEATURES, INTERMEDIATES, FeaturePlan, WindowBatch, _intermediate_closure
+
+SELECTION_VERSION = 1
+
+
+def column_features(plan):
+    """Kolumna macierzy cech -> nazwa cechy rejestru, która ją liczy (np. 'ac_x_dom_freq' -> 'dom_freq')."""
+    return {
+        name: f.name
+        for f, i in plan.layout
+        for name in f.columns(plan.axes[i] if i is not None else None, plan.params)
+    }
+
+
+class FeatureCosts:
+    """
+    Koszt obliczeń każdej cechy i wielkości pośredniej rejestru w sekundach na okno (przy liczeniu wsadowym).
+
+    Wielkość pośrednia mierzona jest z gotowymi zależnościami, a cecha z gotowymi wszystkimi wielkościami
+    pośrednimi, więc koszt planu to suma kosztów jego cech i domknięcia ich wielkości pośrednich
+    (każda liczona raz, niezależnie od liczby cech, które jej używają). Szacunek nie obejmuje składania macierzy
+    wyniku, więc dla małych planów rzeczywisty czas bywa o kilkadziesiąt procent wyższy.
+    """
+
+    def __init__(self, features, intermediates, n_windows):
+        self.features = features  # pd.Series: cecha -> s / okno
+        self.intermediates = intermediates  # pd.Series: wielkość pośrednia -> s / okno
+        self.n_windows = n_windows
+
+    def plan_cost(self, feature_names):
+        """Szacowany czas ekstrakcji (s / okno) planu z cechami `feature_names`."""
+        needs = _intermediate_closure([need for name in feature_names for need in FEATURES[name].needs])
+        return float(self.features[list(feature_names)].sum() + self.intermediates[needs].sum())
+
+    def table(self):
+        """Koszt każdej cechy samodzielnie (razem z jej wielkościami pośrednimi) i bez nich, w ms / okno."""
+        return pd.DataFrame({
+            'own_ms': self.features * 1000,
+            'standalone_ms': [self.plan_cost([name]) * 1000 for name in self.features.index],
+            'needs': [', '.join(_intermediate_closure(FEATURES[name].needs)) for name in self.features.index],
+        }, index=self.features.index).sort_values('standalone_ms', ascending=False)
+
+
+def measure_feature_costs(windows, axes=AXES, fs=20, repeat=3, **params):
+    """
+    Mierzy koszt wszystkich cech rejestru (dostępnych dla `axes`) na próbce okien.
+
+    Argumenty:
+        windows: tensor (n_windows, n_samples, len(axes)), np. kilkaset okien z `TimeWindowSegmenter.as_tensor()`
+        repeat: liczba powtórzeń; liczy się najkrótszy czas
+        params: pozostałe parametry `FeaturePlan` (bins, roll_percent, low_band, high_band)
+
+    Zwraca:
+        FeatureCosts
+    """
+    plan = FeaturePlan(axes=axes, fs=fs, **params)
+    n_windows = len(windows)
+    intermediate_costs = dict.fromkeys(plan.intermediates, np.inf)
+    feature_costs = {f.name: np.inf for f in plan.features}
+
+    for _ in range(repeat):
+        batch = WindowBatch(windows, plan.axes, plan.params)
+        for name in plan.intermediates:  # kolejność topologiczna: zależności są już w pamięci podręcznej
+            start = time.perf_counter()
+            batch[name]
+            intermediate_costs[name] = min(intermediate_costs[name], time.perf_counter() - start)
+        for f in plan.features:
+            start = time.perf_counter()
+            np.asarray(f.func(batch), dtype=np.float64)
+            feature_costs[f.name] = min(feature_costs[f.name], time.perf_counter() - start)
+
+    return FeatureCosts(
+        pd.Series(feature_costs) / n_windows,
+        pd.Series(intermediate_costs, dtype=np.float64).reindex(list(INTERMEDIATES), fill_value=0.0) / n_windows,
+        n_windows,
+    )
+
+
+def model_importance(model, columns):
+    """
+    Ważność kolumn z wytrenowanego modelu: `feature_importances_` (np. RandomForest) albo suma |coef_| po klasach
+    (modele liniowe, np. SVC(kernel='linear') – wtedy model powinien być uczony na cechach po standaryzacji).
+    """
+    if hasattr(model, 'feature_importances_'):
+        scores = np.asarray(model.feature_importances_, dtype=np.float64)
+    elif hasattr(model, 'coef_'):
+        scores = np.abs(np.atleast_2d(model.coef_)).sum(axis=0)
+    else:
+        raise ValueError(f"{type(model).__name__} has neither feature_importances_ nor coef_; use rfe_importance.")
+    return pd.Series(scores, index=list(columns))
+
+
+def rfe_importance(X, y, estimator=None, step=1):
+    """
+    Ważność kolumn z rankingu RFE (jak w notebookach SVM/RandomForest): kolumna usunięta jako `k`-ta od końca
+    dostaje 1 / ranking, więc ostatnie ocalałe mają ważność 1.
+
+    Argumenty:
+        X: pd.DataFrame cech
+        estimator: model z `coef_` lub `feature_importances_` (domyślnie RandomForestClassifier)
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.feature_selection import RFE
+
+    if estimator is None:
+        estimator = RandomForestClassifier(n_estimators=100, random_state=0, n_jobs=-1)
+    selector = RFE(estimator, n_features_to_select=1, step=step).fit(X, y)
+    return pd.Series(1.0 / selector.ranking_, index=list(X.columns))
+
+
+class FeatureSelection:
+    """
+    Wynik `select_features`: plan z ocalałymi cechami i kolumny, które z niego wybiera.
+
+    Jest ekstraktorem wsadowym `selection(windows) -> (macierz, nazwy)` liczącym tylko cechy z planu, więc można go
+    przekazać do `FeatureStore.features`, `extract_features_parallel` i `inference.save_model_bundle`.
+
+    usage:
+    ```python
+        selection = select_features(importance, costs, budget_ms=0.05, axes=axes, fs=25)
+        selection.save('selection.json')
+        X, names = FeatureSelection.load('selection.json')(windows)
+    ```
+    """
+
+    def __init__(self, plan, feature_columns, cost_ms=None, table=None):
+        self.plan = plan
+        self.feature_columns = list(feature_columns)
+        unknown = sorted(set(self.feature_columns) - set(plan.names))
+        if unknown:
+            raise ValueError(f"Columns not produced by the plan: {unknown}")
+        self.cost_ms = cost_ms  # szacowany czas ekstrakcji na okno
+        self.table = table  # zestawienie kolumn z ważnością, kosztem i decyzją
+        position = {name: i for i, name in enumerate(plan.names)}
+        self._index = np.array([position[name] for name in self.feature_columns], dtype=np.int64)
+
+    @property
+    def version(self):
+        return self.plan.version
+
+    def __repr__(self):
+        return f"FeatureSelection(plan={self.plan!r}, feature_columns={self.feature_columns!r})"
+
+    def compute(self, windows, peaks=None):
+        matrix, _ = self.plan(windows, peaks=peaks)
+        return matrix[:, self._index], list(self.feature_columns)
+
+    __call__ = compute
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': SELECTION_VERSION,
+                'plan': self.plan.to_dict(),
+                'feature_columns': self.feature_columns,
+                'cost_ms': self.cost_ms,
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != SELECTION_VERSION:
+            raise ValueError(f"Unsupported selection version {data.get('version')} in '{path}'.")
+        return cls(FeaturePlan.from_dict(data['plan']), data['feature_columns'], data.get('cost_ms'))
+
+
+def select_features(importance, costs, budget_ms, axes=AXES, fs=20, min_importance=0.0, **params):
+    """
+    Wybiera cechy o największej ważności na jednostkę kosztu, dopóki szacowany czas ekstrakcji mieści się
+    w `budget_ms` (ms na okno).
+
+    Wybór odbywa się na poziomie cech rejestru, bo cecha liczona jest od razu dla wszystkich osi: wartość cechy
+    to suma ważności jej kolumn powyżej `min_importance`, a koszt krańcowy to jej koszt własny plus wielkości
+    pośrednie, których nie liczy jeszcze żadna wybrana cecha (np. po wybraniu jednej cechy widmowej pozostałe
+    nie płacą już za PSD). Zachowywane są wszystkie kolumny wybranych cech z ważnością powyżej `min_importance`.
+
+    Argumenty:
+        importance: pd.Series kolumna -> ważność (`model_importance`, `rfe_importance` lub własna)
+        costs: FeatureCosts z `measure_feature_costs` (dla tych samych osi i parametrów)
+
+    Zwraca:
+        FeatureSelection
+    """
+    full_plan = FeaturePlan(axes=axes, fs=fs, **params)
+    owners = column_features(full_plan)
+    unknown = sorted(set(importance.index) - set(owners))
+    if unknown:
+        raise ValueError(f"Importance given for columns the registry does not produce: {unknown[:10]}")
+
+    useful = importance[importance > min_importance]
+    values = useful.groupby(useful.index.map(owners)).sum()
+    budget_s = budget_ms / 1000
+
+    chosen = []
+    while True:
+        current = costs.plan_cost(chosen)
+        best, best_ratio = None, -np.inf
+        for name, value in values.items():
+            if name in chosen:
+                continue
+            marginal = costs.plan_cost(chosen + [name]) - current
+            if current + marginal > budget_s:
+                continue
+            ratio = value / max(marginal, 1e-12)
+            if ratio > best_ratio:
+                best, best_ratio = name, ratio
+        if best is None:
+            break
+        chosen.append(best)
+
+    if not chosen:
+        raise ValueError(f"No feature fits the budget of {budget_ms} ms per window.")
+    plan = FeaturePlan(chosen, axes=axes, fs=fs, **params)
+    selected = set(useful.index)
+    columns = [name for name in plan.names if name in selected]
+    table = pd.DataFrame({
+        'feature': [owners[name] for name in full_plan.names],
+        'importance': importance.reindex(full_plan.names).fillna(0.0).to_numpy(),
+        'feature_ms': [costs.plan_cost([owners[name]]) * 1000 for name in full_plan.names],
+        'selected': np.isin(full_plan.names, columns),
+    }, index=full_plan.names)
+    return FeatureSelection(plan, columns, costs.plan_cost(chosen) * 1000, table)
@@ -0,0 +1,318 @@
+import hashlib
+import inspect
+import json
+import os
+import time
+from collections import Counter
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from . import profiling
+from .features_temporal import WindowPeaks
+
+FEATURE_STORE_VERSION = 1
+
+
+def _digest(*parts):
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode())
+    return h.hexdigest()
+
+
+def _json_value(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def file_fingerprint(path, chunk_size=1 << 20):
+    """Skrót zawartości pliku źródłowego (czytany blokami, bez wczytywania całego pliku do pamięci)."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def callable_fingerprint(func):
+    """
+    Identyfikator ekstraktora: nazwa, argumenty `functools.partial`, opcjonalny atrybut `version`
+    oraz kod źródłowy, dzięki czemu zmiana implementacji unieważnia zapisane cechy.
+    """
+    if isinstance(func, partial):
+        return _digest(callable_fingerprint(func.func), repr(func.args), repr(sorted(func.keywords.items())))
+    try:
+        source = inspect.getsource(func)
+    except (OSError, TypeError):
+        source = ''
+    name = f"{getattr(func, '__module__', '')}.{getattr(func, '__qualname__', repr(func))}"
+    return _digest(name, getattr(func, 'version', ''), source)
+
+
+def group_fingerprint(pid, act, block, starts=None):
+    """Skrót surowych danych jednej grupy (osoba, aktywność) i, przy filtrowaniu nieciągłości, początków jej okien."""
+    parts = [repr(pid), repr(act), block.dtype.str, repr(block.shape), np.ascontiguousarray(block).tobytes()]
+    if starts is not None:
+        parts.append(np.asarray(starts, dtype=np.int64).tobytes())
+    return _digest(*parts)
+
+
+def extractor_name(func):
+    """Czytelna nazwa ekstraktora (funkcja, `functools.partial` albo obiekt wywoływalny, np. `FeaturePlan`)."""
+    while isinstance(func, partial):
+        func = func.func
+    return getattr(func, '__qualname__', type(func).__name__)
+
+
+def accepts_peaks(func):
+    """Czy ekstraktor przyjmuje indeks pików grupy (`peaks=`), np. `FeaturePlan` albo `extract_peak_features_batch`."""
+    try:
+        return 'peaks' in inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def group_peaks(block, window_params, starts=None):
+    """`WindowPeaks` okien grupy `block` (jak w `sliding_windows`: siatka okien albo wiersze `starts`)."""
+    window_len, step, first_start = window_params
+    if starts is None:
+        starts = np.arange(first_start, len(block) - window_len + 1, step, dtype=np.int64)
+    return WindowPeaks(block, starts, window_len)
+
+
+def extract_matrix(windows, extractors, peaks=None):
+    """
+    Uruchamia ekstraktory wsadowe na tensorze okien i skleja wyniki.
+
+    Ekstraktory przyjmujące `peaks` (zob. `accepts_peaks`) dostają indeks pików grupy, z której pochodzą okna
+    (`group_peaks`), i nie szukają pików w każdym oknie osobno.
+
+    Każdy ekstraktor musi zwrócić tyle nazw, ile kolumn, a nazwy wszystkich ekstraktorów muszą być unikalne
+    (kolumny są adresowane nazwami w `FeatureStore`, DataFrame cech i manifestach modeli) – inaczej ValueError.
+
+    Zwraca:
+        (np.ndarray, list): macierz cech float64 (n_windows, n_features) i nazwy kolumn
+    """
+    matrices, names = [], []
+    for func in extractors:
+        with profiling.stage(f'extractor.{extractor_name(func)}', windows=len(windows)):
+            if peaks is not None and accepts_peaks(func):
+                matrix, matrix_names = func(windows, peaks=peaks)
+            else:
+                matrix, matrix_names = func(windows)
+        matrix = np.asarray(matrix, dtype=np.float64).reshape(len(windows), -1)
+        if matrix.shape[1] != len(matrix_names):
+            raise ValueError(
+                f"Extractor '{extractor_name(func)}' returned {matrix.shape[1]} columns and {len(matrix_names)} names."
+            )
+        matrices.append(matrix)
+        names += matrix_names
+    duplicates = sorted(name for name, count in Counter(names).items() if count > 1)
+    if duplicates:
+        raise ValueError(f"Duplicate feature names {duplicates}; extractors must not return the same columns.")
+    matrix = np.concatenate(matrices, axis=1) if matrices else np.empty((len(windows), 0))
+    return matrix, names
+
+
+class FeatureStore:
+    """
+    Trwały cache macierzy cech liczonych z `TimeWindowSegmenter.segment_arrays()`.
+
+    Klucz wpisu to skrót pliku źródłowego, parametrów segmentera (window_size, step_size, sampling_rate,
+    docelowa częstotliwość resample_to, kanały) oraz zestawu ekstraktorów i ich wersji. Cechy każdej grupy
+    (osoba, aktywność) są osobną partycją Arrow IPC, adresowaną skrótem danych grupy, więc po zmianie danych
+    liczone są ponownie tylko zmienione grupy, a partycje poprzedniej wersji wpisu, do których nic się już
+    nie odwołuje, są usuwane. Wpisy powyżej `size_budget_bytes` są usuwane od najdawniej używanych (LRU).
+
+    usage:
+    ```python
+        store = FeatureStore('feature_store')
+        X, y, subjects = store.features(segmenter, [partial(extract_acc_features_batch, axes=axes)])
+    ```
+    """
+
+    def __init__(self, root='feature_store', size_budget_bytes=2 * 1024 ** 3):
+        self.root = root
+        self.size_budget_bytes = size_budget_bytes
+        os.makedirs(self.root, exist_ok=True)
+
+    def config_key(self, segmenter, extractors, columns):
+        config = {
+            'store_version': FEATURE_STORE_VERSION,
+            'window_size': segmenter.window_size,
+            'step_size': segmenter.step_size,
+            'sampling_rate': segmenter.sampling_rate,
+            'resampled_rate': segmenter.resampled_rate,
+            'columns': list(columns),
+            'extractors': [callable_fingerprint(func) for func in extractors],
+        }
+        if segmenter.allowed_deviation_ms is not None:
+            config['allowed_deviation_ms'] = segmenter.allowed_deviation_ms
+            config['gap_mode'] = segmenter.gap_mode
+        return _digest(json.dumps(config, sort_keys=True, default=str)), config
+
+    def source_key(self, segmenter):
+        if segmenter.dataset is not None and segmenter.dataset.source_fingerprint:
+            return segmenter.dataset.source_fingerprint
+        if segmenter.df_path and os.path.isfile(segmenter.df_path):
+            return file_fingerprint(segmenter.df_path)
+        return 'in-memory'
+
+    def _paths(self, config_key, source_key):
+        config_dir = os.path.join(self.root, config_key)
+        return (
+            os.path.join(config_dir, 'groups'),
+            os.path.join(config_dir, 'entries', f'{source_key}.json'),
+        )
+
+    @profiling.instrumented('FeatureStore.features', windows=lambda out: len(out[0]))
+    def features(self, segmenter, extractors, columns=None):
+        """
+        Zwraca cechy wszystkich okien segmentera, licząc od nowa tylko grupy, których brak w cache.
+
+        Argumenty:
+            segmenter: TimeWindowSegmenter z wczytanymi danymi
+            extractors: lista funkcji `f(windows) -> (macierz, nazwy)`, np. `*_batch` z data_loader
+            columns: kanały przekazywane do `segment_arrays` (domyślnie acc + gyr)
+
+        Zwraca:
+            (pd.DataFrame, np.ndarray, np.ndarray): cechy, etykiety aktywności i identyfikatory osób dla każdego okna
+        """
+        if columns is None:
+            columns = segmenter.channel_columns()
+        config_key, config = self.config_key(segmenter, extractors, columns)
+        groups_dir, manifest_path = self._paths(config_key, self.source_key(segmenter))
+        os.makedirs(groups_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+
+        groups = []
+        tables = []
+        starts = segmenter.group_window_starts()
+        window_params = segmenter._window_params()
+        for i, (pid, act, block, windows) in enumerate(segmenter.segment_arrays(columns=columns)):
+            if len(windows) == 0:
+                continue
+            group_starts = starts[i] if starts is not None else None
+            fingerprint = group_fingerprint(pid, act, block, group_starts)
+            path = os.path.join(groups_dir, f'{fingerprint}.arrow')
+            if not os.path.exists(path):
+                peaks = group_peaks(block, window_params, group_starts)
+                self._write_group(path, self._extract(windows, extractors, peaks))
+            table = self._read_group(path)
+            tables.append(table)
+            groups.append({
+                'subject': _json_value(pid),
+                'activity': _json_value(act),
+                'fingerprint': fingerprint,
+                'n_windows': table.num_rows,
+            })
+
+        # partycje poprzedniej wersji wpisu (np. przed zmianą danych jednej osoby), których nowy wpis już nie używa
+        previous = self._read_entry(manifest_path)
+        manifest = {'config': config, 'groups': groups, 'last_access': time.time()}
+        self._write_json(manifest_path, manifest)
+        if previous is not None:
+            current = {os.path.join(groups_dir, f"{group['fingerprint']}.arrow") for group in groups}
+            self._remove_unreferenced(previous[1] - current)
+        self.evict(keep=manifest_path)
+
+        n_windows = [group['n_windows'] for group in groups]
+        labels = np.repeat(np.array([group['activity'] for group in groups], dtype=object), n_windows)
+        subjects = np.repeat(np.array([group['subject'] for group in groups], dtype=object), n_windows)
+        if not tables:
+            return pd.DataFrame(), labels, subjects
+        return pa.concat_tables(tables).to_pandas(), labels, subjects
+
+    @staticmethod
+    def _extract(windows, extractors, peaks=None):
+        matrix, names = extract_matrix(windows, extractors, peaks)
+        return pa.table({name: matrix[:, i] for i, name in enumerate(names)})
+
+    @staticmethod
+    def _write_group(path, table):
+        tmp_path = f'{path}.tmp'
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _read_group(path):
+        # pliki Arrow IPC są mapowane do pamięci bez kopiowania
+        return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+    @staticmethod
+    def _write_json(path, data):
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _read_entry(path):
+        # czas użycia i partycje wpisu (groups/ obok katalogu entries/); None, gdy wpisu nie ma
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+        groups_dir = os.path.join(os.path.dirname(os.path.dirname(path)), 'groups')
+        files = {os.path.join(groups_dir, f"{group['fingerprint']}.arrow") for group in manifest['groups']}
+        return manifest['last_access'], files
+
+    def _entries(self):
+        entries = []
+        for config_key in os.listdir(self.root):
+            entries_dir = os.path.join(self.root, config_key, 'entries')
+            if not os.path.isdir(entries_dir):
+                continue
+            for name in os.listdir(entries_dir):
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(entries_dir, name)
+                entry = self._read_entry(path)
+                if entry is None:
+                    continue  # wpis usunięty w międzyczasie przez inny proces korzystający z tego samego cache
+                last_access, files = entry
+                entries.append((last_access, path, files))
+        return sorted(entries)
+
+    def _remove_unreferenced(self, paths):
+        # wpisy czytane ponownie, żeby nie skasować partycji, do których odwołuje się wpis zapisany w międzyczasie
+        entries = self._entries()
+        referenced = set().union(*(files for _, _, files in entries)) if entries else set()
+        for path in paths - referenced:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def evict(self, keep=None):
+        """
+        Usuwa najdawniej używane wpisy, aż rozmiar cache zmieści się w `size_budget_bytes`.
+
+        Kasowane są tylko partycje usuniętych wpisów, do których nie odwołuje się żaden inny wpis. Pliki
+        `.tmp` i partycje bez wpisu nie są ruszane: mogą należeć do innego procesu, który jeszcze liczy cechy
+        (np. dwa notebooki korzystające z jednego cache).
+        """
+        entries = self._entries()
+
+        def total_size(entries):
+            files = set().union(*(files for _, _, files in entries)) if entries else set()
+            return sum(os.path.getsize(path) for path in files if os.path.exists(path))
+
+        evicted = set()
+        while total_size(entries) > self.size_budget_bytes:
+            evictable = [entry for entry in entries if entry[1] != keep]
+            if not evictable:
+                break
+            try:
+                os.remove(evictable[0][1])
+            except FileNotFoundError:
+                pass
+            evicted |= evictable[0][2]
+            entries.remove(evictable[0])
+        if evicted:
+            self._remove_unreferenced(evicted)
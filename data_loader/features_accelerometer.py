@@ -32,3 +32,41 @@ def extract_acc_features(window, axes=['ac_x', 'ac_y', 'ac_z']):
         features[f'{axis}_jerk_max'] = np.max(np.abs(jerk))
 
     return features
+
+
+def extract_acc_features_batch(windows, axes=['ac_x', 'ac_y', 'ac_z']):
+    """
+    Wsadowa wersja `extract_acc_features` dla wielu okien naraz.
+
+    Parametry:
+        windows (np.ndarray): Tensor okien (n_windows, n_samples, n_channels), gdzie kanał `i` odpowiada `axes[i]`
+        axes (list): Nazwy osi kolejnych kanałów
+
+    Zwraca:
+        (np.ndarray, list): macierz cech (n_windows, n_features) i nazwy kolumn w kolejności `extract_acc_features`
+    """
+    if np.shape(windows)[2] != len(axes):
+        raise ValueError(f"Expected {len(axes)} channels ({axes}), got {np.shape(windows)[2]}.")
+
+    data = np.asarray(windows, dtype=np.float64)
+    squared = data ** 2
+    jerk = np.diff(data, axis=1)
+    abs_jerk = np.abs(jerk)
+
+    stats = [
+        ('mean', np.mean(data, axis=1)),
+        ('std', np.std(data, axis=1)),
+        ('min', np.min(data, axis=1)),
+        ('max', np.max(data, axis=1)),
+        ('rms', np.sqrt(np.mean(squared, axis=1))),
+        ('abs_sum', np.sum(np.abs(data), axis=1)),
+        ('energy', np.sum(squared, axis=1)),
+        ('jerk_mean', np.mean(abs_jerk, axis=1)),
+        ('jerk_std', np.std(jerk, axis=1)),
+        ('jerk_max', np.max(abs_jerk, axis=1)),
+    ]
+
+    # (n_windows, n_axes, n_stats) -> kolumny pogrupowane po osiach
+    features = np.stack([values for _, values in stats], axis=2).reshape(len(data), -1)
+    names = [f'{axis}_{name}' for axis in axes for name, _ in stats]
+    return features, names
@@ -21,3 +21,38 @@ def extract_cosine_distances(window, axes=['ac_x', 'ac_y', 'ac_z', 'g_x', 'g_y',
     features['cos_g_yz'] = 1 - cosine(window[axes[4]], window[axes[5]])
 
     return features
+
+
+COSINE_PAIRS = [
+    ('cos_ac_xy', 0, 1),
+    ('cos_ac_xz', 0, 2),
+    ('cos_ac_yz', 1, 2),
+    ('cos_g_xy', 3, 4),
+    ('cos_g_xz', 3, 5),
+    ('cos_g_yz', 4, 5),
+]
+
+
+def extract_cosine_distances_batch(windows, axes=['ac_x', 'ac_y', 'ac_z', 'g_x', 'g_y', 'g_z']):
+    """
+    Wsadowa wersja `extract_cosine_distances` dla tensora okien (n_windows, n_samples, 6),
+    z kanałami w kolejności `axes`.
+
+    Zwraca:
+        (np.ndarray, list): macierz cech (n_windows, 6) i nazwy kolumn
+    """
+    if np.shape(windows)[2] != len(axes):
+        raise ValueError(f"Expected {len(axes)} channels ({axes}), got {np.shape(windows)[2]}.")
+
+    data = np.asarray(windows, dtype=np.float64)
+    norms = np.einsum('wnc,wnc->wc', data, data)
+
+    features = np.empty((len(data), len(COSINE_PAIRS)))
+    for col, (_, i, j) in enumerate(COSINE_PAIRS):
+        dot = np.einsum('wn,wn->w', data[:, :, i], data[:, :, j])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # jak scipy.spatial.distance.cosine: odległość przycięta do [0, 2]
+            distance = np.abs(np.clip(1.0 - dot / np.sqrt(norms[:, i] * norms[:, j]), 0.0, 2.0))
+        features[:, col] = 1 - distance
+
+    return features, [name for name, _, _ in COSINE_PAIRS]
@@ -1,7 +1,13 @@
+from functools import lru_cache
+
 import numpy as np
-from scipy.signal import welch
-from scipy.fft import fft
-import librosa
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import welch, get_window
+from scipy.fft import dct, fft, rfft, rfftfreq
+
+SPECTRAL_FEATURE_NAMES = [
+    'dom_freq', 'entropy', 'energy', 'centroid', 'bandwidth', 'flatness', 'slope', 'rolloff', 'band_ratio'
+]
 
 
 def dominant_frequency(signal, fs=20):
@@ -132,7 +138,7 @@ def band_energy_ratio(signal, fs=20, low_band=(0.0, 10.0), high_band=(10.0, 20.0
     return ratio
 
 
-def mfcc_features(signal, fs=50, n_mfcc=13):
+def mfcc_features(signal, fs=50, n_mfcc=13, backend='native'):
     """
     Oblicza współczynniki MFCC dla danego sygnału. 
     UWAGA: MFCC ma sens tylko jak będziemy mieć większe FS niż 50Hz.
@@ -141,10 +147,220 @@ def mfcc_features(signal, fs=50, n_mfcc=13):
     - signal: 1D array – sygnał wejściowy z jednej osi czujnika
     - fs: int – częstotliwość próbkowania (Hz), domyślnie 100 Hz
     - n_mfcc: int – liczba współczynników MFCC do zwrócenia
+    - backend: 'native' (`mfcc_batch`, bez librosa) albo 'librosa' (`librosa.feature.mfcc`)
 
     Zwraca:
     - wektor cech: średnie wartości każdego z n_mfcc współczynników
     """
-    mfcc = librosa.feature.mfcc(y=signal.astype(float), sr=fs, n_mfcc=n_mfcc)
-    mfcc_mean = np.mean(mfcc, axis=1)  # uśredniamy po czasie
-    return mfcc_mean
\ No newline at end of file
+    if backend == 'librosa':
+        # import dopiero tutaj: samo wczytanie librosa trwa kilka sekund
+        import librosa
+        mfcc = librosa.feature.mfcc(y=signal.astype(float), sr=fs, n_mfcc=n_mfcc)
+        mfcc_mean = np.mean(mfcc, axis=1)  # uśredniamy po czasie
+        return mfcc_mean
+    return mfcc_batch(np.asarray(signal, dtype=np.float64)[None, :], fs=fs, n_mfcc=n_mfcc)[0]
+
+
+def _hz_to_mel(freqs):
+    # skala mel Slaneya (jak librosa z htk=False): liniowa do 1 kHz, dalej logarytmiczna
+    freqs = np.asarray(freqs, dtype=np.float64)
+    f_sp = 200.0 / 3
+    min_log_hz = 1000.0
+    logstep = np.log(6.4) / 27.0
+    mels = freqs / f_sp
+    return np.where(freqs >= min_log_hz, min_log_hz / f_sp + np.log(np.maximum(freqs, min_log_hz) / min_log_hz) / logstep, mels)
+
+
+def _mel_to_hz(mels):
+    mels = np.asarray(mels, dtype=np.float64)
+    f_sp = 200.0 / 3
+    min_log_hz = 1000.0
+    min_log_mel = min_log_hz / f_sp
+    logstep = np.log(6.4) / 27.0
+    return np.where(mels >= min_log_mel, min_log_hz * np.exp(logstep * (mels - min_log_mel)), f_sp * mels)
+
+
+@lru_cache(maxsize=32)
+def mfcc_basis(fs, n_fft=2048, n_mfcc=13, n_mels=128):
+    """
+    Okno Hanna, bank filtrów mel (norma Slaneya, float32 jak w librosa) i macierz DCT-II (ortonormalna)
+    dla danej konfiguracji. Wynik jest zapamiętywany dla każdej krotki parametrów.
+
+    Zwraca:
+    - (window (n_fft,), mel_basis (n_mels, n_fft // 2 + 1), dct_matrix (n_mfcc, n_mels))
+    """
+    window = get_window('hann', n_fft)
+    fft_freqs = rfftfreq(n_fft, 1 / fs)
+    mel_freqs = _mel_to_hz(np.linspace(_hz_to_mel(0.0), _hz_to_mel(fs / 2), n_mels + 2))
+
+    fdiff = np.diff(mel_freqs)
+    ramps = np.subtract.outer(mel_freqs, fft_freqs)
+    lower = -ramps[:-2] / fdiff[:-1, None]
+    upper = ramps[2:] / fdiff[1:, None]
+    mel_basis = np.maximum(0, np.minimum(lower, upper)).astype(np.float32)
+    mel_basis *= (2.0 / (mel_freqs[2:] - mel_freqs[:-2]))[:, None].astype(np.float32)
+
+    dct_matrix = dct(np.eye(n_mels), type=2, norm='ortho', axis=0)[:n_mfcc]
+
+    for array in (window, mel_basis, dct_matrix):
+        array.flags.writeable = False
+    return window, mel_basis, dct_matrix
+
+
+def mfcc_batch(signals, fs=50, n_mfcc=13, n_fft=2048, hop_length=512, n_mels=128, top_db=80.0):
+    """
+    Wsadowa wersja `mfcc_features`: średnie MFCC po czasie dla każdego wiersza `signals` (..., n_samples),
+    z jedną STFT dla całej paczki i gotowymi (zapamiętanymi) macierzami z `mfcc_basis`.
+
+    Odpowiada `librosa.feature.mfcc(y, sr=fs, n_mfcc=n_mfcc)` z librosa 0.11 (n_fft=2048, hop 512, okno Hanna,
+    center=True z dopełnieniem zerami, 128 filtrów mel Slaneya, power_to_db z top_db=80 osobno dla każdego sygnału,
+    DCT-II ortonormalna). Tolerancja względem librosa: |różnica| <= 1e-5 dla każdego współczynnika (w testach dla
+    fs 20–100 Hz i okien 50–3000 próbek < 2e-6, głównie na c0; różnice wynikają z innej implementacji FFT
+    i kolejności sumowania).
+
+    Zwraca:
+    - macierz (..., n_mfcc)
+    """
+    signals = np.asarray(signals, dtype=np.float64)
+    batch_shape, n_samples = signals.shape[:-1], signals.shape[-1]
+    signals = signals.reshape(-1, n_samples)
+    window, mel_basis, dct_matrix = mfcc_basis(fs, n_fft, n_mfcc, n_mels)
+
+    pad = n_fft // 2
+    padded = np.pad(signals, ((0, 0), (pad, pad)))
+    frames = sliding_window_view(padded, n_fft, axis=1)[:, ::hop_length]  # (n_signals, n_frames, n_fft)
+    power = np.abs(rfft(frames * window, axis=-1)) ** 2
+
+    mel = power @ mel_basis.T.astype(np.float64)  # (n_signals, n_frames, n_mels)
+    log_mel = 10 * np.log10(np.maximum(1e-10, mel))
+    log_mel = np.maximum(log_mel, log_mel.max(axis=(1, 2), keepdims=True) - top_db)
+
+    mfcc = log_mel @ dct_matrix.T  # (n_signals, n_frames, n_mfcc)
+    return mfcc.mean(axis=1).reshape(batch_shape + (n_mfcc,))
+
+
+@lru_cache(maxsize=32)
+def welch_grid(fs, nperseg):
+    """
+    Siatka częstotliwości, okno Hanna i współczynnik skali gęstości widmowej dla `welch(signal, fs, nperseg=nperseg)`
+    z jednym segmentem. Wynik jest zapamiętywany dla każdej pary (fs, nperseg).
+    """
+    freqs = rfftfreq(nperseg, 1 / fs)
+    window = get_window('hann', nperseg)
+    scale = 1.0 / (fs * np.sum(window ** 2))
+    freqs.flags.writeable = False
+    window.flags.writeable = False
+    return freqs, window, scale
+
+
+def welch_psd(signals, fs=20):
+    """
+    Gęstość widmowa mocy liczona wsadowo wzdłuż ostatniej osi, równoważna
+    `welch(signal, fs, nperseg=len(signal))` dla każdego sygnału.
+
+    Zwraca:
+    - (freqs, psd): siatka częstotliwości i PSD o kształcie (..., n_freqs)
+    """
+    signals = np.asarray(signals, dtype=np.float64)
+    nperseg = signals.shape[-1]
+    freqs, window, scale = welch_grid(fs, nperseg)
+
+    detrended = signals - signals.mean(axis=-1, keepdims=True)
+    psd = np.abs(rfft(detrended * window, axis=-1)) ** 2 * scale
+    # widmo jednostronne: podwajamy wszystko poza składową stałą (i Nyquistem dla parzystej długości)
+    if nperseg % 2:
+        psd[..., 1:] *= 2
+    else:
+        psd[..., 1:-1] *= 2
+    return freqs, psd
+
+
+def spectral_features(signals, fs=20, roll_percent=0.85, low_band=(0.0, 10.0), high_band=(10.0, 20.0)):
+    """
+    Wszystkie cechy widmowe naraz dla całej paczki okien. PSD jest liczona raz (zamiast osobnego `welch`
+    w każdej funkcji), a cechy wyznaczane są wektorowo z tej samej PSD.
+
+    Parametry:
+    - signals: array (..., n_samples) – np. (n_windows, n_samples) dla jednej osi
+    - fs: int – częstotliwość próbkowania (Hz)
+    - roll_percent, low_band, high_band: jak w `spectral_rolloff` i `band_energy_ratio`
+
+    Zwraca:
+    - (features, names): macierz cech (..., 9) w kolejności `SPECTRAL_FEATURE_NAMES`
+    """
+    signals = np.asarray(signals, dtype=np.float64)
+    freqs, psd = welch_psd(signals, fs)
+    # z twierdzenia Parsevala: sum(|fft(x)|^2) / N == sum(x^2)
+    energy = np.sum(signals ** 2, axis=-1)
+    features = spectral_features_from_psd(
+        freqs, psd, energy=energy, roll_percent=roll_percent, low_band=low_band, high_band=high_band
+    )
+    return features, list(SPECTRAL_FEATURE_NAMES)
+
+
+def normalized_psd(psd):
+    """PSD podzielona przez całkowitą moc każdego sygnału (rozkład mocy po częstotliwościach)."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return psd / np.sum(psd, axis=-1, keepdims=True)
+
+
+def spectral_features_from_psd(
+    freqs,
+    psd,
+    names=SPECTRAL_FEATURE_NAMES,
+    energy=None,
+    psd_norm=None,
+    roll_percent=0.85,
+    low_band=(0.0, 10.0),
+    high_band=(10.0, 20.0),
+):
+    """
+    Wybrane cechy widmowe z gotowej PSD (np. z `welch_psd`), liczone tylko dla podanych `names`.
+
+    Parametry:
+    - freqs, psd: siatka częstotliwości i PSD o kształcie (..., n_freqs)
+    - names: podzbiór `SPECTRAL_FEATURE_NAMES`
+    - energy: energia sygnału (..., ) – wymagana tylko dla 'energy', bo liczona jest z sygnału w dziedzinie czasu
+    - psd_norm: wynik `normalized_psd(psd)`, jeśli został już policzony
+
+    Zwraca:
+    - macierz cech (..., len(names)) w kolejności `names`
+    """
+    if psd_norm is None and not set(names) <= {'dom_freq', 'energy', 'flatness', 'slope', 'rolloff', 'band_ratio'}:
+        psd_norm = normalized_psd(psd)
+
+    columns = []
+    for name in names:
+        if name == 'dom_freq':
+            value = freqs[np.argmax(psd, axis=-1)]
+        elif name == 'entropy':
+            value = -np.sum(psd_norm * np.log2(psd_norm + 1e-12), axis=-1) / np.log2(psd.shape[-1])
+        elif name == 'energy':
+            if energy is None:
+                raise ValueError("Feature 'energy' requires the signal energy (energy=...).")
+            value = energy
+        elif name == 'centroid':
+            value = np.sum(freqs * psd_norm, axis=-1)
+        elif name == 'bandwidth':
+            centroid = np.sum(freqs * psd_norm, axis=-1)
+            value = np.sqrt(np.sum(((freqs - centroid[..., None]) ** 2) * psd_norm, axis=-1))
+        elif name == 'flatness':
+            geometric_mean = np.exp(np.mean(np.log(psd + 1e-12), axis=-1))
+            value = geometric_mean / (np.mean(psd, axis=-1) + 1e-12)
+        elif name == 'slope':
+            # nachylenie prostej regresji (jak np.polyfit(freqs, Y, 1)[0])
+            log_psd = 10 * np.log10(psd + 1e-12)
+            freqs_centered = freqs - freqs.mean()
+            value = np.sum(freqs_centered * (log_psd - log_psd.mean(axis=-1, keepdims=True)), axis=-1) / np.sum(freqs_centered ** 2)
+        elif name == 'rolloff':
+            cumulative_energy = np.cumsum(psd, axis=-1)
+            value = freqs[np.argmax(cumulative_energy >= roll_percent * cumulative_energy[..., -1:], axis=-1)]
+        elif name == 'band_ratio':
+            low_mask = (freqs >= low_band[0]) & (freqs < low_band[1])
+            high_mask = (freqs >= high_band[0]) & (freqs < high_band[1])
+            value = np.sum(psd[..., low_mask], axis=-1) / (np.sum(psd[..., high_mask], axis=-1) + 1e-12)
+        else:
+            raise ValueError(f"Unknown spectral feature '{name}'. Available: {SPECTRAL_FEATURE_NAMES}")
+        columns.append(value)
+
+    return np.stack(columns, axis=-1)
@@ -7,6 +7,161 @@ def autocorr(x, lag=1):
         return 0
     return np.corrcoef(x[:-lag], x[lag:])[0, 1]
 
+def peak_bounds(signals):
+    """
+    Lokalne maksima w wierszach `signals` (n_rows, n_samples), zgodne z `find_peaks(x)[0]`.
+
+    Zwraca:
+        (rows, peaks, lefts, rights): wiersz i pozycja każdego piku oraz pierwsza i ostatnia próbka jego plateau
+        (dla zwykłego piku lefts == rights == peaks), uporządkowane po wierszach i pozycjach
+    """
+    slopes = np.sign(np.diff(signals, axis=1))
+    positions = np.arange(slopes.shape[1])
+    # ostatnie niezerowe nachylenie przed każdą pozycją (pomija płaskie fragmenty)
+    last_nonzero = np.maximum.accumulate(np.where(slopes != 0, positions, -1), axis=1)
+    previous = np.concatenate([np.full((len(slopes), 1), -1), last_nonzero[:, :-1]], axis=1)
+    previous_slope = np.where(previous >= 0, np.take_along_axis(slopes, np.maximum(previous, 0), axis=1), 0)
+    rows, right_edges = np.nonzero((slopes < 0) & (previous_slope > 0))
+    # plateau zaczyna się próbkę po ostatnim wzroście, a kończy na próbce przed spadkiem
+    left_edges = previous[rows, right_edges] + 1
+    return rows, (left_edges + right_edges) // 2, left_edges, right_edges
+
+def peak_mask(signals):
+    """
+    Maska lokalnych maksimów w każdym wierszu `signals` (n_windows, n_samples), zgodna z `find_peaks(x)[0]`:
+    plateau to jeden pik w jego środku (zaokrąglonym w dół), jeśli po obu stronach wartości są niższe,
+    a próbki brzegowe nie są pikami.
+    """
+    rows, peaks, _, _ = peak_bounds(signals)
+    mask = np.zeros(np.shape(signals), dtype=bool)
+    mask[rows, peaks] = True
+    return mask
+
+class PeakIndex:
+    """
+    Indeks pików ciągłego sygnału całej grupy (blok (n_samples, n_channels)), liczony raz w O(n_samples).
+
+    Pik sygnału jest pikiem okna `[start, start + window_len)` dokładnie wtedy, gdy okno obejmuje próbkę wzrostu
+    przed jego plateau i próbkę spadku po nim, więc piki każdego okna to ciągły zakres indeksu wyznaczany
+    `searchsorted`. Liczby pików i statystyki odstępów są takie same jak z `find_peaks` na każdym oknie osobno,
+    ale bez ponownego szukania tych samych pików w nakładających się oknach.
+
+    usage:
+    ```python
+        index = PeakIndex(block)
+        counts = index.counts(starts, window_len)  # (n_windows, n_channels)
+    ```
+    """
+
+    def __init__(self, block):
+        signals = np.asarray(block, dtype=np.float64).T
+        rows, peaks, lefts, rights = peak_bounds(signals)
+        bounds = np.searchsorted(rows, np.arange(len(signals) + 1))
+        self.channels = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            positions = peaks[start:end]
+            steps = np.diff(positions)
+            self.channels.append((
+                lefts[start:end] - 1,  # próbka wzrostu przed plateau
+                rights[start:end] + 1,  # próbka spadku po plateau
+                # sumy skumulowane odstępów między kolejnymi pikami (całkowite, więc dokładne)
+                np.concatenate(([0], np.cumsum(steps))),
+                np.concatenate(([0], np.cumsum(steps * steps))),
+            ))
+
+    def ranges(self, starts, window_len):
+        """Zakresy `first`, `last` (n_windows, n_channels) indeksu: piki okna to `first..last-1`."""
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = starts + window_len - 1
+        first = np.empty((len(starts), len(self.channels)), dtype=np.int64)
+        last = np.empty_like(first)
+        for c, (rises, falls, _, _) in enumerate(self.channels):
+            first[:, c] = np.searchsorted(rises, starts, side='left')
+            last[:, c] = np.searchsorted(falls, ends, side='right')
+        return first, np.maximum(last, first)
+
+    def counts(self, starts, window_len):
+        """Liczba pików każdego okna i kanału, zgodna z `count_peaks` na oknach."""
+        first, last = self.ranges(starts, window_len)
+        return last - first
+
+    def intervals(self, starts, window_len, fs):
+        """Średnia i odchylenie odstępów między kolejnymi pikami okna (w sekundach); 0, gdy pików jest mniej niż dwa."""
+        first, last = self.ranges(starts, window_len)
+        mean = np.zeros(first.shape)
+        std = np.zeros(first.shape)
+        for c, (_, _, sums, squares) in enumerate(self.channels):
+            n = last[:, c] - first[:, c] - 1
+            valid = n > 0
+            lo, hi, n = first[valid, c], last[valid, c] - 1, n[valid]
+            total = sums[hi] - sums[lo]
+            total_sq = squares[hi] - squares[lo]
+            mean[valid, c] = total / n / fs
+            std[valid, c] = np.sqrt(np.maximum(n * total_sq - total * total, 0) / n ** 2) / fs
+        return mean, std
+
+class WindowPeaks:
+    """
+    Piki okien `starts` jednej grupy z `PeakIndex` jej bloku, przekazywane ekstraktorom jako `peaks=`.
+    Indeks budowany jest dopiero przy pierwszym zapytaniu, więc nic nie kosztuje, gdy żadna cecha go nie używa.
+    """
+
+    def __init__(self, block, starts, window_len):
+        self.block = block
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.window_len = window_len
+        self._index = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = PeakIndex(self.block)
+        return self._index
+
+    def counts(self):
+        return self.index.counts(self.starts, self.window_len)
+
+    def intervals(self, fs):
+        return self.index.intervals(self.starts, self.window_len, fs)
+
+def peak_intervals(mask, fs):
+    """
+    Średnia i odchylenie odstępów między kolejnymi pikami (w sekundach) w każdym wierszu maski `mask`
+    (n_rows, n_samples) z `peak_mask`; 0, gdy pików jest mniej niż dwa.
+    """
+    n_rows = len(mask)
+    rows, positions = np.nonzero(mask)
+    same_row = rows[1:] == rows[:-1]
+    intervals = np.diff(positions)[same_row] / fs
+    interval_rows = rows[1:][same_row]
+
+    counts = np.bincount(interval_rows, minlength=n_rows)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(interval_rows, intervals, minlength=n_rows) / counts
+        deviations = intervals - mean[interval_rows]
+        std = np.sqrt(np.bincount(interval_rows, deviations ** 2, minlength=n_rows) / counts)
+    mean[counts == 0] = 0
+    std[counts == 0] = 0
+    return mean, std
+
+def count_peaks(signals):
+    """Liczba lokalnych maksimów w każdym wierszu `signals` (n_windows, n_samples), zgodna z `len(find_peaks(x)[0])`"""
+    return peak_mask(signals).sum(axis=1)
+
+def autocorr_batch(signals, lag=1):
+    """Wsadowa wersja `autocorr` dla wierszy `signals` (n_windows, n_samples)"""
+    if signals.shape[1] <= lag:
+        return np.zeros(len(signals))
+    head = signals[:, :-lag] - signals[:, :-lag].mean(axis=1, keepdims=True)
+    tail = signals[:, lag:] - signals[:, lag:].mean(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = (head * tail).sum(axis=1) / np.sqrt((head ** 2).sum(axis=1) * (tail ** 2).sum(axis=1))
+    # np.corrcoef przycina wynik do [-1, 1]
+    return np.clip(corr, -1, 1)
+
 def extract_temporal_features(window, axes = ['ac_x', 'ac_y', 'ac_z']):
     """
     Wyciąga cechy czasowe z akcelerometru z pojedynczego okna czasowego.
@@ -54,3 +209,46 @@ def extract_temporal_features(window, axes = ['ac_x', 'ac_y', 'ac_z']):
     features['sma'] = sma
 
     return features
+
+
+def extract_temporal_features_batch(windows, axes = ['ac_x', 'ac_y', 'ac_z'], peaks=None):
+    """
+    Wsadowa wersja `extract_temporal_features` dla wielu okien naraz.
+
+    Parametry:
+        windows (np.ndarray): Tensor okien (n_windows, n_samples, n_channels), gdzie kanał `i` odpowiada `axes[i]`
+        peaks (WindowPeaks): opcjonalny indeks pików grupy, z którego pochodzą okna; liczby pików są wtedy
+            odczytywane z indeksu zamiast szukane w każdym oknie
+
+    Zwraca:
+        (np.ndarray, list): macierz cech (n_windows, n_features) i nazwy kolumn w kolejności `extract_temporal_features`
+    """
+    if np.shape(windows)[2] != len(axes):
+        raise ValueError(f"Expected {len(axes)} channels ({axes}), got {np.shape(windows)[2]}.")
+
+    data = np.asarray(windows, dtype=np.float64)
+    n_windows, n_samples, _ = data.shape
+    peak_counts = peaks.counts() if peaks is not None else None
+    columns = []
+    names = []
+
+    for i, axis in enumerate(axes):
+        signal = data[:, :, i]
+        centered = signal - np.mean(signal, axis=1, keepdims=True)
+        columns += [
+            ((signal[:, :-1] * signal[:, 1:]) < 0).sum(axis=1),
+            (centered[:, :-1] * centered[:, 1:] < 0).sum(axis=1),
+            peak_counts[:, i] if peak_counts is not None else count_peaks(signal),
+            np.max(signal, axis=1) - np.min(signal, axis=1),
+            np.sum(signal ** 2, axis=1) / n_samples,
+            autocorr_batch(signal, lag=1),
+            autocorr_batch(signal, lag=5),
+        ]
+        names += [f'{axis}_{name}' for name in (
+            'zero_crossings', 'mean_crossings', 'num_peaks', 'range', 'energy', 'autocorr_lag1', 'autocorr_lag5')]
+
+    # SMA – Signal Magnitude Area (z trzech pierwszych osi)
+    columns.append(np.sum(np.abs(data[:, :, :3]), axis=(1, 2)) / n_samples)
+    names.append('sma')
+
+    return np.column_stack(columns).astype(np.float64), names
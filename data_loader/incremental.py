@@ -0,0 +1,301 @@
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from . import profiling
+from .data_loader import TimeWindowSegmenter
+from .dataset import NAT_MS, SensorDataset
+from .feature_store import _digest, _json_value, callable_fingerprint, extract_matrix, group_peaks
+from .inference import read_recording, segmenter_config
+
+ARCHIVE_VERSION = 1
+
+
+def _slug(value):
+    # czytelna nazwa katalogu + skrót, żeby różne wartości (np. 'a b' i 'a_b') nie trafiły do jednego katalogu
+    return f"{re.sub(r'[^0-9A-Za-z.-]+', '_', str(value))[:40]}-{_digest(repr(value))[:8]}"
+
+
+def _group_dataset(channels, timestamps_ms, pid, act, template, sampling_rate):
+    # zbiór z jedną grupą (osoba, aktywność)
+    n_rows = len(channels)
+    return SensorDataset(
+        channels=np.ascontiguousarray(channels, dtype=np.float32),
+        timestamps_ms=np.asarray(timestamps_ms, dtype=np.int64),
+        subject_codes=np.zeros(n_rows, dtype=np.int32),
+        activity_codes=np.zeros(n_rows, dtype=np.int32),
+        subjects=[pid],
+        activities=[act],
+        channel_names=template.channel_names,
+        sampling_rate=sampling_rate,
+        time_column=template.time_column,
+        id_column=template.id_column,
+        activity_column=template.activity_column,
+    )
+
+
+def concat_datasets(datasets):
+    """
+    Skleja zbiory o tych samych kanałach w jeden `SensorDataset` z grupami w kolejności
+    `groupby([osoba, aktywność], sort=True)`; grupy o tym samym kluczu nie mogą się powtarzać.
+    """
+    if not datasets:
+        raise ValueError("No datasets to concatenate.")
+    first = datasets[0]
+    parts = []
+    for dataset in datasets:
+        if dataset.channel_names != first.channel_names:
+            raise ValueError(f"Channel mismatch: {dataset.channel_names} != {first.channel_names}.")
+        for (pid, act), start, end in zip(dataset.group_keys, dataset.offsets[:-1], dataset.offsets[1:]):
+            parts.append(((pid, act), dataset, start, end))
+
+    subjects = np.asarray(sorted({key[0] for key, *_ in parts}), dtype=object)
+    activities = np.asarray(sorted({key[1] for key, *_ in parts}), dtype=object)
+    subject_index = {value: code for code, value in enumerate(subjects)}
+    activity_index = {value: code for code, value in enumerate(activities)}
+    parts.sort(key=lambda part: (subject_index[part[0][0]], activity_index[part[0][1]]))
+    keys = [key for key, *_ in parts]
+    if len(set(keys)) != len(keys):
+        raise ValueError("Duplicate (subject, activity) groups.")
+
+    lengths = [end - start for _, _, start, end in parts]
+    return SensorDataset(
+        channels=np.concatenate([dataset.channels[start:end] for _, dataset, start, end in parts]),
+        timestamps_ms=np.concatenate([dataset.timestamps_ms[start:end] for _, dataset, start, end in parts]),
+        subject_codes=np.repeat(np.array([subject_index[pid] for pid, _ in keys], dtype=np.int32), lengths),
+        activity_codes=np.repeat(np.array([activity_index[act] for _, act in keys], dtype=np.int32), lengths),
+        subjects=subjects,
+        activities=activities,
+        channel_names=first.channel_names,
+        sampling_rate=first.sampling_rate,
+        time_column=first.time_column,
+        id_column=first.id_column,
+        activity_column=first.activity_column,
+    )
+
+
+class IncrementalArchive:
+    """
+    Przetworzone dane i macierz cech, do których dopisywane są tylko nowe sesje nagrań.
+
+    Każda grupa (osoba, aktywność) ma własny katalog `subjects/<osoba>/<aktywność>/<skrót>` z oczyszczonymi danymi
+    surowymi (`raw`, po `_clean_columns` i `_fix_timestamps`), danymi po `resample_to` (`resampled`) i cechami
+    jej okien (`features.arrow`). `append` przepuszcza przez czyszczenie, resampling, segmentację i ekstrakcję
+    tylko grupy obecne w nowych danych: nowa grupa jest liczona sama, a grupa, która już była w archiwum,
+    jest liczona od nowa z połączenia swoich zapisanych danych surowych i nowych wierszy (tak jak przy
+    przeliczeniu całej historii). Pozostałe grupy nie są wczytywane ani sortowane, więc koszt dopisania zależy
+    od rozmiaru nowych danych, a nie całego archiwum. `manifest.json` jest zapisywany na końcu, więc przerwane
+    dopisywanie nie zmienia archiwum.
+
+    Wyniki odpowiadają przetworzeniu całej historii jednym `TimeWindowSegmenter` i `FeatureStore.features`
+    (z dokładnością do zapisu kanałów w float32, jak w `SensorDataset`).
+
+    Argumenty:
+        root: katalog archiwum
+        extractors: lista ekstraktorów wsadowych `f(windows) -> (macierz, nazwy)` (np. `FeaturePlan`)
+        columns: kanały okien (domyślnie acc + gyr)
+        target_rate_hz: częstotliwość `resample_to` (None – bez resamplingu)
+        clean_columns, fix_timestamps: jak w `TimeWindowSegmenter`
+        segmenter_kwargs: pozostałe parametry `TimeWindowSegmenter` (window_size, step_size, source_sampling_rate,
+            nazwy kolumn, allowed_deviation_ms, gap_mode)
+
+    Ponowne otwarcie archiwum z innymi parametrami lub ekstraktorami zgłasza błąd.
+
+    usage:
+    ```python
+        archive = IncrementalArchive('processed/archive', [plan], target_rate_hz=25, source_sampling_rate=25,
+                                     id_column='person_id', time_column='timestamp', activity_column='activity_label',
+                                     acc_columns=ACC_COLUMNS, gyr_columns=GYR_COLUMNS)
+        archive.append('nowe_sesje.json')
+        X, y, subjects = archive.features()
+    ```
+    """
+
+    def __init__(self, root, extractors, columns=None, target_rate_hz=None, clean_columns=True, fix_timestamps=True,
+                 **segmenter_kwargs):
+        self.root = root
+        self.extractors = list(extractors)
+        self.target_rate_hz = target_rate_hz
+        self.clean_columns = clean_columns
+        self.fix_timestamps = fix_timestamps
+        self.segmenter_kwargs = segmenter_kwargs
+        template = self._segmenter()
+        self.columns = list(columns) if columns is not None else list(template.acc_columns) + list(template.gyr_columns)
+        self.config = dict(
+            segmenter_config(template),
+            target_rate_hz=target_rate_hz,
+            clean_columns=clean_columns,
+            fix_timestamps=fix_timestamps,
+            columns=self.columns,
+            extractors=[callable_fingerprint(func) for func in self.extractors],
+        )
+
+        self.manifest_path = os.path.join(root, 'manifest.json')
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+            if self.manifest.get('version') != ARCHIVE_VERSION:
+                raise ValueError(f"Unsupported archive version {self.manifest.get('version')} in '{root}'.")
+            if self.manifest['config'] != json.loads(json.dumps(self.config)):
+                raise ValueError(f"Archive '{root}' was built with a different configuration or extractors.")
+        else:
+            os.makedirs(root, exist_ok=True)
+            self.manifest = {'version': ARCHIVE_VERSION, 'config': self.config, 'feature_names': None, 'groups': []}
+
+    def _segmenter(self):
+        return TimeWindowSegmenter(clean_columns=False, fix_timestamps=False, **self.segmenter_kwargs)
+
+    @property
+    def groups(self):
+        """Grupy archiwum w kolejności `groupby([osoba, aktywność], sort=True)`."""
+        return self.manifest['groups']
+
+    def _find(self, pid, act):
+        for i, group in enumerate(self.groups):
+            if group['subject'] == pid and group['activity'] == act:
+                return i
+        return None
+
+    def _path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    @profiling.instrumented(
+        rows=lambda self, source, **kwargs: len(source) if isinstance(source, pd.DataFrame) else None
+    )
+    def append(self, source, dump_fs=None):
+        """
+        Dopisuje nowe sesje: DataFrame w układzie surowego eksportu, plik Parquet albo zrzut `wynik.json`
+        (jak `inference.read_recording`; `dump_fs` to częstotliwość próbkowania zrzutu, domyślnie
+        `sensor_dump.DUMP_SAMPLING_RATE`).
+
+        Zwraca:
+            dict: liczba dodanych i przeliczonych grup, nowych wierszy i okien w przeliczonych grupach
+        """
+        segmenter = self._segmenter()
+        segmenter.df = read_recording(source, self.config, dump_fs=dump_fs).copy()
+        if self.clean_columns:
+            segmenter._clean_columns()
+        if self.fix_timestamps:
+            segmenter._fix_timestamps()
+        new = segmenter.to_dataset()
+        missing = sorted(set(self.columns) - set(new.channel_names))
+        if missing:
+            raise ValueError(f"New data has no columns {missing}.")
+
+        summary = {'added': 0, 'updated': 0, 'rows': len(new), 'windows': 0}
+        replaced = []
+        for (pid, act), start, end in zip(new.group_keys, new.offsets[:-1], new.offsets[1:]):
+            pid, act = _json_value(pid), _json_value(act)
+            channels, timestamps = new.channels[start:end], new.timestamps_ms[start:end]
+            index = self._find(pid, act)
+            if index is not None:
+                old = SensorDataset.load(self._path(self.groups[index]['path'], 'raw'))
+                channels = np.concatenate([old.channels, channels])
+                timestamps = np.concatenate([old.timestamps_ms, timestamps])
+                if self.fix_timestamps:
+                    # jak sort_values w _fix_timestamps na całej historii (stabilnie, stare wiersze pierwsze, NaT na końcu)
+                    order = np.argsort(np.where(timestamps == NAT_MS, np.iinfo(np.int64).max, timestamps), kind='stable')
+                    channels, timestamps = channels[order], timestamps[order]
+            raw = _group_dataset(channels, timestamps, pid, act, new, segmenter.sampling_rate)
+            group = self._process_group(raw, pid, act)
+            summary['windows'] += group['windows']
+            if index is None:
+                self.groups.append(group)
+                summary['added'] += 1
+            else:
+                if self.groups[index]['path'] != group['path']:
+                    replaced.append(self.groups[index]['path'])
+                self.groups[index] = group
+                summary['updated'] += 1
+
+        self.groups.sort(key=lambda group: (group['subject'], group['activity']))
+        self._write_manifest()
+        for path in replaced:
+            shutil.rmtree(self._path(path), ignore_errors=True)
+        return summary
+
+    def _process_group(self, raw, pid, act):
+        # resampling, segmentacja i ekstrakcja jednej grupy, jak w segmenterze całej historii
+        fingerprint = raw.content_fingerprint()
+        path = os.path.join('subjects', _slug(pid), _slug(act), fingerprint)
+        raw.save(self._path(path, 'raw'))
+
+        segmenter = self._segmenter()
+        segmenter.dataset = raw
+        if self.target_rate_hz is not None:
+            segmenter.resample_to(self.target_rate_hz)
+            segmenter.dataset.save(self._path(path, 'resampled'))
+
+        matrices, names = [], None
+        window_params = segmenter._window_params()
+        starts = segmenter.group_window_starts()
+        for i, (_, _, block, windows) in enumerate(segmenter.segment_arrays(columns=self.columns)):
+            if len(windows) == 0:
+                continue
+            peaks = group_peaks(block, window_params, starts[i] if starts is not None else None)
+            matrix, names = extract_matrix(windows, self.extractors, peaks)
+            matrices.append(matrix)
+        n_windows = sum(len(matrix) for matrix in matrices)
+        if names is not None:
+            self.manifest['feature_names'] = names
+            matrix = np.concatenate(matrices)
+            table = pa.table({f'{i}': matrix[:, i] for i in range(matrix.shape[1])})
+            with pa.OSFile(self._path(path, 'features.arrow'), 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+
+        return {
+            'subject': pid,
+            'activity': act,
+            'path': path,
+            'raw_rows': len(raw),
+            'rows': len(segmenter.dataset),
+            'windows': n_windows,
+        }
+
+    def _write_json(self, path, data):
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def _write_manifest(self):
+        self._write_json(self.manifest_path, self.manifest)
+
+    def features(self):
+        """
+        Cechy wszystkich okien archiwum (pliki Arrow mapowane z dysku), w kolejności grup jak w `FeatureStore.features`.
+
+        Zwraca:
+            (pd.DataFrame, np.ndarray, np.ndarray): cechy, etykiety aktywności i identyfikatory osób dla każdego okna
+        """
+        groups = [group for group in self.groups if group['windows']]
+        n_windows = [group['windows'] for group in groups]
+        labels = np.repeat(np.array([group['activity'] for group in groups], dtype=object), n_windows)
+        subjects = np.repeat(np.array([group['subject'] for group in groups], dtype=object), n_windows)
+        if not groups:
+            return pd.DataFrame(), labels, subjects
+        tables = [
+            pa.ipc.open_file(pa.memory_map(self._path(group['path'], 'features.arrow'), 'r')).read_all()
+            for group in groups
+        ]
+        X = pa.concat_tables(tables).to_pandas()
+        X.columns = self.manifest['feature_names']
+        return X, labels, subjects
+
+    def dataset(self):
+        """Przetworzone dane (po `resample_to`) wszystkich grup jako jeden `SensorDataset`."""
+        name = 'resampled' if self.target_rate_hz is not None else 'raw'
+        return concat_datasets([SensorDataset.load(self._path(group['path'], name)) for group in self.groups])
+
+    def segmenter(self):
+        """`TimeWindowSegmenter` na danych archiwum, np. dla `WindowBatchGenerator` albo `save_model_bundle`."""
+        segmenter = self._segmenter()
+        segmenter.dataset = self.dataset()
+        segmenter.resampled_rate = self.target_rate_hz
+        return segmenter
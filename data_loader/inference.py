@@ -0,0 +1,571 @@
+"""
+Serwowanie modeli zapisanych z notebooków (SVM/KNN/RandomForest) na surowych nagraniach.
+
+usage:
+```
+    python -m data_loader.inference predict svm_bundle recording.parquet wynik.json --output predictions.csv
+    python -m data_loader.inference serve svm_bundle --port 8000
+    curl --data-binary @recording.parquet http://127.0.0.1:8000/predict
+    curl -H 'Content-Type: application/json' --data-binary @wynik.json http://127.0.0.1:8000/predict
+    curl -H 'X-Sampling-Rate: 50' --data-binary @wynik_50hz.json http://127.0.0.1:8000/predict
+    curl http://127.0.0.1:8000/stats
+```
+"""
+import argparse
+import io
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from . import profiling, sensor_dump
+from .data_loader import TimeWindowSegmenter, sliding_windows
+from .feature_registry import FeaturePlan
+from .feature_selection import FeatureSelection
+from .feature_store import extract_matrix
+
+BUNDLE_VERSION = 1
+
+# nagrania bez etykiet dostają pustą aktywność, żeby groupby w segmenterze ich nie pominął
+_UNLABELLED = ''
+
+
+def segmenter_config(segmenter):
+    """Parametry `TimeWindowSegmenter` potrzebne, żeby w inferencji powstały takie same okna jak w treningu."""
+    return {
+        'window_size': segmenter.window_size,
+        'step_size': segmenter.step_size,
+        'source_sampling_rate': segmenter.sampling_rate,
+        'resampled_rate': segmenter.resampled_rate,
+        'time_column': segmenter.time_column,
+        'id_column': segmenter.id_column,
+        'activity_column': segmenter.activity_column,
+        'acc_columns': list(segmenter.acc_columns),
+        'gyr_columns': list(segmenter.gyr_columns),
+        'allowed_deviation_ms': segmenter.allowed_deviation_ms,
+        'gap_mode': segmenter.gap_mode,
+    }
+
+
+def save_model_bundle(path, model, extractors, segmenter, feature_columns=None, scaler=None, columns=None,
+                      clean_columns=False, fix_timestamps=False, dump_fs=None):
+    """
+    Zapisuje model razem ze wszystkim, czego potrzeba do predykcji na surowych nagraniach: `model.joblib`,
+    opcjonalnie `scaler.joblib` oraz `manifest.json` z parametrami segmentera, kanałami, ekstraktorami
+    i kolumnami cech w kolejności, w jakiej widział je model.
+
+    Argumenty:
+        model: wytrenowany model z metodą `predict`
+        extractors: `FeaturePlan` (zapisywany w manifeście jako wybór cech i parametry), `FeatureSelection`
+            (jej plan i kolumny) albo lista ekstraktorów wsadowych `f(windows) -> (macierz, nazwy)` (zapisywana
+            przez joblib, więc musi dać się zserializować)
+        segmenter: `TimeWindowSegmenter`, na którym liczono cechy treningowe (po `resample_to`)
+        feature_columns: kolumny cech modelu (domyślnie `model.feature_names_in_`, a bez niego wszystkie
+            kolumny ekstraktorów w ich kolejności)
+        scaler: opcjonalny transformator (np. `StandardScaler`) stosowany przed `predict`
+        columns: kanały okien (domyślnie osie planu albo acc + gyr segmentera)
+        clean_columns, fix_timestamps: czy nagrania wymagają czyszczenia jak surowy eksport w `TimeWindowSegmenter`
+        dump_fs: częstotliwość próbkowania zrzutów `wynik.json` wysyłanych do modelu (domyślnie
+            `sensor_dump.DUMP_SAMPLING_RATE`); nie musi być równa częstotliwości danych treningowych
+
+    usage:
+    ```python
+        plan = FeaturePlan(['stats', 'freq'], axes=axes, fs=25)
+        X, y, _ = store.features(segmenter, [plan])
+        model = SVC().fit(X, y)
+        save_model_bundle('svm_bundle', model, plan, segmenter)
+    ```
+    """
+    os.makedirs(path, exist_ok=True)
+    if isinstance(extractors, FeatureSelection):
+        # produkcja liczy tylko cechy z planu selekcji
+        feature_columns = feature_columns if feature_columns is not None else extractors.feature_columns
+        extractors = extractors.plan
+    if columns is None:
+        columns = extractors.axes if isinstance(extractors, FeaturePlan) else segmenter.channel_columns()
+    if feature_columns is None and hasattr(model, 'feature_names_in_'):
+        feature_columns = model.feature_names_in_
+
+    manifest = {
+        'version': BUNDLE_VERSION,
+        'created_at': time.time(),
+        'model': type(model).__name__,
+        'classes': [str(c) for c in getattr(model, 'classes_', [])],
+        'segmenter': dict(segmenter_config(segmenter), clean_columns=clean_columns, fix_timestamps=fix_timestamps,
+                          dump_fs=dump_fs),
+        'columns': list(columns),
+        'feature_columns': None if feature_columns is None else [str(c) for c in feature_columns],
+        'scaler': scaler is not None,
+    }
+    if isinstance(extractors, FeaturePlan):
+        manifest['plan'] = extractors.to_dict()
+        manifest['plan_version'] = extractors.version
+    else:
+        joblib.dump(list(extractors), os.path.join(path, 'extractors.joblib'))
+
+    joblib.dump(model, os.path.join(path, 'model.joblib'))
+    if scaler is not None:
+        joblib.dump(scaler, os.path.join(path, 'scaler.joblib'))
+    # manifest na końcu: przerwany zapis nie zostawia katalogu, który dałoby się wczytać
+    tmp_path = os.path.join(path, 'manifest.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(path, 'manifest.json'))
+
+
+def read_recording(source, config, dump_fs=None):
+    """
+    DataFrame nagrania z pliku Parquet, zrzutu w kształcie `wynik.json` (po rozszerzeniu `.json`), treści żądania
+    (bytes: Parquet rozpoznawany po nagłówku `PAR1`, w przeciwnym razie JSON) albo gotowego DataFrame.
+
+    Zrzuty JSON nie mają znaczników czasu, więc czas liczony jest z częstotliwości zrzutu: `dump_fs`, potem
+    `config['dump_fs']` (z `save_model_bundle`), a domyślnie `sensor_dump.DUMP_SAMPLING_RATE` – nie z częstotliwości
+    danych treningowych, bo `resample_to` przeskalowałby wtedy sygnał w czasie.
+    """
+    if isinstance(source, pd.DataFrame):
+        return source
+    dump_columns = {
+        key: config[key] for key in ['id_column', 'time_column', 'activity_column', 'acc_columns', 'gyr_columns']
+    }
+    fs = dump_fs or config.get('dump_fs') or sensor_dump.DUMP_SAMPLING_RATE
+    if isinstance(source, (bytes, bytearray)):
+        if bytes(source[:4]) == b'PAR1':
+            return pd.read_parquet(io.BytesIO(source), engine="pyarrow")
+        return sensor_dump.sensor_dump_frame(io.StringIO(source.decode('utf-8')), fs=fs, **dump_columns)
+    if str(source).lower().endswith('.json'):
+        return sensor_dump.sensor_dump_frame(source, fs=fs, **dump_columns)
+    return pd.read_parquet(source, engine="pyarrow")
+
+
+class ModelBundle:
+    """
+    Model, skaler i ekstraktory wczytane raz z katalogu `save_model_bundle`.
+
+    `windows(df)` segmentuje nagranie tak jak w treningu, a `predict(windows)` liczy cechy, wybiera kolumny
+    z manifestu, skaluje i wywołuje jeden `predict` dla całego tensora okien.
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, 'manifest.json'), encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('version') != BUNDLE_VERSION:
+            raise ValueError(f"Unsupported bundle version {self.manifest.get('version')} in '{path}'.")
+        self.path = path
+        self.config = self.manifest['segmenter']
+        self.columns = self.manifest['columns']
+        self.feature_columns = self.manifest['feature_columns']
+        self.model = joblib.load(os.path.join(path, 'model.joblib'))
+        self.scaler = joblib.load(os.path.join(path, 'scaler.joblib')) if self.manifest['scaler'] else None
+        if 'plan' in self.manifest:
+            self.extractors = [FeaturePlan.from_dict(self.manifest['plan'])]
+            if self.manifest.get('plan_version') not in (None, self.extractors[0].version):
+                print(f"Warning: feature code changed since '{path}' was saved.", file=sys.stderr)
+        else:
+            self.extractors = joblib.load(os.path.join(path, 'extractors.joblib'))
+        self._column_index = None
+        self._names = None
+        # modele uczone na DataFrame (np. z FeatureStore) oczekują nazw kolumn przy predict
+        self._named_input = hasattr(self.model, 'feature_names_in_')
+        self.window_len = self.segmenter()._window_params()[0]
+
+    def segmenter(self, df=None):
+        config = self.config
+        segmenter = TimeWindowSegmenter(
+            window_size=config['window_size'],
+            step_size=config['step_size'],
+            source_sampling_rate=config['source_sampling_rate'],
+            time_column=config['time_column'],
+            id_column=config['id_column'],
+            activity_column=config['activity_column'],
+            clean_columns=False,
+            fix_timestamps=False,
+            acc_columns=tuple(config['acc_columns']),
+            gyr_columns=tuple(config['gyr_columns']),
+            allowed_deviation_ms=config['allowed_deviation_ms'],
+            gap_mode=config['gap_mode'],
+        )
+        if df is not None:
+            segmenter.df = df
+        return segmenter
+
+    @profiling.instrumented(rows=lambda self, df: len(df), windows=lambda out: len(out[0]))
+    def windows(self, df):
+        """
+        Okna nagrania w tensorze (n_windows, window_len, n_channels) i opis każdego okna.
+
+        Zwraca:
+            (np.ndarray, pd.DataFrame): okna oraz kolumny osoby, aktywności (None dla nagrań bez etykiet)
+            i `window_start` (czas pierwszej próbki okna)
+        """
+        config = self.config
+        df = df.copy()
+        activity_column = config['activity_column']
+        if activity_column not in df:
+            df[activity_column] = _UNLABELLED
+        else:
+            df[activity_column] = df[activity_column].astype(object).where(df[activity_column].notna(), _UNLABELLED)
+
+        segmenter = self.segmenter(df)
+        if config['clean_columns']:
+            segmenter._clean_columns()
+        if config['fix_timestamps']:
+            segmenter._fix_timestamps()
+        if config['resampled_rate']:
+            segmenter.resample_to(config['resampled_rate'])
+
+        keys, blocks, offsets = segmenter.group_blocks(columns=self.columns)
+        _, times_ms, _, _ = segmenter.gap_index()
+        starts = segmenter.group_window_starts()
+        window_len, step, first_start = segmenter._window_params()
+
+        windows, meta = [], []
+        for i, ((pid, act), start, end) in enumerate(zip(keys, offsets[:-1], offsets[1:])):
+            group_starts = starts[i] if starts is not None else None
+            group_windows = sliding_windows(blocks[start:end], window_len, step, first_start, starts=group_starts)
+            if len(group_windows) == 0:
+                continue
+            if group_starts is None:
+                group_starts = first_start + step * np.arange(len(group_windows))
+            windows.append(group_windows)
+            meta.append(pd.DataFrame({
+                config['id_column']: pid,
+                activity_column: None if act == _UNLABELLED else act,
+                'window_start': pd.to_datetime(times_ms[start + group_starts], unit='ms'),
+            }))
+
+        if not windows:
+            return np.empty((0, window_len, len(self.columns)), dtype=np.float32), pd.DataFrame(
+                columns=[config['id_column'], activity_column, 'window_start']
+            )
+        return np.concatenate(windows), pd.concat(meta, ignore_index=True)
+
+    def features(self, windows):
+        """Macierz cech w kolejności `feature_columns` z manifestu."""
+        matrix, names = extract_matrix(windows, self.extractors)
+        if self.feature_columns is None:
+            return matrix
+        if self._names != names:
+            missing = sorted(set(self.feature_columns) - set(names))
+            if missing:
+                raise ValueError(f"Extractors do not produce feature columns required by the model: {missing}")
+            position = {name: i for i, name in enumerate(names)}
+            self._column_index = np.array([position[name] for name in self.feature_columns])
+            self._names = names
+        return matrix[:, self._column_index]
+
+    @profiling.instrumented(windows=len)
+    def predict(self, windows):
+        if len(windows) == 0:
+            return np.empty(0, dtype=object)
+        X = self.features(windows)
+        if self.scaler is not None:
+            X = self.scaler.transform(X)
+        if self._named_input:
+            X = pd.DataFrame(X, columns=self.feature_columns)
+        return self.model.predict(X)
+
+
+class MicroBatcher:
+    """
+    Zbiera okna z równoległych żądań i przepuszcza je przez `predict` jedną paczką.
+
+    Wątek roboczy czeka na pierwsze żądanie, potem najwyżej `max_wait_ms` na kolejne, dopóki paczka nie osiągnie
+    `max_batch_windows` okien; wyniki są dzielone z powrotem na żądania.
+    """
+
+    def __init__(self, predict, max_batch_windows=4096, max_wait_ms=5.0):
+        self.predict = predict
+        self.max_batch_windows = max_batch_windows
+        self.max_wait_ms = max_wait_ms
+        self.queue = queue.Queue()
+        self.batch_sizes = deque(maxlen=10_000)
+        self.busy_seconds = 0.0
+        self.thread = threading.Thread(target=self._run, name='inference-batcher', daemon=True)
+        self.thread.start()
+
+    def submit(self, windows):
+        """Zwraca `Future` z predykcjami dla tensora okien jednego żądania."""
+        future = Future()
+        if len(windows) == 0:
+            future.set_result(np.empty(0, dtype=object))
+        else:
+            self.queue.put((windows, future))
+        return future
+
+    def _collect(self, first):
+        batch = [first]
+        n_windows = len(first[0])
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while n_windows < self.max_batch_windows:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                self.queue.put(None)  # zamknięcie obsłużone po tej paczce
+                break
+            batch.append(item)
+            n_windows += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            batch = self._collect(item)
+            start = time.perf_counter()
+            try:
+                predictions = self.predict(np.concatenate([windows for windows, _ in batch]))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.busy_seconds += time.perf_counter() - start
+            self.batch_sizes.append(len(predictions))
+            bounds = np.cumsum([0] + [len(windows) for windows, _ in batch])
+            for (_, future), start, end in zip(batch, bounds[:-1], bounds[1:]):
+                future.set_result(predictions[start:end])
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+
+class InferenceService:
+    """
+    Długo działający proces predykcji: model, skaler, ekstraktory (i np. bank filtrów MFCC) wczytywane są raz,
+    a pierwsza predykcja na pustym oknie (`warmup`) przenosi koszty leniwej inicjalizacji poza pierwsze żądanie.
+
+    - `predict_recordings` – wiele nagrań naraz (CLI): segmentacja każdego nagrania, potem jeden `predict`
+    - `submit` – pojedyncze nagranie z wątku żądania (HTTP); okna z równoległych żądań łączy `MicroBatcher`
+
+    usage:
+    ```python
+        service = InferenceService('svm_bundle')
+        predictions = service.predict_recordings(['a.parquet', 'wynik.json'])
+        print(service.stats())
+    ```
+    """
+
+    def __init__(self, bundle_path, max_batch_windows=4096, max_wait_ms=5.0, warmup=True, latency_history=10_000,
+                 dump_fs=None):
+        start = time.perf_counter()
+        self.bundle = ModelBundle(bundle_path)
+        # domyślna częstotliwość zrzutów JSON (nadpisuje manifest; pojedyncze żądanie może podać własną)
+        self.dump_fs = dump_fs
+        if warmup:
+            # szum zamiast zer: cechy widmowe stałego sygnału są NaN, a większość modeli ich nie przyjmuje
+            noise = np.random.default_rng(0).standard_normal((1, self.bundle.window_len, len(self.bundle.columns)))
+            self.bundle.predict(noise.astype(np.float32))
+        self.load_seconds = time.perf_counter() - start
+        self.batcher = MicroBatcher(self.bundle.predict, max_batch_windows, max_wait_ms)
+        self.latencies = deque(maxlen=latency_history)  # czas obsługi jednego żądania w sekundach
+        self.started_at = time.time()
+        self.n_requests = 0
+        self.n_windows = 0
+        self._lock = threading.Lock()
+
+    def _record(self, start, n_windows):
+        with self._lock:
+            self.latencies.append(time.perf_counter() - start)
+            self.n_requests += 1
+            self.n_windows += n_windows
+
+    def submit(self, source, name=None, dump_fs=None):
+        """
+        Predykcje dla jednego nagrania; bezpieczne do wołania z wielu wątków naraz. `dump_fs` – częstotliwość
+        zrzutu JSON, jak w `read_recording`.
+
+        Zwraca:
+            pd.DataFrame: opis okien z `ModelBundle.windows`, kolumna `recording` i `prediction`
+        """
+        start = time.perf_counter()
+        windows, meta = self.bundle.windows(read_recording(source, self.bundle.config, dump_fs or self.dump_fs))
+        meta.insert(0, 'recording', name)
+        meta['prediction'] = self.batcher.submit(windows).result()
+        self._record(start, len(windows))
+        return meta
+
+    def predict_recordings(self, sources, names=None, dump_fs=None):
+        """
+        Predykcje dla wielu nagrań: okna wszystkich nagrań idą do modelu jednym wywołaniem `predict`.
+
+        Zwraca:
+            pd.DataFrame: jak `submit`, nagrania po kolei
+        """
+        start = time.perf_counter()
+        names = names if names is not None else [str(source) for source in sources]
+        windows, meta = [], []
+        for name, source in zip(names, sources):
+            recording_windows, recording_meta = self.bundle.windows(
+                read_recording(source, self.bundle.config, dump_fs or self.dump_fs)
+            )
+            recording_meta.insert(0, 'recording', name)
+            windows.append(recording_windows)
+            meta.append(recording_meta)
+        if not windows:
+            return pd.DataFrame(columns=['recording', 'prediction'])
+
+        windows = np.concatenate(windows)
+        meta = pd.concat(meta, ignore_index=True)
+        predict_start = time.perf_counter()
+        meta['prediction'] = self.bundle.predict(windows)
+        with self._lock:
+            self.batcher.busy_seconds += time.perf_counter() - predict_start
+            self.batcher.batch_sizes.append(len(windows))
+        self._record(start, len(windows))
+        return meta
+
+    def stats(self):
+        """Czasy obsługi żądań (ms) z ostatnich `latency_history` żądań i przepustowość modelu."""
+        with self._lock:
+            latencies = np.array(self.latencies) * 1000
+            report = {
+                'model': self.bundle.manifest['model'],
+                'load_s': self.load_seconds,
+                'uptime_s': time.time() - self.started_at,
+                'requests': self.n_requests,
+                'windows': self.n_windows,
+            }
+        batch_sizes = np.array(self.batcher.batch_sizes)
+        if len(batch_sizes):
+            report['batches'] = len(batch_sizes)
+            report['mean_batch_windows'] = float(batch_sizes.mean())
+            report['windows_per_s'] = float(batch_sizes.sum() / self.batcher.busy_seconds) if self.batcher.busy_seconds else None
+        if len(latencies):
+            report.update({
+                'mean_ms': float(latencies.mean()),
+                'p50_ms': float(np.percentile(latencies, 50)),
+                'p99_ms': float(np.percentile(latencies, 99)),
+                'max_ms': float(latencies.max()),
+                'requests_per_s': self.n_requests / report['uptime_s'],
+            })
+        return report
+
+    def close(self):
+        self.batcher.close()
+
+
+def _positive_rate(value):
+    try:
+        rate = float(value)
+    except (TypeError, ValueError):
+        rate = float('nan')
+    if not rate > 0:
+        raise ValueError(f"Invalid sampling rate '{value}'.")
+    return int(rate) if rate.is_integer() else rate
+
+
+def _handler(service):
+    class InferenceHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, data):
+            body = json.dumps(data, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send_json(200, {'status': 'ok'})
+            elif self.path == '/stats':
+                self._send_json(200, service.stats())
+            else:
+                self._send_json(404, {'error': f"Unknown path '{self.path}'."})
+
+        def do_POST(self):
+            if self.path.split('?')[0] != '/predict':
+                self._send_json(404, {'error': f"Unknown path '{self.path}'."})
+                return
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            start = time.perf_counter()
+            try:
+                # częstotliwość zrzutu JSON: nagłówek X-Sampling-Rate albo ?dump_fs=...
+                query = parse_qs(urlsplit(self.path).query)
+                dump_fs = self.headers.get('X-Sampling-Rate') or query.get('dump_fs', [None])[0]
+                dump_fs = _positive_rate(dump_fs) if dump_fs is not None else None
+                predictions = service.submit(body, name=self.headers.get('X-Recording'), dump_fs=dump_fs)
+            except (ValueError, KeyError, OSError) as e:
+                self._send_json(400, {'error': str(e)})
+                return
+            except Exception as e:
+                # każde żądanie dostaje odpowiedź, także przy nieprzewidzianym błędzie (np. listy w kolumnach Parquet)
+                sys.stderr.write(f"{self.address_string()} - POST {self.path} failed:\n{traceback.format_exc()}")
+                self._send_json(500, {'error': f"{type(e).__name__}: {e}"})
+                return
+            self._send_json(200, {
+                'latency_ms': (time.perf_counter() - start) * 1000,
+                'predictions': json.loads(predictions.to_json(orient='records', date_format='iso')),
+            })
+
+        def log_message(self, format, *args):
+            pass  # czasy żądań są w /stats
+
+    return InferenceHandler
+
+
+def make_server(service, host='127.0.0.1', port=8000):
+    """Wielowątkowy serwer HTTP: `POST /predict` (Parquet albo JSON w treści), `GET /stats`, `GET /health`."""
+    return ThreadingHTTPServer((host, port), _handler(service))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    predict = commands.add_parser('predict', help="predykcje dla plików nagrań (jeden predict dla wszystkich)")
+    predict.add_argument('bundle', help="katalog z save_model_bundle")
+    predict.add_argument('recordings', nargs='+', help="pliki Parquet lub zrzuty JSON (wynik.json)")
+    predict.add_argument('--output', help="plik CSV z predykcjami (domyślnie stdout)")
+    predict.add_argument('--dump-fs', type=_positive_rate, help="częstotliwość zrzutów JSON (domyślnie z manifestu, "
+                                                                   f"inaczej {sensor_dump.DUMP_SAMPLING_RATE} Hz)")
+    serve = commands.add_parser('serve', help="lokalny serwer HTTP")
+    serve.add_argument('bundle', help="katalog z save_model_bundle")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8000)
+    serve.add_argument('--max-batch-windows', type=int, default=4096)
+    serve.add_argument('--max-wait-ms', type=float, default=5.0, help="jak długo czekać na kolejne żądania do paczki")
+    serve.add_argument('--dump-fs', type=_positive_rate, help="domyślna częstotliwość zrzutów JSON "
+                                                                 "(żądanie może podać X-Sampling-Rate)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'predict':
+        service = InferenceService(args.bundle, dump_fs=args.dump_fs)
+        predictions = service.predict_recordings(args.recordings)
+        predictions.to_csv(args.output or sys.stdout, index=False)
+        print(json.dumps(service.stats(), indent=2), file=sys.stderr)
+        service.close()
+        return 0
+
+    service = InferenceService(args.bundle, max_batch_windows=args.max_batch_windows, max_wait_ms=args.max_wait_ms,
+                               dump_fs=args.dump_fs)
+    server = make_server(service, args.host, args.port)
+    print(f"Serving {service.bundle.manifest['model']} on http://{args.host}:{args.port} "
+          f"(loaded in {service.load_seconds:.2f} s)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
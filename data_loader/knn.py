@@ -0,0 +1,292 @@
+"""
+Klasyfikator KNN na macierzy cech z ekstraktorów data_loader (zamiennik `KNeighborsClassifier` z notebooków KNN).
+
+usage:
+```python
+    X, y, subjects = store.features(segmenter, [plan])
+    knn = BlockedKNN(n_neighbors=11, n_jobs=4).fit(X_train, y_train)
+    y_pred = knn.predict(X_val)
+    save_model_bundle('knn_bundle', knn, plan, segmenter)
+```
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+
+INDEX_TYPES = ('flat', 'pq')
+WEIGHTS = ('uniform', 'distance')
+
+
+def _squared_norms(X):
+    return np.einsum('ij,ij->i', X, X)
+
+
+def _smallest_k(dist, idx, k):
+    """`k` najmniejszych odległości w każdym wierszu (argpartition, bez sortowania) i odpowiadające im indeksy."""
+    if dist.shape[1] <= k:
+        return dist, idx
+    part = np.argpartition(dist, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(dist, part, axis=1), np.take_along_axis(idx, part, axis=1)
+
+
+def _top_k(Q, n_reference, k, reference_blocks, reference_block):
+    # reference_blocks(start, end) -> (wiersze wzorców float32, ich ||r||²); ||q||² nie zmienia kolejności
+    # sąsiadów, więc jest dodawane dopiero do `k` wybranych odległości
+    Q2 = -2 * Q
+    best_dist = np.empty((len(Q), 0), dtype=np.float32)
+    best_idx = np.empty((len(Q), 0), dtype=np.int64)
+    for start in range(0, n_reference, reference_block):
+        block, r_norms = reference_blocks(start, min(start + reference_block, n_reference))
+        dist = Q2 @ block.T
+        dist += r_norms
+        if dist.shape[1] > k:
+            part = np.argpartition(dist, k - 1, axis=1)[:, :k]
+            dist, idx = np.take_along_axis(dist, part, axis=1), part + start
+        else:
+            idx = np.broadcast_to(np.arange(start, start + dist.shape[1]), dist.shape)
+        best_dist, best_idx = _smallest_k(
+            np.concatenate([best_dist, dist], axis=1), np.concatenate([best_idx, idx], axis=1), k
+        )
+    order = np.argsort(best_dist, axis=1, kind='stable')
+    best_dist = np.take_along_axis(best_dist, order, axis=1) + _squared_norms(Q)[:, None]
+    # max(0, ...) – błędy zaokrągleń przy prawie identycznych wierszach
+    return np.maximum(best_dist, 0), np.take_along_axis(best_idx, order, axis=1)
+
+
+def blocked_top_k(Q, R, k, r_norms=None, reference_block=16384):
+    """
+    `k` najbliższych (kwadrat odległości euklidesowej) wierszy `R` dla każdego wiersza `Q`, liczone blokami `R`
+    po `reference_block` wierszy: ||q||² - 2 q·r + ||r||² z jednego mnożenia macierzy float32 (BLAS) na blok,
+    a `argpartition` utrzymuje tylko `k` kandydatów, więc pamięć to (len(Q), reference_block) niezależnie od len(R).
+
+    Zwraca:
+        (np.ndarray, np.ndarray): odległości (len(Q), k) float32 posortowane rosnąco i indeksy wierszy `R`
+    """
+    r_norms = _squared_norms(R) if r_norms is None else r_norms
+    return _top_k(Q, len(R), k, lambda start, end: (R[start:end], r_norms[start:end]), reference_block)
+
+
+def _nearest(X, centroids, block=16384):
+    # indeks najbliższego centroidu każdego wiersza (||x||² nie zmienia argmin)
+    c_norms = _squared_norms(centroids)
+    labels = np.empty(len(X), dtype=np.int64)
+    for start in range(0, len(X), block):
+        dist = X[start:start + block] @ centroids.T
+        dist *= -2
+        dist += c_norms
+        labels[start:start + block] = np.argmin(dist, axis=1)
+    return labels
+
+
+def _kmeans(X, n_clusters, n_iter, rng):
+    # Lloyd na float32; puste skupienia dostają losowy punkt
+    centroids = X[rng.choice(len(X), size=n_clusters, replace=len(X) < n_clusters)].copy()
+    for _ in range(n_iter):
+        labels = _nearest(X, centroids)
+        counts = np.bincount(labels, minlength=n_clusters)
+        sums = np.zeros((n_clusters, X.shape[1]))
+        for dim in range(X.shape[1]):
+            sums[:, dim] = np.bincount(labels, X[:, dim], minlength=n_clusters)
+        empty = counts == 0
+        centroids[~empty] = (sums[~empty] / counts[~empty, None]).astype(np.float32)
+        centroids[empty] = X[rng.choice(len(X), size=int(empty.sum()))]
+    return centroids
+
+
+class ProductQuantizer:
+    """
+    Kwantyzacja iloczynowa: wektor dzielony jest na `n_subspaces` części, a każda część zapisywana jako numer
+    najbliższego z `2 ** bits` centroidów swojej podprzestrzeni (1 bajt przy `bits=8`).
+
+    Odległość zapytania do zakodowanego wektora (ADC) to odległość do jego rekonstrukcji ze złożonych centroidów,
+    więc `top_k` odtwarza kolejne bloki wzorców do float32 i liczy je tym samym mnożeniem macierzy co indeks
+    płaski – w pamięci zostają tylko kody i jeden odtworzony blok.
+    """
+
+    def __init__(self, n_subspaces, bits=8, n_iter=15, max_train=65536, random_state=0):
+        if not 1 <= bits <= 8:
+            raise ValueError(f"bits must be in 1..8, got {bits}.")
+        self.n_subspaces = n_subspaces
+        self.bits = bits
+        self.n_iter = n_iter
+        self.max_train = max_train
+        self.random_state = random_state
+
+    def fit(self, X):
+        rng = np.random.default_rng(self.random_state)
+        n_features = X.shape[1]
+        if not 1 <= self.n_subspaces <= n_features:
+            raise ValueError(f"n_subspaces must be in 1..{n_features}, got {self.n_subspaces}.")
+        self.bounds_ = np.linspace(0, n_features, self.n_subspaces + 1).astype(int)
+        sample = X[rng.choice(len(X), size=self.max_train, replace=False)] if len(X) > self.max_train else X
+        self.centroids_ = [
+            _kmeans(np.ascontiguousarray(sample[:, lo:hi]), 2 ** self.bits, self.n_iter, rng)
+            for lo, hi in zip(self.bounds_[:-1], self.bounds_[1:])
+        ]
+        return self
+
+    def encode(self, X):
+        codes = np.empty((len(X), self.n_subspaces), dtype=np.uint8)
+        for j, (lo, hi) in enumerate(zip(self.bounds_[:-1], self.bounds_[1:])):
+            codes[:, j] = _nearest(np.ascontiguousarray(X[:, lo:hi]), self.centroids_[j])
+        return codes
+
+    def decode(self, codes):
+        """Rekonstrukcja float32 (len(codes), n_features) z kodów."""
+        return np.concatenate([centroids[codes[:, j]] for j, centroids in enumerate(self.centroids_)], axis=1)
+
+    def top_k(self, Q, codes, k, reference_block=16384):
+        def reference_blocks(start, end):
+            block = self.decode(codes[start:end])
+            return block, _squared_norms(block)
+
+        return _top_k(Q, len(codes), k, reference_blocks, reference_block)
+
+
+class BlockedKNN(ClassifierMixin, BaseEstimator):
+    """
+    KNN (metryka euklidesowa) ze standaryzacją jak `StandardScaler` i macierzą wzorców trzymaną jako ciągła
+    tablica float32.
+
+    Zapytania są dzielone na bloki po `query_block` wierszy (liczone równolegle w `n_jobs` wątkach – BLAS zwalnia
+    GIL), a dla każdego bloku odległości do wzorców liczone są blokami po `reference_block` wierszy jednym
+    mnożeniem macierzy, z `argpartition` zamiast pełnego sortowania (`blocked_top_k`). Przy dużych zbiorach
+    wzorców indeks można skompresować: `pca_components` rzutuje cechy na główne składowe, a `index='pq'`
+    przechowuje tylko kody kwantyzacji iloczynowej (`ProductQuantizer`, `pq_subspaces` bajtów na wzorzec);
+    wtedy sąsiedzi są przybliżeni.
+
+    Jest estymatorem sklearn (`fit`, `predict`, `predict_proba`, `kneighbors`, `score`), więc działa
+    z `cross_val_score`, `joblib.dump` i `inference.save_model_bundle`.
+
+    Argumenty:
+        n_neighbors: liczba sąsiadów
+        weights: 'uniform' (głosowanie większościowe jak w notebookach) albo 'distance' (waga 1 / odległość)
+        standardize: standaryzacja cech (średnia 0, odchylenie 1) liczona na zbiorze uczącym
+        index: 'flat' (dokładne odległości) albo 'pq'
+        pca_components: liczba głównych składowych (None – bez PCA)
+        pq_subspaces: liczba podprzestrzeni PQ (domyślnie połowa liczby wymiarów, najwyżej 32)
+        n_jobs: liczba wątków (-1 – wszystkie rdzenie)
+    """
+
+    def __init__(self, n_neighbors=5, weights='uniform', standardize=True, index='flat', pca_components=None,
+                 pq_subspaces=None, pq_bits=8, query_block=1024, reference_block=16384, n_jobs=1, random_state=0):
+        self.n_neighbors = n_neighbors
+        self.weights = weights
+        self.standardize = standardize
+        self.index = index
+        self.pca_components = pca_components
+        self.pq_subspaces = pq_subspaces
+        self.pq_bits = pq_bits
+        self.query_block = query_block
+        self.reference_block = reference_block
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+
+    def _check_array(self, X):
+        if hasattr(X, 'columns'):
+            X = X.to_numpy()
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2:
+            raise ValueError(f"Expected a 2-D feature matrix, got shape {X.shape}.")
+        if not np.isfinite(X).all():
+            raise ValueError("Feature matrix contains NaN or infinite values; fill them first (e.g. fillna(0)).")
+        return X
+
+    def _transform(self, X):
+        # standaryzacja i PCA w float64, wynik jako ciągły float32
+        X = self._check_array(X)
+        if X.shape[1] != len(self.mean_):
+            raise ValueError(f"Expected {len(self.mean_)} features, got {X.shape[1]}.")
+        X = (X - self.mean_) / self.scale_
+        if self.components_ is not None:
+            X = X @ self.components_.T
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def fit(self, X, y):
+        if self.index not in INDEX_TYPES:
+            raise ValueError(f"Unknown index '{self.index}'. Available: {INDEX_TYPES}")
+        if self.weights not in WEIGHTS:
+            raise ValueError(f"Unknown weights '{self.weights}'. Available: {WEIGHTS}")
+        if hasattr(X, 'columns'):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        X = self._check_array(X)
+        self.n_features_in_ = X.shape[1]
+        self.classes_, self._y = np.unique(np.asarray(y), return_inverse=True)
+        if len(X) != len(self._y):
+            raise ValueError(f"X has {len(X)} rows but y has {len(self._y)}.")
+
+        if self.standardize:
+            self.mean_ = X.mean(axis=0)
+            scale = X.std(axis=0)
+            self.scale_ = np.where(scale > 0, scale, 1.0)
+        else:
+            self.mean_, self.scale_ = np.zeros(X.shape[1]), np.ones(X.shape[1])
+
+        self.components_ = None
+        if self.pca_components is not None:
+            centered = (X - self.mean_) / self.scale_
+            centered -= centered.mean(axis=0)
+            _, _, vt = np.linalg.svd(centered, full_matrices=False)
+            self.components_ = vt[:self.pca_components]
+
+        reference = self._transform(X)
+        self.pq_ = None
+        if self.index == 'pq':
+            n_subspaces = self.pq_subspaces or max(1, min(32, reference.shape[1] // 2))
+            self.pq_ = ProductQuantizer(n_subspaces, bits=self.pq_bits, random_state=self.random_state).fit(reference)
+            self.codes_ = self.pq_.encode(reference)
+            self.reference_ = None
+        else:
+            self.reference_ = reference
+            self.reference_norms_ = _squared_norms(reference)
+        return self
+
+    @property
+    def index_nbytes(self):
+        """Rozmiar przechowywanych wzorców (float32 albo kody PQ) w bajtach."""
+        return self.codes_.nbytes if self.pq_ is not None else self.reference_.nbytes
+
+    def _query_block(self, Q, k):
+        if self.pq_ is not None:
+            return self.pq_.top_k(Q, self.codes_, k, self.reference_block)
+        return blocked_top_k(Q, self.reference_, k, self.reference_norms_, self.reference_block)
+
+    def kneighbors(self, X, n_neighbors=None, return_distance=True):
+        """Odległości euklidesowe (w przestrzeni po standaryzacji/PCA) i indeksy `n_neighbors` najbliższych wzorców."""
+        k = min(n_neighbors or self.n_neighbors, len(self._y))
+        Q = self._transform(X)
+        blocks = [Q[start:start + self.query_block] for start in range(0, len(Q), self.query_block)]
+        n_jobs = os.cpu_count() if self.n_jobs == -1 else self.n_jobs
+        if n_jobs > 1 and len(blocks) > 1:
+            with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+                results = list(executor.map(lambda block: self._query_block(block, k), blocks))
+        else:
+            results = [self._query_block(block, k) for block in blocks]
+        if results:
+            dist = np.concatenate([d for d, _ in results])
+            idx = np.concatenate([i for _, i in results])
+        else:
+            dist, idx = np.empty((0, k), dtype=np.float32), np.empty((0, k), dtype=np.int64)
+        if not return_distance:
+            return idx
+        return np.sqrt(dist), idx
+
+    def predict_proba(self, X):
+        dist, idx = self.kneighbors(X)
+        if self.weights == 'distance':
+            with np.errstate(divide='ignore'):
+                weights = 1.0 / dist.astype(np.float64)
+            # jak w sklearn: zapytanie identyczne z wzorcem głosuje tylko nim
+            exact = np.isinf(weights)
+            weights[exact.any(axis=1)] = exact[exact.any(axis=1)]
+        else:
+            weights = np.ones(idx.shape)
+        votes = np.zeros((len(idx), len(self.classes_)))
+        np.add.at(votes, (np.repeat(np.arange(len(idx)), idx.shape[1]), self._y[idx].ravel()), weights.ravel())
+        return votes / votes.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        # remis rozstrzygany na rzecz pierwszej klasy w `classes_` (jak `KNeighborsClassifier`)
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
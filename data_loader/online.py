@@ -0,0 +1,292 @@
+import time
+from collections import deque
+
+import numpy as np
+
+from . import features_freq
+
+INCREMENTAL_STATS = ['mean', 'std', 'min', 'max', 'rms', 'abs_sum', 'energy', 'zero_crossings', 'range']
+
+
+class OnlineFeatures:
+    """
+    Zestaw cech, który da się utrzymywać przyrostowo na strumieniu próbek.
+
+    Dla każdego kanału: mean, std, min, max, rms, abs_sum, energy (jak w `features_accelerometer`),
+    zero_crossings i range (jak w `features_temporal`) oraz cechy widmowe z `features_freq.spectral_features`,
+    a dodatkowo `sma` z trzech pierwszych kanałów. `batch()` liczy te same cechy dla tensora okien,
+    więc model trenowany offline na `batch()` dostaje w trybie online identyczny wektor cech.
+    """
+
+    def __init__(self, axes=('ac_x', 'ac_y', 'ac_z', 'g_x', 'g_y', 'g_z'), fs=20, spectral=True):
+        self.axes = list(axes)
+        self.fs = fs
+        self.spectral = spectral
+        self.names = [f'{axis}_{stat}' for axis in self.axes for stat in INCREMENTAL_STATS]
+        if spectral:
+            self.names += [f'{axis}_{name}' for axis in self.axes for name in features_freq.SPECTRAL_FEATURE_NAMES]
+        self.names.append('sma')
+
+    def batch(self, windows):
+        """
+        Cechy dla tensora okien (n_windows, n_samples, n_channels).
+
+        Zwraca:
+            (np.ndarray, list): macierz cech i nazwy kolumn
+        """
+        data = np.asarray(windows, dtype=np.float64)
+        n_samples = data.shape[1]
+        squared = np.sum(data ** 2, axis=1)
+        data_min, data_max = np.min(data, axis=1), np.max(data, axis=1)
+        stats = [
+            np.mean(data, axis=1),
+            np.std(data, axis=1),
+            data_min,
+            data_max,
+            np.sqrt(squared / n_samples),
+            np.sum(np.abs(data), axis=1),
+            squared,
+            ((data[:, :-1] * data[:, 1:]) < 0).sum(axis=1),
+            data_max - data_min,
+        ]
+        columns = [np.stack(stats, axis=2).reshape(len(data), -1)]
+        if self.spectral:
+            spectral, _ = features_freq.spectral_features(np.moveaxis(data, 1, 2), self.fs)
+            columns.append(spectral.reshape(len(data), -1))
+        columns.append((np.sum(np.abs(data[:, :, :3]), axis=(1, 2)) / n_samples)[:, None])
+        return np.concatenate(columns, axis=1), list(self.names)
+
+
+class RingBufferWindow:
+    """
+    Bufor cykliczny ostatnich `window_len` próbek jednego urządzenia z przyrostowo utrzymywanymi statystykami:
+    sumy (mean/var/energy/RMS/SMA), monotoniczne kolejki dla min/max i kroczący licznik przejść przez zero.
+    """
+
+    def __init__(self, window_len, n_channels, resync_every=None):
+        self.window_len = window_len
+        self.n_channels = n_channels
+        self.data = np.zeros((window_len, n_channels))
+        self.n_seen = 0
+        self.sum = np.zeros(n_channels)
+        self.sum_sq = np.zeros(n_channels)
+        self.abs_sum = np.zeros(n_channels)
+        self.zero_crossings = np.zeros(n_channels, dtype=np.int64)
+        self.min_deques = [deque() for _ in range(n_channels)]
+        self.max_deques = [deque() for _ in range(n_channels)]
+        # sumy bieżące gromadzą błąd zaokrągleń, więc co jakiś czas liczymy je od nowa z bufora
+        self.resync_every = resync_every or 64 * window_len
+
+    @property
+    def full(self):
+        return self.n_seen >= self.window_len
+
+    def push(self, sample):
+        sample = np.asarray(sample, dtype=np.float64)
+        n = self.window_len
+        pos = self.n_seen % n
+
+        if self.n_seen >= n:
+            old = self.data[pos]
+            self.sum -= old
+            self.sum_sq -= old ** 2
+            self.abs_sum -= np.abs(old)
+            if n > 1:
+                self.zero_crossings -= (old * self.data[(pos + 1) % n]) < 0
+        if self.n_seen > 0 and n > 1:
+            self.zero_crossings += (self.data[(pos - 1) % n] * sample) < 0
+
+        self.data[pos] = sample
+        self.sum += sample
+        self.sum_sq += sample ** 2
+        self.abs_sum += np.abs(sample)
+
+        index = self.n_seen
+        expired = index - n
+        for channel, value in enumerate(sample.tolist()):
+            min_deque = self.min_deques[channel]
+            while min_deque and min_deque[-1][1] >= value:
+                min_deque.pop()
+            min_deque.append((index, value))
+            if min_deque[0][0] <= expired:
+                min_deque.popleft()
+
+            max_deque = self.max_deques[channel]
+            while max_deque and max_deque[-1][1] <= value:
+                max_deque.pop()
+            max_deque.append((index, value))
+            if max_deque[0][0] <= expired:
+                max_deque.popleft()
+
+        self.n_seen += 1
+        if self.n_seen % self.resync_every == 0:
+            self._resync()
+
+    def _resync(self):
+        window = self.data if self.full else self.data[:self.n_seen]
+        self.sum = window.sum(axis=0)
+        self.sum_sq = (window ** 2).sum(axis=0)
+        self.abs_sum = np.abs(window).sum(axis=0)
+
+    def window(self):
+        """Próbki bieżącego okna w kolejności chronologicznej (n_samples, n_channels)."""
+        if not self.full:
+            return self.data[:self.n_seen].copy()
+        pos = self.n_seen % self.window_len
+        return np.concatenate((self.data[pos:], self.data[:pos]))
+
+    def incremental_stats(self):
+        """Statystyki z `INCREMENTAL_STATS` jako macierz (n_channels, n_stats), bez przeglądania bufora."""
+        n = min(self.n_seen, self.window_len)
+        mean = self.sum / n
+        variance = np.maximum(self.sum_sq / n - mean ** 2, 0)
+        data_min = np.array([d[0][1] for d in self.min_deques])
+        data_max = np.array([d[0][1] for d in self.max_deques])
+        return np.stack([
+            mean,
+            np.sqrt(variance),
+            data_min,
+            data_max,
+            np.sqrt(self.sum_sq / n),
+            self.abs_sum,
+            self.sum_sq,
+            self.zero_crossings,
+            data_max - data_min,
+        ], axis=1)
+
+
+class StreamingClassifier:
+    """
+    Klasyfikacja aktywności w czasie rzeczywistym dla wielu urządzeń w jednym procesie.
+
+    Każde urządzenie ma własny `RingBufferWindow` o długości `window_size * sampling_rate` próbek; po zapełnieniu
+    bufora co `step_size * sampling_rate` próbek emitowana jest predykcja. Statystyki czasowe są aktualizowane
+    przyrostowo przy każdej próbce, a cechy widmowe liczone są tylko w chwili emisji. Predykcje ze wszystkich emisji
+    w jednym wywołaniu `push` idą do modelu jednym `predict`.
+
+    Czas obsługi `push` jest ograniczany do `latency_budget_ms` na próbkę: gdy paczka przekroczy budżet, kolejne
+    emisje zapisują tylko statystyki przyrostowe i kopię okna, a cechy widmowe i predykcja dla nich są odkładane
+    i liczone na końcu następnych wywołań `push`, o ile zostaje w nich budżet (albo przez `flush()`). Odłożone
+    predykcje mają swój numer próbki i urządzenie, więc mogą wrócić z `push` innego urządzenia. Kolejka ma najwyżej
+    `max_pending` okien; przy przepełnieniu najstarsze są porzucane (`latency_report()['dropped']`).
+
+    usage:
+    ```python
+        features = OnlineFeatures(axes=axes, fs=25)
+        X, _ = features.batch(windows)  # trening offline na tych samych cechach
+        model.fit(X, labels)
+        classifier = StreamingClassifier(model, features, sampling_rate=25, window_size=10, step_size=2)
+        for device_id, sample_number, label in classifier.push('watch-1', samples):
+            print(device_id, label)
+    ```
+    """
+
+    def __init__(self, model, features, sampling_rate=25, window_size=10, step_size=2, latency_budget_ms=None,
+                 latency_history=10_000, max_pending=1000):
+        self.model = model
+        self.features = features
+        self.window_len = int(window_size * sampling_rate)
+        self.step = int(step_size * sampling_rate)
+        self.latency_budget_ms = latency_budget_ms if latency_budget_ms is not None else 1000 / sampling_rate
+        self.devices = {}
+        self.latencies = deque(maxlen=latency_history)  # czas obsługi jednej próbki w sekundach
+        self.n_samples = 0
+        self.n_over_budget = 0
+        self.pending = deque()  # odłożone emisje: (device_id, numer_próbki, statystyki, okno, abs)
+        self.max_pending = max_pending
+        self.n_deferred = 0
+        self.n_dropped = 0
+
+    def _device(self, device_id):
+        if device_id not in self.devices:
+            self.devices[device_id] = RingBufferWindow(self.window_len, len(self.features.axes))
+        return self.devices[device_id]
+
+    def _snapshot(self, buffer):
+        # wszystko, czego wektor cech potrzebuje z bufora w chwili emisji (okno jest kopią)
+        return buffer.incremental_stats().reshape(-1), buffer.window(), buffer.abs_sum[:3].sum() / self.window_len
+
+    def _feature_vector(self, stats, window, acc_abs_mean):
+        columns = [stats]
+        if self.features.spectral:
+            spectral, _ = features_freq.spectral_features(window.T, self.features.fs)
+            columns.append(spectral.reshape(-1))
+        columns.append([acc_abs_mean])
+        return np.concatenate(columns)
+
+    def _defer(self, device_id, sample_number, buffer):
+        if len(self.pending) >= self.max_pending:
+            self.pending.popleft()
+            self.n_dropped += 1
+        self.pending.append((device_id, sample_number, *self._snapshot(buffer)))
+        self.n_deferred += 1
+
+    def push(self, device_id, samples):
+        """
+        Dodaje jedną próbkę (n_channels,) lub paczkę próbek (n, n_channels) z danego urządzenia. Pusta paczka
+        niczego nie zmienia (nie liczy się też do statystyk opóźnień).
+
+        Zwraca:
+            list: krotki (device_id, numer_próbki, predykcja) dla okien zamkniętych w tej paczce i odłożonych
+                wcześniej okien policzonych w pozostałym budżecie
+        """
+        start = time.perf_counter()
+        samples = np.asarray(samples, dtype=np.float64)
+        if samples.size == 0:
+            return []
+        samples = np.atleast_2d(samples)
+        buffer = self._device(device_id)
+        deadline = start + self.latency_budget_ms / 1000 * len(samples)
+
+        emitted, vectors = [], []
+        for sample in samples:
+            buffer.push(sample)
+            if buffer.full and (buffer.n_seen - self.window_len) % self.step == 0:
+                if time.perf_counter() > deadline:
+                    self._defer(device_id, buffer.n_seen, buffer)
+                else:
+                    emitted.append((device_id, buffer.n_seen))
+                    vectors.append(self._feature_vector(*self._snapshot(buffer)))
+
+        # odłożone okna (od najstarszych) w budżecie, który został po tej paczce
+        while self.pending and time.perf_counter() <= deadline:
+            pending_device, sample_number, *snapshot = self.pending.popleft()
+            emitted.append((pending_device, sample_number))
+            vectors.append(self._feature_vector(*snapshot))
+
+        predictions = self.model.predict(np.vstack(vectors)) if vectors else []
+
+        per_sample = (time.perf_counter() - start) / len(samples)
+        self.latencies.extend([per_sample] * min(len(samples), self.latencies.maxlen))
+        self.n_samples += len(samples)
+        if per_sample * 1000 > self.latency_budget_ms:
+            self.n_over_budget += len(samples)
+
+        return [(device, sample_number, prediction) for (device, sample_number), prediction in zip(emitted, predictions)]
+
+    def flush(self):
+        """Predykcje wszystkich odłożonych okien, bez limitu czasu (np. przy zamykaniu strumienia)."""
+        pending, self.pending = list(self.pending), deque()
+        if not pending:
+            return []
+        predictions = self.model.predict(np.vstack([self._feature_vector(*snapshot) for _, _, *snapshot in pending]))
+        return [(device, sample_number, prediction) for (device, sample_number, *_), prediction in zip(pending, predictions)]
+
+    def latency_report(self):
+        """Statystyki czasu obsługi jednej próbki (w mikrosekundach) z ostatnich `latency_history` próbek."""
+        if not self.latencies:
+            return {'samples': 0}
+        latencies = np.array(self.latencies) * 1e6
+        return {
+            'samples': self.n_samples,
+            'devices': len(self.devices),
+            'mean_us': float(latencies.mean()),
+            'p50_us': float(np.percentile(latencies, 50)),
+            'p99_us': float(np.percentile(latencies, 99)),
+            'max_us': float(latencies.max()),
+            'budget_us': self.latency_budget_ms * 1000,
+            'over_budget': self.n_over_budget,
+            'deferred': self.n_deferred,
+            'dropped': self.n_dropped,
+            'pending': len(self.pending),
+        }
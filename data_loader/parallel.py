@@ -0,0 +1,100 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from . import profiling
+from .data_loader import sliding_windows
+from .feature_store import extract_matrix, group_peaks
+
+
+def _extract_chunk(shm_name, shape, dtype, bounds, window_params, extractors, starts=None):
+    """
+    Zadanie procesu roboczego: podłącza się do bloku danych we współdzielonej pamięci
+    i liczy cechy dla grup o granicach `bounds` [(start, end), ...]; `starts` to opcjonalne
+    początki okien każdej grupy (po odfiltrowaniu nieciągłości).
+    """
+    window_len, step, first_start = window_params
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        blocks = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        results = []
+        for i, (start, end) in enumerate(bounds):
+            group_starts = starts[i] if starts is not None else None
+            block = blocks[start:end]
+            windows = sliding_windows(block, window_len, step, first_start, starts=group_starts)
+            peaks = group_peaks(block, window_params, group_starts)
+            results.append(extract_matrix(windows, extractors, peaks) if len(windows) else None)
+        del blocks
+        return results
+    finally:
+        shm.close()
+
+
+@profiling.instrumented(windows=lambda out: len(out[0]))
+def extract_features_parallel(segmenter, extractors, columns=None, n_jobs=None, chunk_size=4, dtype=np.float32):
+    """
+    Równoległa ekstrakcja cech z `TimeWindowSegmenter` na puli procesów.
+
+    Surowe kanały wszystkich grup (osoba, aktywność) są kopiowane raz do `multiprocessing.shared_memory`,
+    a procesy robocze dostają tylko nazwę bloku i granice swoich grup (zamiast serializowanych DataFrame).
+    Wynik jest składany w kolejności grup z `groupby`, niezależnie od kolejności ukończenia zadań.
+
+    Argumenty:
+        segmenter: TimeWindowSegmenter z wczytanymi danymi
+        extractors: lista funkcji `f(windows) -> (macierz, nazwy)`; muszą dać się zserializować (pickle),
+            np. funkcje `*_batch` z data_loader lub `functools.partial` na nich
+        columns: kanały (domyślnie acc + gyr)
+        n_jobs: liczba procesów (domyślnie liczba rdzeni)
+        chunk_size: liczba grup w jednym zadaniu
+
+    Zwraca:
+        (pd.DataFrame, np.ndarray, np.ndarray): cechy, etykiety aktywności i identyfikatory osób dla każdego okna
+    """
+    n_jobs = n_jobs or os.cpu_count()
+    keys, blocks, offsets = segmenter.group_blocks(columns=columns, dtype=dtype)
+    window_params = segmenter._window_params()
+    bounds = list(zip(offsets[:-1].tolist(), offsets[1:].tolist()))
+    chunks = [bounds[i:i + chunk_size] for i in range(0, len(bounds), chunk_size)]
+    starts = segmenter.group_window_starts()
+    chunk_starts = [starts[i:i + chunk_size] if starts is not None else None for i in range(0, len(bounds), chunk_size)]
+
+    shm = shared_memory.SharedMemory(create=True, size=max(blocks.nbytes, 1))
+    try:
+        shared = np.ndarray(blocks.shape, dtype=blocks.dtype, buffer=shm.buf)
+        shared[:] = blocks
+        del blocks
+
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            futures = [
+                executor.submit(
+                    _extract_chunk, shm.name, shared.shape, shared.dtype, chunk, window_params, extractors, chunk_start
+                )
+                for chunk, chunk_start in zip(chunks, chunk_starts)
+            ]
+            results = [
+                result
+                for future in tqdm(futures, desc="Extracting features")
+                for result in future.result()
+            ]
+        del shared
+    finally:
+        shm.close()
+        shm.unlink()
+
+    matrices, labels, subjects = [], [], []
+    names = None
+    for (pid, act), result in zip(keys, results):
+        if result is None:
+            continue
+        matrix, names = result
+        matrices.append(matrix)
+        labels.append(np.full(len(matrix), act, dtype=object))
+        subjects.append(np.full(len(matrix), pid, dtype=object))
+
+    if not matrices:
+        return pd.DataFrame(), np.empty(0, dtype=object), np.empty(0, dtype=object)
+    return pd.DataFrame(np.concatenate(matrices), columns=names), np.concatenate(labels), np.concatenate(subjects)
@@ -1,6 +1,8 @@
 from scipy.signal import find_peaks
 import numpy as np
 
+from .features_temporal import peak_intervals, peak_mask
+
 
 def extract_peak_features(window_df, sampling_rate, axes=['g_x', 'g_y', 'g_z', 'ac_x', 'ac_y', 'ac_z']):
     features = {}
@@ -23,3 +25,33 @@ def extract_peak_features(window_df, sampling_rate, axes=['g_x', 'g_y', 'g_z', '
         features[f'peak_count_{col}'] = len(peaks)
 
     return features
+
+
+def extract_peak_features_batch(windows, sampling_rate, axes=['ac_x', 'ac_y', 'ac_z', 'g_x', 'g_y', 'g_z'], peaks=None):
+    """
+    Wsadowa wersja `extract_peak_features` dla tensora okien (n_windows, n_samples, n_channels),
+    gdzie kanał `i` odpowiada `axes[i]`. Domyślna kolejność osi to kolejność kanałów segmentera (acc, potem gyr),
+    a nie kolejność kolumn z `extract_peak_features`.
+
+    Z `peaks` (`features_temporal.WindowPeaks` grupy, z której pochodzą okna) piki nie są szukane w każdym oknie,
+    tylko odczytywane z indeksu pików całego sygnału grupy, więc koszt rośnie z liczbą wierszy, a nie okien.
+
+    Zwraca:
+        (np.ndarray, list): macierz cech (n_windows, 3 * len(axes)) i nazwy kolumn w kolejności `extract_peak_features`
+    """
+    if np.shape(windows)[2] != len(axes):
+        raise ValueError(f"Expected {len(axes)} channels ({axes}), got {np.shape(windows)[2]}.")
+    if peaks is not None:
+        counts = peaks.counts()
+        mean, std = peaks.intervals(sampling_rate)
+    else:
+        signals = np.moveaxis(np.asarray(windows, dtype=np.float64), 1, 2)
+        mask = peak_mask(signals.reshape(-1, signals.shape[2]))
+        counts = mask.sum(axis=1).reshape(signals.shape[:2])
+        mean, std = (values.reshape(signals.shape[:2]) for values in peak_intervals(mask, sampling_rate))
+
+    columns, names = [], []
+    for i, col in enumerate(axes):
+        columns += [mean[:, i], std[:, i], counts[:, i]]
+        names += [f'peak_avg_time_diff_{col}', f'peak_std_time_diff_{col}', f'peak_count_{col}']
+    return np.column_stack(columns).astype(np.float64), names
@@ -0,0 +1,417 @@
+import cProfile
+import fnmatch
+import inspect
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from functools import wraps
+
+import pandas as pd
+
+PROFILERS = ('cprofile', 'sampling')
+
+# aktywny Profiler; None oznacza wyłączoną instrumentację (każdy punkt pomiarowy to jedno porównanie)
+_active = None
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def count(self, rows=None, windows=None):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name, rows=None, windows=None):
+    """
+    Punkt pomiarowy etapu potoku. Bez aktywnego `Profiler` nic nie mierzy.
+
+    usage:
+    ```python
+        with profiling.stage('FeatureStore.features') as s:
+            ...
+            s.count(windows=len(matrix))
+    ```
+    """
+    if _active is None:
+        return _NULL_STAGE
+    return _active._stage(name, rows, windows)
+
+
+def instrumented(name=None, rows=None, windows=None):
+    """
+    Dekorator mierzący każde wywołanie funkcji jako etap `name` (domyślnie `__qualname__`).
+
+    Argumenty:
+        rows: opcjonalnie `f(*args, **kwargs)` – liczba wierszy wejścia, liczona przed wywołaniem
+        windows: opcjonalnie `f(wynik)` – liczba okien w wyniku; dla generatorów liczona dla każdego elementu
+
+    Generatory mierzone są tylko podczas wznowień (`next`), więc czas pracy konsumenta między elementami
+    (np. ekstrakcja cech w pętli po `segment()`) nie jest doliczany do etapu.
+    """
+    def decorate(func):
+        stage_name = name or func.__qualname__
+
+        if inspect.isgeneratorfunction(func):
+            @wraps(func)
+            def generator(*args, **kwargs):
+                if _active is None:
+                    yield from func(*args, **kwargs)
+                    return
+                n_rows = rows(*args, **kwargs) if rows else None
+                items = func(*args, **kwargs)
+                while True:
+                    with stage(stage_name, rows=n_rows) as s:
+                        n_rows = None  # wiersze liczone tylko przy pierwszym wznowieniu
+                        try:
+                            item = next(items)
+                        except StopIteration:
+                            return
+                        s.count(windows=windows(item) if windows else None)
+                    yield item
+            return generator
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active is None:
+                return func(*args, **kwargs)
+            with stage(stage_name, rows=rows(*args, **kwargs) if rows else None) as s:
+                result = func(*args, **kwargs)
+                s.count(windows=windows(result) if windows else None)
+                return result
+        return wrapper
+
+    return decorate
+
+
+class _SamplingThread:
+    """
+    Próbkuje stos jednego wątku co `interval` s przez `sys._current_frames` (bez zależności zewnętrznych),
+    ale tylko wtedy, gdy wątek jest wewnątrz etapu (`active > 0`). Jeden próbkujący wątek na etap przez cały
+    czas profilowania, więc wznowienia generatorów nie uruchamiają nowych wątków.
+    """
+
+    def __init__(self, thread_id, counts, interval):
+        self.thread_id = thread_id
+        self.counts = counts
+        self.interval = interval
+        self.active = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='profiling-sampler', daemon=True)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            if not self.active:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                frame = frame.f_back
+            if stack:
+                self.counts[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 'rows', 'windows', 'start', 'child_time', 'start_memory', 'peak_memory',
+                 'attached')
+
+    def __init__(self, profiler, name, rows, windows):
+        self.profiler = profiler
+        self.name = name
+        self.rows = rows
+        self.windows = windows
+        self.child_time = 0.0
+        self.attached = None
+
+    def count(self, rows=None, windows=None):
+        if rows is not None:
+            self.rows = (self.rows or 0) + rows
+        if windows is not None:
+            self.windows = (self.windows or 0) + windows
+
+    def __enter__(self):
+        self.profiler._enter(self)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._exit(self)
+        return False
+
+
+class Profiler:
+    """
+    Opcjonalna instrumentacja potoku data_loader: dla każdego etapu (metody `TimeWindowSegmenter`, ekstraktory
+    w `extract_matrix`, cechy i wielkości pośrednie `FeaturePlan`) zapisuje czas, wiersze, okna i – przy
+    `trace_memory=True` – zaalokowane bajty (`tracemalloc`, spowalnia obliczenia). Czas własny (`self_s`) nie
+    obejmuje zagnieżdżonych etapów, więc suma `self_s` cech planu pokazuje, które cechy kosztują najwięcej.
+
+    Argumenty:
+        trace_memory: mierzy alokacje netto i szczyt pamięci każdego etapu
+        profile: słownik {wzorzec nazwy etapu: 'cprofile' | 'sampling'} – profiler dołączany do pasujących etapów
+            (wzorce jak w `fnmatch`, np. 'feature.*')
+        sampling_interval: odstęp próbkowania stosu w sekundach (w praktyce ograniczony przez przełączanie GIL)
+        modules: moduły, których publiczne funkcje są na czas profilowania opakowane jako etapy
+            (np. `features_freq` przy ekstrakcji okno po oknie jak w notebookach)
+
+    Pomiary w wielu wątkach trafiają do jednego zapisu (z identyfikatorem wątku); `tracemalloc` liczy pamięć całego
+    procesu, więc przy równoległych etapach bajty się mieszają.
+
+    usage:
+    ```python
+        with Profiler(trace_memory=True, profile={'TimeWindowSegmenter.resample_to': 'cprofile'}) as profiler:
+            segmenter.resample_to(25)
+            X, names = plan(segmenter.as_tensor()[0])
+        print(profiler.summary().head(20))
+        profiler.save_chrome_trace('trace.json')  # chrome://tracing albo https://ui.perfetto.dev
+        profiler.dump_profiles('profiles')
+    ```
+    """
+
+    def __init__(self, trace_memory=False, profile=None, sampling_interval=0.001, modules=()):
+        profile = dict(profile or {})
+        for pattern, kind in profile.items():
+            if kind not in PROFILERS:
+                raise ValueError(f"Unknown profiler '{kind}' for '{pattern}'. Available: {PROFILERS}")
+        self.trace_memory = trace_memory
+        self.profile = profile
+        self.sampling_interval = sampling_interval
+        self.modules = list(modules)
+        self.events = []
+        self.profiles = {}  # nazwa etapu -> cProfile.Profile albo Counter stosów (sampling)
+        self._attach = {}  # nazwa etapu -> rodzaj profilera albo None (wynik dopasowania wzorców)
+        self._local = threading.local()
+        self._cprofile_active = False
+        self._patched = []
+        self._samplers = {}  # (etap, wątek) -> _SamplingThread
+        self._started_tracemalloc = False
+        self.origin = None
+
+    def __enter__(self):
+        global _active
+        if _active is not None:
+            raise RuntimeError("Another Profiler is already active.")
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        for module in self.modules:
+            self._instrument_module(module)
+        self.origin = time.perf_counter()
+        _active = self
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        _active = None
+        for sampler in self._samplers.values():
+            sampler.stop()
+        self._samplers = {}
+        for module, name, func in self._patched:
+            setattr(module, name, func)
+        self._patched = []
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        return False
+
+    def _instrument_module(self, module):
+        prefix = module.__name__.rsplit('.', 1)[-1]
+        for name, func in list(vars(module).items()):
+            if name.startswith('_') or not inspect.isfunction(func) or func.__module__ != module.__name__:
+                continue
+            self._patched.append((module, name, func))
+            setattr(module, name, instrumented(f'{prefix}.{name}')(func))
+
+    def _stage(self, name, rows, windows):
+        return _Stage(self, name, rows, windows)
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _profiler_for(self, name):
+        if name not in self._attach:
+            self._attach[name] = next(
+                (kind for pattern, kind in self.profile.items() if fnmatch.fnmatchcase(name, pattern)), None
+            )
+        return self._attach[name]
+
+    def _enter(self, s):
+        stack = self._stack()
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].peak_memory = max(stack[-1].peak_memory, peak)
+            tracemalloc.reset_peak()
+            s.start_memory = s.peak_memory = current
+        stack.append(s)
+
+        kind = self._profiler_for(s.name)
+        if kind == 'cprofile' and not self._cprofile_active:
+            # cProfile nie obsługuje zagnieżdżenia – zewnętrzny etap ma pierwszeństwo
+            profile = self.profiles.setdefault(s.name, cProfile.Profile())
+            self._cprofile_active = True
+            s.attached = profile
+            profile.enable()
+        elif kind == 'sampling':
+            key = (s.name, threading.get_ident())
+            sampler = self._samplers.get(key)
+            if sampler is None:
+                sampler = self._samplers[key] = _SamplingThread(
+                    key[1], self.profiles.setdefault(s.name, Counter()), self.sampling_interval
+                )
+                sampler.start()
+            sampler.active += 1
+            s.attached = sampler
+        s.start = time.perf_counter()
+
+    def _exit(self, s):
+        end = time.perf_counter()
+        if isinstance(s.attached, cProfile.Profile):
+            s.attached.disable()
+            self._cprofile_active = False
+        elif s.attached is not None:
+            s.attached.active -= 1
+
+        stack = self._stack()
+        stack.pop()
+        duration = end - s.start
+        event = {
+            'name': s.name,
+            'start': s.start - self.origin,
+            'duration': duration,
+            'self': duration - s.child_time,
+            'thread': threading.get_ident(),
+            'depth': len(stack),
+            'rows': s.rows,
+            'windows': s.windows,
+        }
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(s.peak_memory, peak)
+            event['alloc_bytes'] = current - s.start_memory
+            event['peak_bytes'] = peak - s.start_memory
+            if stack:
+                stack[-1].peak_memory = max(stack[-1].peak_memory, peak)
+        if stack:
+            stack[-1].child_time += duration
+        self.events.append(event)
+
+    def summary(self):
+        """
+        Zestawienie etapów posortowane malejąco po czasie własnym.
+
+        Zwraca:
+            pd.DataFrame: calls, total_s, self_s, mean_ms, rows, windows, rows_per_s, windows_per_s
+            oraz alloc_bytes (suma netto) i peak_bytes (największy szczyt) przy `trace_memory=True`
+        """
+        if not self.events:
+            return pd.DataFrame()
+        events = pd.DataFrame(self.events)
+        aggregations = {
+            'calls': ('duration', 'size'),
+            'total_s': ('duration', 'sum'),
+            'self_s': ('self', 'sum'),
+            'rows': ('rows', 'sum'),
+            'windows': ('windows', 'sum'),
+        }
+        if self.trace_memory:
+            aggregations.update(alloc_bytes=('alloc_bytes', 'sum'), peak_bytes=('peak_bytes', 'max'))
+        summary = events.groupby('name').agg(**aggregations)
+        summary.insert(3, 'mean_ms', summary['total_s'] / summary['calls'] * 1000)
+        summary.insert(summary.columns.get_loc('windows') + 1, 'rows_per_s',
+                       (summary['rows'] / summary['total_s']).where(summary['rows'] > 0))
+        summary.insert(summary.columns.get_loc('rows_per_s') + 1, 'windows_per_s',
+                       (summary['windows'] / summary['total_s']).where(summary['windows'] > 0))
+        return summary.sort_values('self_s', ascending=False)
+
+    def save_json(self, path):
+        """Zapisuje zestawienie i wszystkie zdarzenia (czasy w sekundach od wejścia do `Profiler`)."""
+        summary = self.summary()
+        report = {
+            'meta': {'pid': os.getpid(), 'trace_memory': self.trace_memory, 'profile': self.profile},
+            'summary': json.loads(summary.reset_index().to_json(orient='records')) if len(summary) else [],
+            'events': self.events,
+        }
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    def chrome_trace(self):
+        """Zdarzenia w formacie Trace Event (chrome://tracing, Perfetto): jedno zdarzenie 'X' na wywołanie etapu."""
+        pid = os.getpid()
+        threads = {thread.ident: thread.name for thread in threading.enumerate()}
+        trace = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': threads.get(tid, str(tid))}}
+            for tid in sorted({event['thread'] for event in self.events})
+        ]
+        for event in self.events:
+            args = {key: event[key] for key in ['rows', 'windows', 'alloc_bytes', 'peak_bytes']
+                    if event.get(key) is not None}
+            trace.append({
+                'name': event['name'],
+                'cat': event['name'].split('.', 1)[0],
+                'ph': 'X',
+                'ts': event['start'] * 1e6,
+                'dur': event['duration'] * 1e6,
+                'pid': pid,
+                'tid': event['thread'],
+                'args': args,
+            })
+        return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+
+    def save_chrome_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+    def dump_profiles(self, directory):
+        """
+        Zapisuje wyniki profilerów etapów: `<etap>.prof` (pstats, np. dla snakeviz) i `<etap>.txt`
+        dla cProfile, `<etap>.folded` (stosy w formacie flamegraph.pl/speedscope) dla próbkowania.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name, result in self.profiles.items():
+            base = os.path.join(directory, name.replace('/', '_'))
+            if isinstance(result, cProfile.Profile):
+                result.dump_stats(f'{base}.prof')
+                with open(f'{base}.txt', 'w') as f:
+                    f.write(self.profile_report(name, limit=50))
+            else:
+                with open(f'{base}.folded', 'w') as f:
+                    f.writelines(f'{stack} {count}\n' for stack, count in result.most_common())
+
+    def profile_report(self, name, limit=20):
+        """Tekstowy raport profilera dołączonego do etapu `name` (najdroższe funkcje)."""
+        result = self.profiles[name]
+        if isinstance(result, cProfile.Profile):
+            out = io.StringIO()
+            pstats.Stats(result, stream=out).sort_stats('cumulative').print_stats(limit)
+            return out.getvalue()
+        total = sum(result.values()) or 1
+        # próbki, w których funkcja jest na szczycie stosu (czas własny)
+        leaves = Counter()
+        for stack, count in result.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        lines = [f'{count / total:7.1%}  {frame}' for frame, count in leaves.most_common(limit)]
+        return f'{total} samples\n' + '\n'.join(lines)
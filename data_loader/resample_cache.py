@@ -0,0 +1,93 @@
+import os
+import shutil
+
+import pandas as pd
+
+try:
+    from .dataset import SensorDataset
+except ImportError:  # uruchamiane bezpośrednio z katalogu data_loader (np. freq_params.ipynb)
+    from dataset import SensorDataset
+
+
+def _rate_name(rate_hz):
+    return f'{rate_hz:g}hz'
+
+
+class ResampleCache:
+    """
+    Trwały cache przepróbkowanych zbiorów (`SensorDataset`), współdzielony między sesjami.
+
+    Kluczem jest skrót zawartości zbioru źródłowego (`SensorDataset.content_fingerprint`), częstotliwość źródłowa,
+    metoda i częstotliwość docelowa. Dla każdego źródła najpierw zapisywana jest pełna siatka częstotliwości
+    źródłowej z uzupełnionymi lukami (`SensorDataset.fill_grid`) – sortowanie, usuwanie duplikatów i interpolacja
+    luk dzieją się tylko raz, a każda kolejna częstotliwość (np. 25 i 20 Hz z 50 Hz) powstaje z tej siatki:
+    uśrednianiem w przedziałach ('mean', jak `resample_to`) albo filtrem polifazowym ('polyphase').
+    Wyniki są zapisywane jak `SensorDataset.save` i otwierane jako memmapy.
+
+    Siatka i wyniki są w float32, więc wynik 'mean' z cache zgadza się z `resample_to` z dokładnością
+    do zaokrągleń float32.
+
+    usage:
+    ```python
+        for rate in [50, 25, 20]:
+            segmenter = TimeWindowSegmenter(df_path='real_world_2016.parquet', source_sampling_rate=50,
+                                            resample_cache='resample_cache', ...)
+            segmenter.resample_to(rate)
+    ```
+    """
+
+    def __init__(self, root='resample_cache'):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _entry(self, fingerprint, name):
+        return os.path.join(self.root, fingerprint, name)
+
+    def grid(self, dataset, source_rate_hz=None, fingerprint=None):
+        """Siatka z uzupełnionymi lukami dla `dataset` (z cache albo liczona i zapisywana)."""
+        source_rate_hz = source_rate_hz or dataset.sampling_rate
+        fingerprint = fingerprint or dataset.content_fingerprint()
+        path = self._entry(fingerprint, f'grid_{_rate_name(source_rate_hz)}')
+        if not SensorDataset.is_dataset(path):
+            dataset.fill_grid(source_rate_hz).save(path)
+        return SensorDataset.load(path)
+
+    def resample(self, dataset, target_rate_hz, source_rate_hz=None, method='mean'):
+        """
+        Zbiór `dataset` przepróbkowany do `target_rate_hz` jak `SensorDataset.resample`, z cache, jeśli był
+        już liczony dla tej samej zawartości i parametrów.
+        """
+        source_rate_hz = source_rate_hz or dataset.sampling_rate
+        if source_rate_hz is None:
+            raise ValueError("Unknown source sampling rate; pass source_rate_hz.")
+        fingerprint = dataset.content_fingerprint()
+        path = self._entry(fingerprint, f'{method}_{_rate_name(source_rate_hz)}_to_{_rate_name(target_rate_hz)}')
+        if not SensorDataset.is_dataset(path):
+            grid = self.grid(dataset, source_rate_hz, fingerprint)
+            grid.resample(target_rate_hz, source_rate_hz, method=method).save(path)
+        return SensorDataset.load(path)
+
+    def entries(self):
+        """Zawartość cache: źródło, wpis (siatka lub wynik), liczba wierszy i rozmiar na dysku."""
+        rows = []
+        for fingerprint in sorted(os.listdir(self.root)):
+            source_dir = os.path.join(self.root, fingerprint)
+            if not os.path.isdir(source_dir):
+                continue
+            for name in sorted(os.listdir(source_dir)):
+                path = os.path.join(source_dir, name)
+                if not SensorDataset.is_dataset(path):
+                    continue
+                rows.append({
+                    'source': fingerprint,
+                    'entry': name,
+                    'rows': len(SensorDataset.load(path)),
+                    'bytes': sum(entry.stat().st_size for entry in os.scandir(path)),
+                })
+        return pd.DataFrame(rows, columns=['source', 'entry', 'rows', 'bytes'])
+
+    def clear(self, fingerprint=None):
+        """Usuwa wpisy jednego źródła albo (domyślnie) cały cache."""
+        path = self._entry(fingerprint, '') if fingerprint else self.root
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(self.root, exist_ok=True)
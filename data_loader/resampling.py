@@ -0,0 +1,253 @@
+from fractions import Fraction
+
+import numpy as np
+import pandas as pd
+
+MS_PER_DAY = 86_400_000
+
+RESAMPLE_METHODS = ('mean', 'polyphase')
+
+
+def to_epoch_ms(timestamps, period_ms):
+    """
+    Zamienia kolumnę czasu na int64 milisekundy od epoki, zaokrąglone do wielokrotności `period_ms`
+    (tak jak `Series.dt.round`, czyli z zaokrągleniem połówek do parzystej).
+
+    Argumenty:
+        timestamps: pd.Series z czasem (datetime lub liczby w ms)
+        period_ms: okres siatki w milisekundach
+
+    Zwraca:
+        (np.ndarray int64, np.ndarray bool): czasy w ms oraz maska poprawnych (nie-NaT) wartości
+    """
+    ts = pd.to_datetime(timestamps, unit='ms')
+    ns = ts.to_numpy(dtype='datetime64[ns]').view(np.int64)
+    valid = ~np.isnat(ts.to_numpy(dtype='datetime64[ns]'))
+
+    period_ns = np.int64(period_ms) * 1_000_000
+    quotient, remainder = np.divmod(ns, period_ns)
+    round_up = (2 * remainder > period_ns) | ((2 * remainder == period_ns) & (quotient % 2 == 1))
+    quotient = quotient + round_up
+    return quotient * np.int64(period_ms), valid
+
+
+def group_offsets(group_codes):
+    """
+    Zwraca granice grup w posortowanej tablicy kodów grup: grupa `i` zajmuje wiersze
+    `offsets[i]:offsets[i + 1]`.
+    """
+    n = len(group_codes)
+    if n == 0:
+        return np.zeros(1, dtype=np.int64)
+    starts = np.flatnonzero(np.diff(group_codes)) + 1
+    return np.concatenate(([0], starts, [n])).astype(np.int64)
+
+
+def sort_and_deduplicate(group_codes, times_ms):
+    """
+    Wyznacza kolejność sortowania po (grupa, czas) i usuwa zduplikowane znaczniki czasu
+    w obrębie grupy (zostaje pierwsze wystąpienie, jak w `index.duplicated(keep='first')`).
+
+    Zwraca:
+        np.ndarray: indeksy wierszy wejściowych w docelowej kolejności
+    """
+    order = np.lexsort((times_ms, group_codes))
+    codes = group_codes[order]
+    times = times_ms[order]
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = (codes[1:] != codes[:-1]) | (times[1:] != times[:-1])
+    return order[keep]
+
+
+def interpolate_on_grid(grid_values, grid_offsets):
+    """
+    Liniowa interpolacja braków (NaN) na regularnej siatce, osobno w każdej grupie.
+    Odpowiada `DataFrame.interpolate(method='linear')`: braki przed pierwszą wartością
+    zostają NaN, braki po ostatniej są wypełniane ostatnią wartością.
+
+    Argumenty:
+        grid_values: np.ndarray (n_grid, n_channels)
+        grid_offsets: granice grup na siatce (n_groups + 1)
+    """
+    n_grid = grid_values.shape[0]
+    positions = np.arange(n_grid)
+    group_start = np.repeat(grid_offsets[:-1], np.diff(grid_offsets))
+    group_end = np.repeat(grid_offsets[1:], np.diff(grid_offsets))
+    result = grid_values.copy()
+
+    for channel in range(grid_values.shape[1]):
+        values = grid_values[:, channel]
+        valid = ~np.isnan(values)
+        if valid.all():
+            continue
+
+        prev_idx = np.maximum.accumulate(np.where(valid, positions, -1))
+        next_idx = np.minimum.accumulate(np.where(valid, positions, n_grid)[::-1])[::-1]
+
+        has_prev = prev_idx >= group_start
+        has_next = next_idx < group_end
+        prev_safe = np.clip(prev_idx, 0, n_grid - 1)
+        next_safe = np.clip(next_idx, 0, n_grid - 1)
+
+        prev_val = values[prev_safe]
+        next_val = values[next_safe]
+        span = np.where(has_next & (next_idx > prev_idx), next_idx - prev_idx, 1)
+        weight = (positions - prev_idx) / span
+        interpolated = np.where(has_next, prev_val + (next_val - prev_val) * weight, prev_val)
+
+        fill = ~valid & has_prev
+        result[fill, channel] = interpolated[fill]
+
+    return result
+
+
+def fill_grid(group_codes, times_ms, values, source_period_ms):
+    """
+    Rozkłada każdą grupę na pełną siatkę o okresie `source_period_ms` (od pierwszej do ostatniej próbki)
+    i interpoluje liniowo braki (`interpolate_on_grid`).
+
+    Argumenty:
+        group_codes: np.ndarray int (n_rows,) – kody grup, posortowane rosnąco
+        times_ms: np.ndarray int64 (n_rows,) – czasy w ms, rosnące w obrębie grupy, bez duplikatów,
+            będące wielokrotnościami `source_period_ms`
+        values: np.ndarray float (n_rows, n_channels)
+
+    Zwraca:
+        (np.ndarray, np.ndarray, np.ndarray, np.ndarray): kody grup, czasy w ms i wartości (float64) siatki
+        oraz granice grup na siatce (n_groups + 1)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
+    n_channels = values.shape[1]
+    if len(times_ms) == 0:
+        return (np.empty(0, dtype=np.asarray(group_codes).dtype), np.empty(0, dtype=np.int64),
+                np.empty((0, n_channels)), np.zeros(1, dtype=np.int64))
+
+    offsets = group_offsets(group_codes)
+    first = offsets[:-1]
+    last = offsets[1:] - 1
+    t_min = times_ms[first]
+    t_max = times_ms[last]
+
+    grid_lengths = (t_max - t_min) // source_period_ms + 1
+    grid_offsets = np.concatenate(([0], np.cumsum(grid_lengths)))
+    row_group = np.repeat(np.arange(len(first)), np.diff(offsets))
+    grid_pos = grid_offsets[row_group] + (times_ms - t_min[row_group]) // source_period_ms
+
+    grid_values = np.full((grid_offsets[-1], n_channels), np.nan)
+    grid_values[grid_pos] = values
+    grid_values = interpolate_on_grid(grid_values, grid_offsets)
+
+    grid_group = np.repeat(np.arange(len(first)), grid_lengths)
+    grid_times = (t_min[grid_group]
+                  + (np.arange(grid_offsets[-1]) - grid_offsets[grid_group]) * source_period_ms)
+    return group_codes[first][grid_group], grid_times, grid_values, grid_offsets
+
+
+def bin_means(grid_codes, grid_times, grid_values, grid_offsets, target_period_ms):
+    """
+    Uśrednia wartości siatki z `fill_grid` w przedziałach `target_period_ms` wyrównanych do północy
+    pierwszego dnia grupy (tak jak `resample(...).mean()` w pandas). Wynik jak w `resample_groups`.
+    """
+    n_channels = grid_values.shape[1]
+    if len(grid_times) == 0:
+        return (np.empty(0, dtype=grid_codes.dtype), np.empty(0, dtype=np.int64),
+                np.empty((0, n_channels)), np.empty(0, dtype=bool))
+
+    first = grid_offsets[:-1]
+    grid_lengths = np.diff(grid_offsets)
+    group_ids = grid_codes[first]
+    t_min = grid_times[first]
+    t_max = grid_times[grid_offsets[1:] - 1]
+    grid_group = np.repeat(np.arange(len(first)), grid_lengths)
+
+    # przedziały docelowe liczone od północy pierwszego dnia grupy (origin='start_day')
+    day_start = (t_min // MS_PER_DAY) * MS_PER_DAY
+    first_bin = (t_min - day_start) // target_period_ms
+    last_bin = (t_max - day_start) // target_period_ms
+    bin_lengths = last_bin - first_bin + 1
+    bin_offsets = np.concatenate(([0], np.cumsum(bin_lengths)))
+    n_bins = bin_offsets[-1]
+
+    grid_bin = (bin_offsets[grid_group]
+                + (grid_times - day_start[grid_group]) // target_period_ms - first_bin[grid_group])
+
+    out = np.empty((n_bins, n_channels))
+    for channel in range(n_channels):
+        column = grid_values[:, channel]
+        valid = ~np.isnan(column)
+        sums = np.bincount(grid_bin[valid], weights=column[valid], minlength=n_bins)
+        counts = np.bincount(grid_bin[valid], minlength=n_bins)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out[:, channel] = np.where(counts > 0, sums / counts, np.nan)
+
+    bin_group = np.repeat(np.arange(len(first)), bin_lengths)
+    out_times = (day_start[bin_group]
+                 + (first_bin[bin_group] + np.arange(n_bins) - bin_offsets[bin_group]) * target_period_ms)
+    before_start = out_times < t_min[bin_group]
+    return group_ids[bin_group], out_times, out, before_start
+
+
+def resample_groups(group_codes, times_ms, values, source_period_ms, target_period_ms):
+    """
+    Przepróbkowuje wszystkie grupy naraz, bez pętli po grupach w Pythonie.
+
+    Każda grupa jest rozkładana na pełną siatkę o okresie `source_period_ms` (od pierwszej
+    do ostatniej próbki), braki są interpolowane liniowo, a następnie wartości są uśredniane
+    w przedziałach `target_period_ms` wyrównanych do północy pierwszego dnia grupy
+    (tak jak `resample(...).mean()` w pandas).
+
+    Argumenty:
+        group_codes: np.ndarray int (n_rows,) – kody grup, posortowane rosnąco
+        times_ms: np.ndarray int64 (n_rows,) – czasy w ms, rosnące w obrębie grupy, bez duplikatów,
+            będące wielokrotnościami `source_period_ms`
+        values: np.ndarray float (n_rows, n_channels)
+        source_period_ms: okres próbkowania danych wejściowych w ms
+        target_period_ms: docelowy okres próbkowania w ms
+
+    Zwraca:
+        (np.ndarray, np.ndarray, np.ndarray, np.ndarray): kody grup, czasy w ms (początki przedziałów),
+        uśrednione wartości (float64) oraz maskę przedziałów, których początek leży przed pierwszą
+        próbką grupy (tam `resample(...).ffill()` nie ma jeszcze wartości do przepisania)
+    """
+    grid = fill_grid(group_codes, times_ms, values, source_period_ms)
+    return bin_means(*grid, target_period_ms)
+
+
+def polyphase_groups(grid_codes, grid_times, grid_values, grid_offsets, source_period_ms, target_period_ms):
+    """
+    Przepróbkowanie siatki z `fill_grid` filtrem polifazowym (`scipy.signal.resample_poly`, z filtrem
+    antyaliasingowym) w stosunku `source_period_ms / target_period_ms`, np. 50 -> 25 Hz (1/2) albo 50 -> 20 Hz (2/5).
+    Każda grupa przetwarzana jest osobno (wszystkie kanały jednym wywołaniem), z przedłużeniem liniowym
+    na brzegach zamiast zer. Braki przed pierwszą wartością kanału w grupie są wypełniane tą wartością.
+
+    Zwraca:
+        (np.ndarray, np.ndarray, np.ndarray, np.ndarray): jak `bin_means`; czasy zaczynają się od pierwszej
+        próbki grupy, a maska `before_start` jest pusta
+    """
+    from scipy.signal import resample_poly
+
+    ratio = Fraction(int(source_period_ms), int(target_period_ms))
+    up, down = ratio.numerator, ratio.denominator
+    n_channels = grid_values.shape[1]
+    codes, times, values = [], [], []
+    for start, end in zip(grid_offsets[:-1], grid_offsets[1:]):
+        block = grid_values[start:end]
+        leading = np.isnan(block)
+        if leading.any():
+            block = block.copy()
+            for channel in np.flatnonzero(leading.any(axis=0)):
+                valid = np.flatnonzero(~leading[:, channel])
+                if len(valid):
+                    block[:valid[0], channel] = block[valid[0], channel]
+        out = resample_poly(block, up, down, axis=0, padtype='line') if up != down else block
+        codes.append(np.full(len(out), grid_codes[start]))
+        times.append(grid_times[start] + np.arange(len(out), dtype=np.int64) * target_period_ms)
+        values.append(out)
+
+    if not values:
+        return (np.empty(0, dtype=grid_codes.dtype), np.empty(0, dtype=np.int64),
+                np.empty((0, n_channels)), np.empty(0, dtype=bool))
+    times = np.concatenate(times)
+    return np.concatenate(codes), times, np.concatenate(values), np.zeros(len(times), dtype=bool)
@@ -0,0 +1,275 @@
+import io
+import json
+import os
+import re
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from . import profiling
+
+ACC_COLUMNS = ('acc_x', 'acc_y', 'acc_z')
+GYR_COLUMNS = ('gyr_x', 'gyr_y', 'gyr_z')
+# częstotliwość próbkowania zrzutów wynik.json (plik nie zawiera znaczników czasu)
+DUMP_SAMPLING_RATE = 25
+
+_WHITESPACE = re.compile(r'[ \t\r\n]*')
+
+
+class _JsonStream:
+    """
+    Minimalny przyrostowy czytnik JSON: trzyma w pamięci tylko bieżący fragment pliku,
+    a pojedyncze (małe) wartości dekoduje przez `json.JSONDecoder.raw_decode`.
+    """
+
+    def __init__(self, f, chunk_size=1 << 20):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON stream.")
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos}, found '{self.buffer[self.pos]}'.")
+        self.pos += 1
+
+    def accept(self, char):
+        if self.peek() == char:
+            self.pos += 1
+            return True
+        return False
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # liczba na końcu bufora mogła zostać ucięta w połowie
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def object_keys(self):
+        """Iteruje po kluczach obiektu; po każdym kluczu wołający musi skonsumować wartość."""
+        self.expect('{')
+        if self.accept('}'):
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.accept('}'):
+                return
+            self.expect(',')
+
+    def array_items(self):
+        """Iteruje po elementach tablicy; wołający konsumuje każdy element."""
+        self.expect('[')
+        if self.accept(']'):
+            return
+        while True:
+            yield
+            if self.accept(']'):
+                return
+            self.expect(',')
+
+
+def iter_sensor_dump(f):
+    """
+    Strumieniowo przechodzi po strukturze `{"sensors": [{..., "samples": [...]}, ...]}`.
+
+    Zwraca zdarzenia:
+        ('sample', metadane_sesji, próbka) – dla każdej próbki; metadane zawierają klucze sesji odczytane przed "samples"
+        ('session_end', metadane_sesji, None) – po zamknięciu obiektu sesji, z kompletem metadanych
+    """
+    stream = _JsonStream(f)
+    for key in stream.object_keys():
+        if key != 'sensors':
+            stream.value()
+            continue
+        for _ in stream.array_items():
+            session = {}
+            for session_key in stream.object_keys():
+                if session_key != 'samples':
+                    session[session_key] = stream.value()
+                    continue
+                for _ in stream.array_items():
+                    yield 'sample', session, stream.value()
+            yield 'session_end', session, None
+
+
+class _ColumnBuffer:
+    """Prealokowane kolumny jednego fragmentu danych przed zapisem do Parquet."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.sensors = np.full((capacity, 6), np.nan, dtype=np.float32)
+        self.sample_index = np.zeros(capacity, dtype=np.int64)
+        self.label_codes = np.zeros(capacity, dtype=np.int32)
+        self.person_codes = np.full(capacity, -1, dtype=np.int32)
+        self.size = 0
+
+    def grow(self):
+        self.capacity *= 2
+        self.sensors = np.concatenate([self.sensors, np.full_like(self.sensors, np.nan)])
+        self.sample_index = np.concatenate([self.sample_index, np.zeros_like(self.sample_index)])
+        self.label_codes = np.concatenate([self.label_codes, np.zeros_like(self.label_codes)])
+        self.person_codes = np.concatenate([self.person_codes, np.full_like(self.person_codes, -1)])
+
+    def reset(self):
+        self.sensors[:self.size] = np.nan
+        self.person_codes[:self.size] = -1
+        self.size = 0
+
+
+def _vector(values, out):
+    # brakujące składowe (null) numpy zamienia na NaN
+    if values:
+        values = values[:3]
+        out[:len(values)] = values
+
+
+@profiling.instrumented()
+def convert_sensor_dump(
+    json_path,
+    parquet_path,
+    fs=DUMP_SAMPLING_RATE,
+    chunk_rows=1 << 16,
+    id_column='person_id',
+    time_column='timestamp',
+    activity_column='activity_label',
+    acc_columns=ACC_COLUMNS,
+    gyr_columns=GYR_COLUMNS,
+):
+    """
+    Konwertuje zrzut `wynik.json` do Parquet bez budowania słownika na każdą próbkę.
+
+    Próbki są wczytywane strumieniowo do prealokowanych kolumn (float32 dla acc/gyr, kody kategorii dla etykiet
+    i osób) i zapisywane co `chunk_rows` wierszy jako kolejne grupy wierszy Parquet, więc zużycie pamięci nie zależy
+    od rozmiaru pliku. Czas liczony jest arytmetycznie: `i`-ta próbka sesji ma znacznik `round(i * 1000 / fs)` ms
+    od epoki (jak w dump_data.ipynb).
+
+    `json_path` i `parquet_path` mogą też być otwartymi plikami (tekstowym JSON i binarnym/`pyarrow` dla Parquet).
+
+    Zwraca:
+        dict: liczba wierszy i sesji
+    """
+    schema = pa.schema(
+        [(id_column, pa.dictionary(pa.int32(), pa.string())),
+         (time_column, pa.timestamp('ms')),
+         (activity_column, pa.dictionary(pa.int32(), pa.string()))]
+        + [(col, pa.float32()) for col in list(acc_columns) + list(gyr_columns)]
+    )
+    labels, persons = {}, {}
+    buffer = _ColumnBuffer(chunk_rows)
+    n_rows = n_sessions = 0
+    session_start = 0
+    session_index = 0
+    pending = False  # identyfikator bieżącej sesji jeszcze nieznany
+
+    def flush(writer):
+        n = buffer.size
+        if n == 0:
+            return
+        timestamps = np.round(buffer.sample_index[:n] * (1000 / fs)).astype(np.int64)
+        arrays = [
+            pa.DictionaryArray.from_arrays(pa.array(buffer.person_codes[:n]), pa.array(list(persons), pa.string())),
+            pa.array(timestamps, pa.timestamp('ms')),
+            pa.DictionaryArray.from_arrays(
+                pa.array(buffer.label_codes[:n], mask=buffer.label_codes[:n] < 0), pa.array(list(labels), pa.string())
+            ),
+        ] + [pa.array(buffer.sensors[:n, i]) for i in range(6)]
+        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+        buffer.reset()
+
+    source = open(json_path, 'r', encoding='utf-8') if isinstance(json_path, (str, os.PathLike)) else nullcontext(json_path)
+    with source as f, pq.ParquetWriter(parquet_path, schema) as writer:
+        for event, session, sample in iter_sensor_dump(f):
+            if event == 'session_end':
+                person = persons.setdefault(f"person_{session.get('id')}", len(persons))
+                buffer.person_codes[session_start:buffer.size] = person
+                pending = False
+                session_index = 0
+                n_sessions += 1
+                if buffer.size >= chunk_rows:
+                    flush(writer)
+                session_start = buffer.size
+                continue
+
+            if session_index == 0:
+                pending = 'id' not in session
+                if not pending:
+                    persons.setdefault(f"person_{session['id']}", len(persons))
+            if buffer.size == buffer.capacity:
+                if pending:
+                    buffer.grow()
+                else:
+                    buffer.person_codes[session_start:buffer.size] = persons[f"person_{session['id']}"]
+                    flush(writer)
+                    session_start = 0
+
+            row = buffer.size
+            label = sample.get('label')
+            buffer.label_codes[row] = -1 if label is None else labels.setdefault(label, len(labels))
+            buffer.sample_index[row] = session_index
+            _vector(sample.get('acceleration'), buffer.sensors[row, :3])
+            _vector(sample.get('gyroscope'), buffer.sensors[row, 3:])
+            buffer.size += 1
+            session_index += 1
+            n_rows += 1
+
+        flush(writer)
+
+    return {'rows': n_rows, 'sessions': n_sessions}
+
+
+def read_sensor_dump(json_path, parquet_path=None, fs=DUMP_SAMPLING_RATE, **kwargs):
+    """
+    Zwraca DataFrame z `wynik.json` gotowy do przypisania jako `TimeWindowSegmenter.df`.
+    Plik Parquet (domyślnie obok pliku JSON) jest tworzony tylko, gdy go brak lub jest starszy od JSON.
+    """
+    if parquet_path is None:
+        parquet_path = os.path.splitext(json_path)[0] + f'_{fs}hz.parquet'
+    if not os.path.exists(parquet_path) or os.path.getmtime(parquet_path) < os.path.getmtime(json_path):
+        convert_sensor_dump(json_path, parquet_path, fs=fs, **kwargs)
+    return pd.read_parquet(parquet_path, engine="pyarrow")
+
+
+def sensor_dump_frame(f, fs=DUMP_SAMPLING_RATE, **kwargs):
+    """
+    DataFrame z otwartego zrzutu w kształcie `wynik.json` (plik tekstowy lub `io.StringIO`), bez pliku Parquet
+    na dysku – np. dla treści żądania w `inference`. Kolumny i typy są takie same jak w `read_sensor_dump`.
+    """
+    sink = io.BytesIO()
+    convert_sensor_dump(f, sink, fs=fs, **kwargs)
+    sink.seek(0)
+    return pd.read_parquet(sink, engine="pyarrow")
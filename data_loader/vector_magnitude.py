@@ -34,4 +34,38 @@ def calculate_gyroscope_magnitude(window, axes = ['g_x', 'g_y', 'g_z']):
             raise ValueError(f"Kolumna '{axis}' nie została znaleziona w DataFrame.")
 
     vector_magnitude = np.sqrt(window[axes[0]]**2 + window[axes[1]]**2 + window[axes[2]]**2)
-    return vector_magnitude.mean()
\ No newline at end of file
+    return vector_magnitude.mean()
+
+def _magnitude_batch(windows):
+    data = np.asarray(windows, dtype=np.float64)
+    return np.sqrt(data[:, :, 0]**2 + data[:, :, 1]**2 + data[:, :, 2]**2).mean(axis=1)
+
+def calculate_accelerometer_magnitude_batch(windows, axes = ['ac_x', 'ac_y', 'ac_z']):
+    """
+    Wsadowa wersja `calculate_accelerometer_magnitude` dla wielu okien naraz
+
+    Argumenty:
+        windows: Tensor okien (n_windows, n_samples, 3) z kanałami w kolejności `axes`
+
+    Zwraca:
+        (np.ndarray, list): macierz cech (n_windows, 1) i nazwa kolumny
+    """
+    if np.shape(windows)[2] != len(axes):
+        raise ValueError(f"Oczekiwano {len(axes)} kanałów ({axes}), otrzymano {np.shape(windows)[2]}.")
+
+    return _magnitude_batch(windows)[:, None], ['vector_acc_mag']
+
+def calculate_gyroscope_magnitude_batch(windows, axes = ['g_x', 'g_y', 'g_z']):
+    """
+    Wsadowa wersja `calculate_gyroscope_magnitude` dla wielu okien naraz
+
+    Argumenty:
+        windows: Tensor okien (n_windows, n_samples, 3) z kanałami w kolejności `axes`
+
+    Zwraca:
+        (np.ndarray, list): macierz cech (n_windows, 1) i nazwa kolumny
+    """
+    if np.shape(windows)[2] != len(axes):
+        raise ValueError(f"Oczekiwano {len(axes)} kanałów ({axes}), otrzymano {np.shape(windows)[2]}.")
+
+    return _magnitude_batch(windows)[:, None], ['vector_gyr_mag']
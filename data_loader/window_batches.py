@@ -0,0 +1,248 @@
+import queue
+import shutil
+import tempfile
+import threading
+import weakref
+
+import numpy as np
+
+from . import continuity, profiling
+from .dataset import SensorDataset
+
+NORMALIZE_MODES = (None, 'subject', 'global')
+
+# wiersze na jeden fragment przy liczeniu statystyk normalizacji z memmapu
+_STATS_CHUNK = 1 << 20
+
+
+def _channel_stats(channels, bounds, group_subjects, n_subjects):
+    """
+    Średnia i odchylenie standardowe kanałów (float64) dla każdej osoby, liczone fragmentami z memmapu.
+    `bounds` to granice (start, end) grup, a `group_subjects` – numer osoby (0..n_subjects-1) każdej grupy.
+    """
+    n_channels = channels.shape[1]
+    sums = np.zeros((n_subjects, n_channels))
+    squares = np.zeros((n_subjects, n_channels))
+    counts = np.zeros((n_subjects, n_channels))
+    for subject, (start, end) in zip(group_subjects, bounds):
+        for chunk_start in range(start, end, _STATS_CHUNK):
+            chunk = np.asarray(channels[chunk_start:min(chunk_start + _STATS_CHUNK, end)], dtype=np.float64)
+            sums[subject] += np.nansum(chunk, axis=0)
+            squares[subject] += np.nansum(chunk * chunk, axis=0)
+            counts[subject] += np.count_nonzero(~np.isnan(chunk), axis=0)
+    counts = np.maximum(counts, 1)
+    mean = sums / counts
+    std = np.sqrt(np.maximum(squares / counts - mean * mean, 0.0))
+    return mean, np.where(std > 0, std, 1.0)
+
+
+class WindowBatchGenerator:
+    """
+    Leniwy generator paczek okien (np. do uczenia LSTM) bez materializowania wszystkich okien w pamięci.
+
+    Surowe kanały wszystkich grup (osoba, aktywność) są przechowywane raz jako memmap (`SensorDataset.save` / `load`),
+    a generator trzyma tylko wiersz początku każdego okna. Paczki `(batch_size, window_len, n_channels)` float32
+    są wycinane z memmapu na żądanie, więc pamięć rośnie z rozmiarem surowych danych, a nie z liczbą okien
+    (przy `step_size=2` i oknach 10 s to ~5× mniej niż `as_tensor()`). Okna są takie same jak w `segment_arrays()`
+    (razem z odrzucaniem okien przecinających luki w czasie). Kolejne paczki przygotowuje wątek w tle.
+
+    Argumenty:
+        segmenter: TimeWindowSegmenter z wczytanymi danymi (po ewentualnym `resample_to`)
+        batch_size: liczba okien w paczce
+        columns: kanały (domyślnie acc + gyr)
+        subjects: opcjonalnie osoby, których okna mają trafić do generatora (np. podział train / test)
+        classes: kolejność etykiet kodowanych jako int (domyślnie posortowane aktywności z danych);
+            przy podziale na zbiory należy przekazać tę samą listę do obu generatorów
+        shuffle: nowa losowa kolejność okien w każdej epoce
+        normalize: None, 'subject' (standaryzacja kanałów średnią i odchyleniem każdej osoby)
+            albo 'global' (wspólne statystyki wszystkich wybranych osób)
+        drop_last: pomija ostatnią niepełną paczkę
+        prefetch: liczba paczek przygotowywanych z wyprzedzeniem (0 wyłącza wątek)
+        path: katalog na memmap kanałów (domyślnie katalog tymczasowy usuwany razem z generatorem);
+            nieużywany, gdy dane segmentera już są memmapem
+
+    usage:
+    ```python
+        train = WindowBatchGenerator(segmenter, batch_size=32, subjects=train_ids, normalize='subject')
+        test = WindowBatchGenerator(segmenter, batch_size=256, subjects=test_ids, classes=train.classes,
+                                    shuffle=False, normalize='subject')
+        model.fit(train.forever(), steps_per_epoch=len(train), epochs=40,
+                  validation_data=test.forever(), validation_steps=len(test))
+    ```
+    """
+
+    def __init__(
+        self,
+        segmenter,
+        batch_size=32,
+        columns=None,
+        subjects=None,
+        classes=None,
+        shuffle=True,
+        normalize=None,
+        drop_last=False,
+        prefetch=2,
+        path=None,
+        seed=None,
+    ):
+        if normalize not in NORMALIZE_MODES:
+            raise ValueError(f"Unknown normalize mode '{normalize}'. Available: {NORMALIZE_MODES}")
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.normalize = normalize
+        self.drop_last = drop_last
+        self.prefetch = prefetch
+        self.rng = np.random.default_rng(seed)
+
+        dataset = segmenter.to_dataset()
+        # dane już jako memmap (np. `df_path` z `SensorDataset.save` albo `resample_cache`) używane są bez kopii
+        if not isinstance(dataset.channels, np.memmap):
+            if path is None:
+                path = tempfile.mkdtemp(prefix='window_batches_')
+                weakref.finalize(self, shutil.rmtree, path, ignore_errors=True)
+            dataset.save(path)
+            dataset = SensorDataset.load(path)
+        self.dataset = dataset
+
+        columns = list(columns) if columns is not None else segmenter.channel_columns()
+        indices = [self.dataset.channel_names.index(col) for col in columns]
+        self.columns = columns
+        self._channel_index = None if indices == list(range(len(self.dataset.channel_names))) else np.array(indices)
+
+        window_len, step, first_start = segmenter._window_params()
+        self.window_len = window_len
+        self._build_index(segmenter.group_window_starts(), step, first_start, subjects, classes)
+
+    def _build_index(self, group_starts, step, first_start, subjects, classes):
+        dataset = self.dataset
+        offsets = dataset.offsets
+        group_subjects = dataset.subject_codes[offsets[:-1]]
+        group_activities = dataset.activities[dataset.activity_codes[offsets[:-1]]]
+        keep = np.ones(len(group_subjects), dtype=bool)
+        if subjects is not None:
+            keep = np.isin(dataset.subjects[group_subjects], list(subjects))
+
+        self.classes = np.asarray(sorted(set(group_activities[keep])) if classes is None else list(classes), dtype=object)
+        class_codes = {label: code for code, label in enumerate(self.classes)}
+        unknown = sorted(set(group_activities[keep]) - set(class_codes))
+        if unknown:
+            raise ValueError(f"Activities missing from classes: {unknown}")
+
+        starts, labels, window_subjects = [], [], []
+        for i in np.flatnonzero(keep):
+            n_rows = offsets[i + 1] - offsets[i]
+            if group_starts is not None:
+                rows = group_starts[i]
+            else:
+                rows = continuity.window_starts(n_rows, self.window_len, step, first_start)
+            starts.append(offsets[i] + np.asarray(rows, dtype=np.int64))
+            labels.append(np.full(len(rows), class_codes[group_activities[i]], dtype=np.int32))
+            window_subjects.append(np.full(len(rows), group_subjects[i], dtype=np.int32))
+
+        self.starts = np.concatenate(starts) if starts else np.empty(0, dtype=np.int64)
+        self.labels = np.concatenate(labels) if labels else np.empty(0, dtype=np.int32)
+        self.subject_codes = np.concatenate(window_subjects) if window_subjects else np.empty(0, dtype=np.int32)
+
+        self.mean = self.std = None
+        if self.normalize == 'subject':
+            bounds = list(zip(offsets[:-1], offsets[1:]))
+            self.mean, self.std = _channel_stats(dataset.channels, bounds, group_subjects, len(dataset.subjects))
+        elif self.normalize == 'global':
+            bounds = [(offsets[i], offsets[i + 1]) for i in np.flatnonzero(keep)]
+            self.mean, self.std = _channel_stats(dataset.channels, bounds, np.zeros(len(bounds), dtype=np.int64), 1)
+        if self.mean is not None and self._channel_index is not None:
+            self.mean, self.std = self.mean[:, self._channel_index], self.std[:, self._channel_index]
+        self._offsets = np.arange(self.window_len, dtype=np.int64)
+
+    def __len__(self):
+        """Liczba paczek w epoce."""
+        if self.drop_last:
+            return len(self.starts) // self.batch_size
+        return -(-len(self.starts) // self.batch_size)
+
+    @property
+    def n_windows(self):
+        return len(self.starts)
+
+    @property
+    def subjects(self):
+        """Identyfikator osoby dla każdego okna (w kolejności bez tasowania)."""
+        return self.dataset.subjects[self.subject_codes]
+
+    @profiling.instrumented(windows=lambda out: len(out[0]))
+    def batch(self, window_indices):
+        """
+        Paczka okien o numerach `window_indices`.
+
+        Zwraca:
+            (np.ndarray, np.ndarray): X (n, window_len, n_channels) float32 i kody etykiet int32 (indeksy w `classes`)
+        """
+        window_indices = np.asarray(window_indices)
+        rows = self.starts[window_indices][:, None] + self._offsets
+        X = np.asarray(self.dataset.channels[rows.ravel()], dtype=np.float32)
+        if self._channel_index is not None:
+            X = X[:, self._channel_index]
+        X = X.reshape(len(window_indices), self.window_len, -1)
+        if self.mean is not None:
+            codes = self.subject_codes[window_indices] if self.normalize == 'subject' else 0
+            X -= self.mean[codes].astype(np.float32)[..., None, :]
+            X /= self.std[codes].astype(np.float32)[..., None, :]
+        return X, self.labels[window_indices]
+
+    def _epoch_batches(self):
+        order = self.rng.permutation(len(self.starts)) if self.shuffle else np.arange(len(self.starts))
+        for i in range(len(self)):
+            indices = order[i * self.batch_size:(i + 1) * self.batch_size]
+            # odczyt z memmapu w kolejności wierszy pliku; kolejność okien w paczce jest i tak losowa
+            yield self.batch(np.sort(indices) if self.shuffle else indices)
+
+    def __iter__(self):
+        """Jedna epoka paczek `(X, y)`; przy `prefetch > 0` paczki przygotowuje wątek w tle."""
+        if self.prefetch <= 0:
+            yield from self._epoch_batches()
+            return
+
+        batches = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        done = object()
+
+        def produce():
+            try:
+                for item in self._epoch_batches():
+                    while not stop.is_set():
+                        try:
+                            batches.put(item, timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+                    if stop.is_set():
+                        return
+                item = done
+            except BaseException as exc:  # błąd wątku przekazywany konsumentowi
+                item = exc
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        worker = threading.Thread(target=produce, name='WindowBatchGenerator', daemon=True)
+        worker.start()
+        try:
+            while True:
+                item = batches.get()
+                if item is done:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # przerwana epoka (break, wyjątek w pętli uczenia) zatrzymuje wątek
+            stop.set()
+            worker.join()
+
+    def forever(self):
+        """Nieskończony strumień paczek epoka po epoce (np. dla `model.fit(..., steps_per_epoch=len(gen))`)."""
+        while True:
+            yield from self
@@ -4,6 +4,480 @@ from data_loader.data_loader import TimeWindowSegmenter
 from data_loader.features_accelerometer import extract_acc_features
 from data_loader.features_temporal import extract_temporal_features
 from data_loader.features_cosine import extract_cosine_distances
+from data_loader import features_freq
+import numpy as np
+
+
+def check_spectral_features_parity(fs=25, n_windows=20, n_samples=250):
+    # spectral_features (jedna PSD na paczkę okien) vs. funkcje skalarne z features_freq
+    rng = np.random.default_rng(0)
+    signals = rng.normal(size=(n_windows, n_samples)) + np.sin(np.arange(n_samples) * 0.3)
+    scalar_funcs = {
+        'dom_freq': lambda x: features_freq.dominant_frequency(x, fs),
+        'entropy': lambda x: features_freq.spectral_entropy(x, fs),
+        'energy': features_freq.spectral_energy,
+        'centroid': lambda x: features_freq.spectral_centroid(x, fs),
+        'bandwidth': lambda x: features_freq.spectral_bandwidth(x, fs),
+        'flatness': lambda x: features_freq.spectral_flatness(x, fs),
+        'slope': lambda x: features_freq.spectral_slope(x, fs),
+        'rolloff': lambda x: features_freq.spectral_rolloff(x, fs),
+        'band_ratio': lambda x: features_freq.band_energy_ratio(x, fs),
+    }
+
+    features, names = features_freq.spectral_features(signals, fs)
+    expected = np.array([[scalar_funcs[name](signal) for name in names] for signal in signals])
+    np.testing.assert_allclose(features, expected, rtol=1e-9, atol=1e-12)
+    print("spectral_features: OK")
+
+
+def check_mfcc_parity(fs=50, n_windows=10, n_samples=500):
+    # mfcc_batch (własna STFT + zapamiętany bank filtrów mel i DCT) vs. librosa.feature.mfcc
+    try:
+        import librosa  # noqa: F401
+    except ImportError:
+        print("mfcc_batch: skipped (no librosa)")
+        return
+    rng = np.random.default_rng(0)
+    signals = rng.normal(size=(n_windows, n_samples)) * 0.3 + np.sin(np.arange(n_samples) * 0.2)
+    expected = np.array([features_freq.mfcc_features(signal, fs, backend='librosa') for signal in signals])
+    np.testing.assert_allclose(features_freq.mfcc_batch(signals, fs), expected, rtol=0, atol=1e-5)
+    print("mfcc_batch: OK")
+
+
+def check_peak_index_parity(fs=25, n_samples=3000, window_len=250, step=25):
+    # PeakIndex (piki całego sygnału + searchsorted) vs. find_peaks w każdym oknie, także dla plateau
+    from scipy.signal import find_peaks
+    from data_loader.features_temporal import PeakIndex
+    rng = np.random.default_rng(0)
+    block = np.round(rng.normal(size=(n_samples, 3)).cumsum(axis=0) / 3)
+    starts = np.arange(0, n_samples - window_len + 1, step)
+    index = PeakIndex(block)
+    counts = index.counts(starts, window_len)
+    mean, std = index.intervals(starts, window_len, fs)
+    for w, start in enumerate(starts):
+        for c in range(block.shape[1]):
+            peaks, _ = find_peaks(block[start:start + window_len, c])
+            diffs = np.diff(peaks / fs) if len(peaks) > 1 else np.zeros(1)
+            assert counts[w, c] == len(peaks)
+            np.testing.assert_allclose([mean[w, c], std[w, c]], [diffs.mean(), diffs.std()], rtol=1e-9, atol=1e-12)
+    print("PeakIndex: OK")
+
+
+def check_incremental_archive_parity(fs=50, target_fs=25):
+    # IncrementalArchive po trzech append (nowa grupa + dopisanie do istniejącej + zrzut wynik.json)
+    # vs. FeatureStore na całej historii
+    import os
+    import tempfile
+    import pandas as pd
+    from benchmarks.synthetic import generate_imu_data, to_raw_export, to_sensor_dump
+    from data_loader.feature_registry import FeaturePlan
+    from data_loader.feature_store import FeatureStore
+    from data_loader.incremental import IncrementalArchive
+    raw = to_raw_export(generate_imu_data(n_subjects=3, duration_s=60, sampling_rate=fs, seed=1), seed=1)
+    # pierwsza sesja: osoby 0-1 bez co drugiego wiersza osoby 0; druga: reszta osoby 0 i osoba 2
+    first = raw['Subject-id'].isin(['subject_0', 'subject_1']) & ~((raw['Subject-id'] == 'subject_0') & (raw.index % 2 == 1))
+    dump = generate_imu_data(n_subjects=2, duration_s=60, sampling_rate=fs, activities=('walking', 'running'),
+                             jitter_ms=0, drop_rate=0, duplicate_rate=0, seed=2)
+    # ten sam zrzut w układzie surowego eksportu: osoby person_<nr>, czas od zera co 1000 / fs ms, kanały float32
+    dump_raw = dump.assign(**{col: dump[col].astype(np.float32).map('{};'.format)
+                              for col in ['ac_x', 'ac_y', 'ac_z', 'g_x', 'g_y', 'g_z']})
+    dump_raw['Subject-id'] = 'person_' + dump['Subject-id'].str.removeprefix('subject_')
+    dump_raw['Timestamp'] = (dump.groupby('Subject-id').cumcount() * 1000 // fs).map('{:013d}'.format)
+    plan = FeaturePlan(fs=target_fs)
+    kwargs = dict(source_sampling_rate=fs, window_size=10, step_size=5, allowed_deviation_ms=30)
+    with tempfile.TemporaryDirectory() as root:
+        IncrementalArchive(root, [plan], target_rate_hz=target_fs, **kwargs).append(raw[first])
+        archive = IncrementalArchive(root, [plan], target_rate_hz=target_fs, **kwargs)
+        archive.append(raw[~first])
+        dump_path = os.path.join(root, 'nowe_sesje.json')
+        with open(dump_path, 'w', encoding='utf-8') as f:
+            f.write(to_sensor_dump(dump))
+        summary = archive.append(dump_path, dump_fs=fs)
+        assert summary['added'] == 4 and summary['windows'] > 0
+        X, y, subjects = archive.features()
+
+    full = TimeWindowSegmenter(clean_columns=False, fix_timestamps=False, **kwargs)
+    full.df = pd.concat([raw[first], raw[~first], dump_raw]).reset_index(drop=True)
+    full._clean_columns()
+    full._fix_timestamps()
+    # archiwum trzyma kanały w float32 (SensorDataset), więc porównanie na tej samej ścieżce
+    full.dataset = full.to_dataset()
+    full._df = None
+    full.resample_to(target_fs)
+    with tempfile.TemporaryDirectory() as root:
+        expected, expected_y, expected_subjects = FeatureStore(root).features(full, [plan])
+    assert len(X) and list(X.columns) == list(expected.columns)
+    assert (y == expected_y).all() and (subjects == expected_subjects).all()
+    assert {'person_0', 'person_1'} <= set(subjects)
+    np.testing.assert_array_equal(X.to_numpy(), expected.to_numpy())
+    print("IncrementalArchive: OK")
+
+
+def check_feature_store_cache(fs=25):
+    # FeatureStore: drugie wywołanie bez ekstrakcji, po zmianie danych jednej osoby liczone są tylko jej grupy
+    import glob
+    import os
+    import tempfile
+    from benchmarks.synthetic import generate_imu_data
+    from data_loader.dev_mad_var import calculate_statistics_batch
+    from data_loader.feature_store import FeatureStore
+    data = generate_imu_data(n_subjects=3, duration_s=30, sampling_rate=fs, jitter_ms=0, drop_rate=0, duplicate_rate=0)
+    calls = []
+
+    def stats(windows):
+        calls.append(len(windows))
+        return calculate_statistics_batch(windows, ['ac_x', 'ac_y', 'ac_z', 'g_x', 'g_y', 'g_z'])
+
+    def segmenter(df):
+        result = TimeWindowSegmenter(window_size=5, step_size=1, source_sampling_rate=fs,
+                                     clean_columns=False, fix_timestamps=False)
+        result.df = df
+        return result
+
+    n_groups = data.groupby(['Subject-id', 'Activity Label']).ngroups
+    changed = data.copy()
+    subject = changed['Subject-id'] == 'subject_1'
+    changed.loc[subject, 'ac_x'] += 1.0
+    with tempfile.TemporaryDirectory() as root:
+        store = FeatureStore(root)
+        X, y, subjects = store.features(segmenter(data), [stats])
+        assert len(calls) == n_groups
+        cached, cached_y, cached_subjects = store.features(segmenter(data), [stats])
+        assert len(calls) == n_groups
+        np.testing.assert_array_equal(cached.to_numpy(), X.to_numpy())
+        assert (cached_y == y).all() and (cached_subjects == subjects).all()
+
+        updated, _, _ = store.features(segmenter(changed), [stats])
+        assert len(calls) == n_groups + changed.loc[subject, 'Activity Label'].nunique()
+        # partycje sprzed zmiany (ten sam wpis 'in-memory') są usuwane
+        assert len(glob.glob(os.path.join(root, '*', 'groups', '*.arrow'))) == n_groups
+    with tempfile.TemporaryDirectory() as root:
+        expected, _, _ = FeatureStore(root).features(segmenter(changed), [stats])
+    np.testing.assert_array_equal(updated.to_numpy(), expected.to_numpy())
+    assert not np.array_equal(updated.to_numpy(), X.to_numpy())
+    print("FeatureStore: OK")
+
+
+def check_resample_cache_parity(fs=50, rates=(25, 20)):
+    # ResampleCache ('mean', z siatki float32 współdzielonej przez częstotliwości) vs. resample_to bez cache
+    import tempfile
+    import pandas as pd
+    from benchmarks.synthetic import generate_imu_data
+    data = generate_imu_data(n_subjects=2, duration_s=60, sampling_rate=fs, seed=3)
+    data['Timestamp'] = pd.to_datetime(data['Timestamp'], unit='ms')
+
+    def resampled(rate, cache=None):
+        segmenter = TimeWindowSegmenter(source_sampling_rate=fs, clean_columns=False, fix_timestamps=False,
+                                        resample_cache=cache)
+        segmenter.df = data.copy()
+        segmenter.resample_to(rate)
+        return segmenter.to_dataset()
+
+    with tempfile.TemporaryDirectory() as root:
+        for _ in range(2):  # drugi przebieg czyta wyniki z cache
+            for rate in rates:
+                cached, expected = resampled(rate, root), resampled(rate)
+                np.testing.assert_array_equal(cached.timestamps_ms, expected.timestamps_ms)
+                np.testing.assert_allclose(cached.channels, expected.channels, rtol=1e-6, atol=1e-4)
+                del cached  # memmap zamknięty przed usunięciem katalogu
+    print("ResampleCache: OK")
+
+
+def check_bundle_json_request(fs=25, train_fs=50):
+    # ModelBundle na treści żądania wynik.json (czas datetime64 z sensor_dump) vs. ta sama sesja jako DataFrame
+    import tempfile
+    import pandas as pd
+    from sklearn.dummy import DummyClassifier
+    from benchmarks.synthetic import generate_imu_data, to_sensor_dump
+    from data_loader.feature_registry import FeaturePlan
+    from data_loader.inference import ModelBundle, read_recording, save_model_bundle
+    train = generate_imu_data(n_subjects=1, duration_s=30, sampling_rate=train_fs, seed=4)
+    segmenter = TimeWindowSegmenter(window_size=5, step_size=1, source_sampling_rate=train_fs,
+                                    clean_columns=False, fix_timestamps=False)
+    segmenter.df = train.assign(Timestamp=pd.to_datetime(train['Timestamp'], unit='ms'))
+    segmenter.resample_to(fs)
+    model = DummyClassifier().fit(np.zeros((2, 1)), ['walking', 'running'])
+
+    data = generate_imu_data(n_subjects=2, duration_s=30, sampling_rate=fs, activities=('walking', 'running'),
+                             jitter_ms=0, drop_rate=0, duplicate_rate=0, seed=5)
+    body = to_sensor_dump(data).encode('utf-8')
+    # zrzut trzyma kanały w float32, a czas liczy od zera co 1000 / fs ms w każdej sesji
+    expected = data.assign(**{col: data[col].astype(np.float32) for col in ['ac_x', 'ac_y', 'ac_z', 'g_x', 'g_y', 'g_z']})
+    expected['Subject-id'] = 'person_' + expected['Subject-id'].str.removeprefix('subject_')
+    expected['Timestamp'] = expected.groupby('Subject-id').cumcount() * 1000 // fs
+    with tempfile.TemporaryDirectory() as root:
+        save_model_bundle(root, model, FeaturePlan(['stats'], fs=fs), segmenter, clean_columns=True,
+                          fix_timestamps=True)
+        bundle = ModelBundle(root)
+        windows, meta = bundle.windows(read_recording(body, bundle.config))
+        expected_windows, expected_meta = bundle.windows(expected)
+        assert len(bundle.predict(windows)) == len(windows)
+    assert len(windows) == len(expected_windows) > 0
+    np.testing.assert_array_equal(windows, expected_windows)
+    pd.testing.assert_frame_equal(meta, expected_meta)
+    # krok okna w próbkach (jak w treningu) na siatce fs
+    step_ms = bundle.segmenter()._window_params()[1] * 1000 // fs
+    assert (meta.groupby(['Subject-id', 'Activity Label'])['window_start'].diff().dropna() == pd.Timedelta(step_ms, 'ms')).all()
+    print("ModelBundle (wynik.json): OK")
+
+
+def check_batch_extractors_parity(fs=25):
+    # wsadowe ekstraktory na tensorze z segment_arrays vs. funkcje skalarne na oknach DataFrame z segment()
+    import pandas as pd
+    from benchmarks.synthetic import generate_imu_data
+    from data_loader import binned_distr, dev_mad_var, features_accelerometer, features_cosine, features_temporal
+    from data_loader import vector_magnitude
+    axes = ['ac_x', 'ac_y', 'ac_z', 'g_x', 'g_y', 'g_z']
+    data = generate_imu_data(n_subjects=1, duration_s=20, sampling_rate=fs, seed=6)
+    data['Timestamp'] = pd.to_datetime(data['Timestamp'], unit='ms')
+    # plateau i wartości na krawędziach przedziałów histogramu
+    data['g_z'] = data['g_z'].round(-1)
+    segmenter = TimeWindowSegmenter(window_size=4, step_size=1, source_sampling_rate=fs,
+                                    clean_columns=False, fix_timestamps=False)
+    segmenter.df = data
+    frames = list(segmenter.segment())
+    windows = np.concatenate([w for _, _, _, w in segmenter.segment_arrays(columns=axes, dtype=np.float64)])
+    assert len(frames) == len(windows) > 0
+
+    def binned(window):
+        histograms = binned_distr.calculate_binned_distribution_multi_axis(window, axes)
+        return {f'{key}_bin{i}': value for key, values in histograms.items() for i, value in enumerate(values)}
+
+    pairs = [
+        (lambda w: features_accelerometer.extract_acc_features(w, axes),
+         lambda w: features_accelerometer.extract_acc_features_batch(w, axes)),
+        (lambda w: features_temporal.extract_temporal_features(w, axes),
+         lambda w: features_temporal.extract_temporal_features_batch(w, axes)),
+        (lambda w: dev_mad_var.calculate_statistics_multi_axis(w, axes),
+         lambda w: dev_mad_var.calculate_statistics_batch(w, axes)),
+        (binned, lambda w: binned_distr.calculate_binned_distribution_batch(w, axes)),
+        (lambda w: features_cosine.extract_cosine_distances(w, axes),
+         lambda w: features_cosine.extract_cosine_distances_batch(w, axes)),
+        (lambda w: {'vector_acc_mag': vector_magnitude.calculate_accelerometer_magnitude(w)},
+         lambda w: vector_magnitude.calculate_accelerometer_magnitude_batch(w[:, :, :3])),
+        (lambda w: {'vector_gyr_mag': vector_magnitude.calculate_gyroscope_magnitude(w)},
+         lambda w: vector_magnitude.calculate_gyroscope_magnitude_batch(w[:, :, 3:])),
+    ]
+    for scalar, batch in pairs:
+        features, names = batch(windows)
+        expected = [scalar(frame) for frame in frames]
+        assert names == list(expected[0])
+        np.testing.assert_allclose(features, [[row[name] for name in names] for row in expected], rtol=1e-9, atol=1e-12)
+    print("batch extractors: OK")
+
+
+def check_cleaning_parity(n=2000):
+    # cleaning.clean_numeric_column / parse_unix_timestamps vs. poprzednie czyszczenie w TimeWindowSegmenter
+    # (str.extract na tekście i int(str[:13]) w apply) – dla tekstu, liczb całkowitych i float64
+    import pandas as pd
+    from data_loader import cleaning
+
+    def clean_baseline(series):
+        return series.astype(str).str.replace(';', '', regex=False).str.extract(r'([-+]?\d*\.\d+|\d+)')[0].astype(float)
+
+    def timestamps_baseline(series):
+        def safe_convert(ts):
+            try:
+                return pd.to_datetime(int(str(ts)[:13]), unit='ms')
+            except Exception:
+                return pd.NaT
+        return series.astype(str).str.replace(r'\D', '', regex=True).apply(safe_convert)
+
+    rng = np.random.default_rng(7)
+    values = rng.normal(0, 50, n)
+    values[::50] *= 1e-7  # notacja naukowa w str()
+    values[1::50] = np.nan
+    special = ['', 'abc', None, '-', '1;2;', '  3.5 ;', '.5', '-0.25;', '+7', '1e-05']
+    numeric_columns = [
+        pd.Series(values),
+        pd.Series(rng.integers(-1000, 1000, n)),
+        pd.Series([f'{v};' for v in values] + special, dtype=object),
+    ]
+    for series in numeric_columns:
+        cleaned, rejected = cleaning.clean_numeric_column(series)
+        expected = clean_baseline(series)
+        np.testing.assert_array_equal(cleaned.to_numpy(), expected.to_numpy())
+        assert rejected == int((series.notna() & expected.isna()).sum())
+
+    millis = 1_700_000_000_000 + rng.integers(0, 10 ** 9, n)
+    special = ['', 'abc', None, '12', '-1700000000000', '9999999999999', '1700000000000.5', '2023-11-14 22:13:20']
+    timestamp_columns = [
+        pd.Series(millis),
+        pd.Series(millis * 1000 + rng.integers(0, 1000, n)),  # mikrosekundy
+        pd.Series(-millis),
+        pd.Series(millis.astype(np.float64)),
+        pd.Series([f'{v}{rng.integers(0, 1000):03d}' for v in millis] + special, dtype=object),
+    ]
+    for series in timestamp_columns:
+        parsed, rejected = cleaning.parse_unix_timestamps(series)
+        expected = pd.to_datetime(timestamps_baseline(series))
+        np.testing.assert_array_equal(parsed.to_numpy(dtype='datetime64[ns]'), expected.to_numpy(dtype='datetime64[ns]'))
+        assert rejected == int((series.notna() & expected.isna()).sum())
+    print("cleaning: OK")
+
+
+def check_parallel_parity(fs=25):
+    # extract_features_parallel (pula procesów, współdzielona pamięć, kilka grup na zadanie) vs. FeatureStore
+    # liczący te same grupy po kolei, także z filtrowaniem nieciągłości i indeksem pików
+    import tempfile
+    import pandas as pd
+    from functools import partial
+    from benchmarks.synthetic import generate_imu_data
+    from data_loader.feature_registry import FeaturePlan
+    from data_loader.feature_store import FeatureStore
+    from data_loader.parallel import extract_features_parallel
+    from data_loader.peak_features import extract_peak_features_batch
+    data = generate_imu_data(n_subjects=3, duration_s=40, sampling_rate=fs, seed=8)
+    data['Timestamp'] = pd.to_datetime(data['Timestamp'], unit='ms')
+    extractors = [FeaturePlan(['stats', 'temporal', 'freq'], fs=fs), partial(extract_peak_features_batch, sampling_rate=fs)]
+    for allowed_deviation_ms in (None, 20):
+        segmenter = TimeWindowSegmenter(window_size=4, step_size=1, source_sampling_rate=fs, clean_columns=False,
+                                        fix_timestamps=False, allowed_deviation_ms=allowed_deviation_ms)
+        segmenter.df = data
+        X, y, subjects = extract_features_parallel(segmenter, extractors, n_jobs=2, chunk_size=2)
+        with tempfile.TemporaryDirectory() as root:
+            expected, expected_y, expected_subjects = FeatureStore(root).features(segmenter, extractors)
+        assert len(X) and list(X.columns) == list(expected.columns)
+        assert (y == expected_y).all() and (subjects == expected_subjects).all()
+        np.testing.assert_array_equal(X.to_numpy(), expected.to_numpy())
+    print("extract_features_parallel: OK")
+
+
+def check_feature_plan_parity(fs=25, n_windows=30, n_samples=100):
+    # FeaturePlan (wspólne wielkości pośrednie, wszystkie grupy) vs. osobne funkcje wsadowe każdego modułu
+    from data_loader import binned_distr, dev_mad_var, features_accelerometer, features_cosine, features_temporal
+    from data_loader import peak_features, vector_magnitude
+    from data_loader.feature_registry import AXES, FeaturePlan
+    rng = np.random.default_rng(9)
+    windows = np.round(rng.normal(size=(n_windows, n_samples, len(AXES))).cumsum(axis=1), 1)
+    X, names = FeaturePlan(fs=fs)(windows)
+
+    expected = {}
+
+    def add(features, feature_names, rename=lambda name: name):
+        for column, name in zip(np.asarray(features).T, feature_names):
+            name = rename(name)
+            if name in expected:  # cecha wspólna dla kilku modułów (np. energia) musi być taka sama
+                np.testing.assert_allclose(column, expected[name], rtol=1e-9, atol=1e-12)
+            expected[name] = column
+
+    add(*features_accelerometer.extract_acc_features_batch(windows, AXES))
+    # w rejestrze energia z normalizacją z features_temporal nazywa się 'power'
+    add(*features_temporal.extract_temporal_features_batch(windows, AXES),
+        rename=lambda name: name.replace('_energy', '_power'))
+    add(*dev_mad_var.calculate_statistics_batch(windows, AXES))
+    add(*binned_distr.calculate_binned_distribution_batch(windows, AXES))
+    add(*features_cosine.extract_cosine_distances_batch(windows, AXES))
+    add(*vector_magnitude.calculate_accelerometer_magnitude_batch(windows[:, :, :3]))
+    add(*vector_magnitude.calculate_gyroscope_magnitude_batch(windows[:, :, 3:]))
+    add(*peak_features.extract_peak_features_batch(windows, fs, AXES))
+    for i, axis in enumerate(AXES):
+        spectral, spectral_names = features_freq.spectral_features(windows[:, :, i], fs)
+        add(spectral, [f'{axis}_{name}' for name in spectral_names])
+
+    assert len(names) == len(set(names)) and set(names) <= set(expected)
+    np.testing.assert_allclose(X, np.column_stack([expected[name] for name in names]), rtol=1e-9, atol=1e-12)
+    print("FeaturePlan: OK")
+
+
+def check_sensor_dataset_parity(fs=50, target_fs=25):
+    # ścieżka SensorDataset (save/load z memmapami, resample_to, as_tensor, gap_index) vs. ta sama praca na DataFrame
+    import os
+    import tempfile
+    import pandas as pd
+    from benchmarks.synthetic import generate_imu_data
+    channels = ['ac_x', 'ac_y', 'ac_z', 'g_x', 'g_y', 'g_z']
+    data = generate_imu_data(n_subjects=3, duration_s=40, sampling_rate=fs, seed=10)
+    data['Timestamp'] = pd.to_datetime(data['Timestamp'], unit='ms')
+    # kanały w float32 jak w SensorDataset; osoby przemieszane, żeby zbiór musiał ułożyć wiersze grupami
+    data[channels] = data[channels].astype(np.float32)
+    data = pd.concat([data[data['Subject-id'] == subject] for subject in ['subject_2', 'subject_0', 'subject_1']])
+    kwargs = dict(window_size=4, step_size=1, source_sampling_rate=fs, clean_columns=False, fix_timestamps=False,
+                  allowed_deviation_ms=30)
+
+    def segmenter(df_path=None, df=None):
+        result = TimeWindowSegmenter(df_path=df_path, **kwargs)
+        if df is not None:
+            result.df = df.copy()
+        return result
+
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'dataset')
+        segmenter(df=data).to_dataset().save(path)
+        for rate in (None, target_fs):
+            expected, loaded = segmenter(df=data), segmenter(df_path=path)
+            assert loaded.dataset is not None
+            if rate:
+                expected.resample_to(rate)
+                loaded.resample_to(rate)
+                assert loaded.dataset is not None  # resampling bez budowania DataFrame
+            X, y, subjects = loaded.as_tensor()
+            expected_X, expected_y, expected_subjects = expected.as_tensor()
+            assert len(X) and (y == expected_y).all() and (subjects == expected_subjects).all()
+            np.testing.assert_array_equal(X, expected_X)
+            for got, want in zip(loaded.gap_index(), expected.gap_index()):
+                np.testing.assert_array_equal(got, want)
+            del loaded  # memmapy zamknięte przed usunięciem katalogu
+    print("SensorDataset: OK")
+
+
+def check_gap_filtering_parity(fs=25):
+    # group_window_starts ('skip' i 'split') vs. sprawdzanie każdego odstępu i okna w pętli, oraz odstęp
+    # równy dokładnie granicy tolerancji przy czasach z częścią poniżej milisekundy
+    import pandas as pd
+    from benchmarks.synthetic import generate_imu_data
+    data = generate_imu_data(n_subjects=2, duration_s=60, sampling_rate=fs, jitter_ms=4, drop_rate=0.02, seed=11)
+    data['Timestamp'] = pd.to_datetime(data['Timestamp'], unit='ms')
+    allowed = 10
+    for mode in ('skip', 'split'):
+        segmenter = TimeWindowSegmenter(window_size=4, step_size=3, source_sampling_rate=fs, clean_columns=False,
+                                        fix_timestamps=False, allowed_deviation_ms=allowed, gap_mode=mode)
+        segmenter.df = data
+        window_len, step, first_start = segmenter._window_params()
+        assert first_start > 0
+        starts = segmenter.group_window_starts()
+        for i, (_, group) in enumerate(data.groupby(['Subject-id', 'Activity Label'])):
+            times = group['Timestamp'].tolist()
+            breaks = [False] + [abs((b - a) / pd.Timedelta(1, 'ms') - 1000 / fs) > allowed for a, b in zip(times, times[1:])]
+            if mode == 'skip':
+                expected = [s for s in range(first_start, len(times) - window_len + 1, step)
+                            if not any(breaks[s + 1:s + window_len])]
+            else:
+                bounds = [j for j, b in enumerate(breaks) if b or j == 0] + [len(times)]
+                expected = [begin + s for begin, end in zip(bounds, bounds[1:])
+                            for s in range(first_start, end - begin - window_len + 1, step)]
+            assert any(breaks) and list(starts[i]) == expected
+
+    # 20 Hz: odstęp 1050 ms odbiega od 50 ms dokładnie o allowed_deviation_ms=1000, więc nie jest nieciągłością
+    start = pd.Timestamp(1_700_000_000_000_123_456)
+    offsets_us = np.concatenate([np.arange(40) * 50_000, 39 * 50_000 + 1_050_000 + np.arange(40) * 50_000])
+    offsets_us[60:] += 1_000_001  # druga przerwa: 1050 ms + 1 µs
+    gap = pd.DataFrame({'Timestamp': start + pd.to_timedelta(offsets_us, unit='us'), 'Subject-id': 's', 'Activity Label': 'a'})
+    for col in ['ac_x', 'ac_y', 'ac_z', 'g_x', 'g_y', 'g_z']:
+        gap[col] = 0.0
+    segmenter = TimeWindowSegmenter(window_size=1, step_size=1, source_sampling_rate=20, clean_columns=False,
+                                    fix_timestamps=False, allowed_deviation_ms=1000)
+    segmenter.df = gap
+    _, _, breaks, _ = segmenter.gap_index()
+    assert np.flatnonzero(breaks).tolist() == [60]
+    print("gap filtering: OK")
+
+
+check_spectral_features_parity()
+check_spectral_features_parity(fs=50, n_samples=499)
+check_mfcc_parity()
+check_mfcc_parity(fs=25, n_samples=250)
+check_peak_index_parity()
+check_incremental_archive_parity()
+check_feature_store_cache()
+check_resample_cache_parity()
+check_bundle_json_request()
+check_batch_extractors_parity()
+check_cleaning_parity()
+check_parallel_parity()
+check_feature_plan_parity()
+check_sensor_dataset_parity()
+check_gap_filtering_parity()
 
 data_processor = TimeWindowSegmenter(df_path="D:\MetaMotion\metamotion-ml\data_loader\wsidm.parquet", window_size=10, step_size=10)
 